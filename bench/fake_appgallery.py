@@ -0,0 +1,194 @@
+"""本地模拟的 AppGallery 服务，用于基准测试
+
+提供与真实站点形状一致的三个入口：
+- GET  /app/detail?id=<包名>          应用详情页（静态或JS渲染）
+- POST /edge/webedge/getInterfaceCode  接口码
+- POST /edge/webedge/appinfo           应用信息JSON
+
+延迟、页面大小、渲染方式、失败率与超时率均可配置，
+随机数使用固定种子，保证多次运行结果可复现。
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from typing import Optional
+
+from aiohttp import web
+
+MODE_STATIC = "static"
+MODE_JS = "js"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{package} - AppGallery</title>
+<link rel="stylesheet" href="/static/app.css">
+</head>
+<body>
+<div class="app-detail">
+  <h1 class="app-name">{package}</h1>
+  <div class="info">
+    <span class="content-label">版本</span>
+    <span class="content-value">{static_version}</span>
+    <span class="update-date">{date}</span>
+  </div>
+  <img src="/static/banner.png">
+  <div class="padding">{padding}</div>
+</div>
+{script}
+</body>
+</html>
+"""
+
+JS_TEMPLATE = """<script>
+document.addEventListener("DOMContentLoaded", function () {{
+  setTimeout(function () {{
+    document.querySelector("span.content-value").textContent = "{version}";
+  }}, {render_delay_ms});
+}});
+</script>"""
+
+
+class FakeAppGallery:
+    """可配置的模拟应用市场"""
+
+    def __init__(self, latency_ms: float = 50, jitter_ms: float = 20, payload_kb: int = 64,
+                 mode: str = MODE_JS, render_delay_ms: int = 100, failure_rate: float = 0.0,
+                 timeout_rate: float = 0.0, hang_seconds: float = 120, release_rate: float = 0.0,
+                 enable_api: bool = True, seed: int = 42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.payload_kb = payload_kb
+        self.mode = mode
+        self.render_delay_ms = render_delay_ms
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.release_rate = release_rate
+        self.enable_api = enable_api
+        self._random = random.Random(seed)
+        self._releases = {}
+        self._padding = "x" * (payload_kb * 1024)
+        self.request_count = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    # ---------- 模拟数据 ----------
+
+    def version_of(self, package: str) -> str:
+        """包名决定基础版本，release_rate 控制每次请求产生新版本的概率"""
+        if self.release_rate and self._random.random() < self.release_rate:
+            self._releases[package] = self._releases.get(package, 0) + 1
+        digest = hashlib.md5(package.encode("utf-8")).digest()
+        return f"{digest[0] % 10}.{digest[1] % 10}.{self._releases.get(package, 0)}"
+
+    async def _simulate_network(self) -> Optional[web.Response]:
+        """注入延迟、失败与超时；返回非空时直接作为响应"""
+        self.request_count += 1
+        delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < self.timeout_rate:
+            await asyncio.sleep(self.hang_seconds)
+        elif roll < self.timeout_rate + self.failure_rate:
+            return web.Response(status=503, text="Service Unavailable")
+        return None
+
+    # ---------- 路由 ----------
+
+    async def detail(self, request: web.Request) -> web.Response:
+        failure = await self._simulate_network()
+        if failure is not None:
+            return failure
+        package = request.query.get("id", "unknown")
+        version = self.version_of(package)
+        if self.mode == MODE_STATIC:
+            static_version, script = version, ""
+        else:
+            static_version = ""
+            script = JS_TEMPLATE.format(version=version, render_delay_ms=self.render_delay_ms)
+        html = PAGE_TEMPLATE.format(
+            package=package, static_version=static_version, date="2024-01-01",
+            padding=self._padding, script=script
+        )
+        return web.Response(text=html, content_type="text/html", charset="utf-8")
+
+    async def interface_code(self, request: web.Request) -> web.Response:
+        if not self.enable_api:
+            return web.Response(status=404)
+        return web.Response(text=json.dumps("fake-interface-code"), content_type="application/json")
+
+    async def appinfo(self, request: web.Request) -> web.Response:
+        if not self.enable_api:
+            return web.Response(status=404)
+        failure = await self._simulate_network()
+        if failure is not None:
+            return failure
+        payload = await request.json()
+        package = payload.get("pkgName", "unknown")
+        return web.json_response({"pkgName": package, "version": self.version_of(package)})
+
+    async def static_asset(self, request: web.Request) -> web.Response:
+        return web.Response(body=b"\0" * 1024, content_type="application/octet-stream")
+
+    # ---------- 生命周期 ----------
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/app/detail", self.detail)
+        app.router.add_post("/edge/webedge/getInterfaceCode", self.interface_code)
+        app.router.add_post("/edge/webedge/appinfo", self.appinfo)
+        app.router.add_get("/static/{name}", self.static_asset)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def detail_url(self, package: str) -> str:
+        return f"{self.base_url}/app/detail?id={package}"
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.base_url}/edge/webedge"
+
+
+async def _serve_forever(args):
+    server = FakeAppGallery(
+        latency_ms=args.latency_ms, payload_kb=args.payload_kb, mode=args.mode,
+        failure_rate=args.failure_rate, timeout_rate=args.timeout_rate, enable_api=not args.no_api
+    )
+    url = await server.start(port=args.port)
+    print(f"模拟应用市场已启动: {url}/app/detail?id=com.example.app")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟 AppGallery 详情页服务")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--payload-kb", type=int, default=64)
+    parser.add_argument("--mode", choices=[MODE_STATIC, MODE_JS], default=MODE_JS)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--no-api", action="store_true", help="关闭JSON接口，只提供详情页")
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
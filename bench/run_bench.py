@@ -0,0 +1,233 @@
+"""检查流程基准测试
+
+启动本地模拟应用市场，按 10 / 100 / 1000 个应用的规模驱动
+HarmonyAppMonitor._check_all_apps，记录总耗时、每秒页面数、
+峰值内存与Chromium进程数，并将结果写入JSON，便于对比抓取路径的性能回退。
+默认关闭模拟JSON接口，测量的是浏览器渲染路径；加 --api 测量接口快速通道。
+熔断与时间预算始终关闭，失败或超时的详情页同样计入耗时，每秒页面数只统计实际抓取。
+
+用法（在 AstrBot 的运行环境中执行）:
+    python bench/run_bench.py --sizes 10,100,1000 --mode js --output bench_results.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+
+from fake_appgallery import FakeAppGallery, MODE_JS, MODE_STATIC  # noqa: E402
+
+procstat = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.procstat")
+
+
+# ---------- 进程采样 ----------
+
+def sample_process_tree() -> Dict[str, int]:
+    """统计本进程的全部子孙进程：Chromium进程数与整棵进程树的RSS"""
+    if not procstat.available():
+        return {'chromium_processes': 0, 'tree_rss_kb': 0}
+    children = procstat.read_children()
+    descendants = procstat.descendants(os.getpid(), children)
+    chromium = [pid for pid in descendants
+                if any(n in procstat.process_name(pid) for n in procstat.CHROMIUM_NAMES)]
+    tree_rss = procstat.process_rss_kb(os.getpid()) + sum(procstat.process_rss_kb(pid) for pid in descendants)
+    return {'chromium_processes': len(chromium), 'tree_rss_kb': tree_rss}
+
+
+class ProcessSampler:
+    """后台定期采样，记录峰值"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_chromium = 0
+        self.peak_tree_rss_kb = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            sample = await asyncio.get_running_loop().run_in_executor(None, sample_process_tree)
+            self.peak_chromium = max(self.peak_chromium, sample['chromium_processes'])
+            self.peak_tree_rss_kb = max(self.peak_tree_rss_kb, sample['tree_rss_kb'])
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# ---------- 插件驱动 ----------
+
+class BenchContext:
+    """最小化的 AstrBot Context 替身：提供数据目录，消息发送直接成功"""
+
+    def __init__(self, data_dir: str):
+        self._data_dir = data_dir
+        self.sent_messages = 0
+
+    def get_data_dir(self) -> str:
+        return self._data_dir
+
+    async def send_message(self, session, message_chain) -> bool:
+        self.sent_messages += 1
+        return True
+
+
+def load_plugin_class():
+    module = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.main")
+    return module.HarmonyAppMonitor
+
+
+def build_config(server: FakeAppGallery, size: int, args) -> Dict:
+    packages = [f"com.bench.app{i:05d}" for i in range(size)]
+    return {
+        "app_name_list": "\n".join(f"bench{i:05d}" for i in range(size)),
+        "detail_url_list": "\n".join(server.detail_url(p) for p in packages),
+        "version_selector_list": "\n".join("span.content-value" for _ in packages),
+        "check_interval_minutes": 30,
+        "max_concurrency": args.concurrency,
+        "browser_max_pages": args.concurrency,
+        "host_rate_limit": args.host_rate,
+        "enable_http_fast_path": args.http_fast_path,
+        "fetch_profile": args.profile,
+        "enable_history": True,
+        "notification_groups": "bench-group",
+        # 关闭熔断与时间预算：被跳过的详情页不抓取，会虚增每秒页面数
+        "circuit_failure_threshold": 0,
+        "sweep_budget_seconds": 0,
+    }
+
+
+async def run_size(plugin_cls, size: int, args) -> Dict:
+    server = FakeAppGallery(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, payload_kb=args.payload_kb,
+        mode=args.mode, render_delay_ms=args.render_delay_ms, failure_rate=args.failure_rate,
+        timeout_rate=args.timeout_rate, hang_seconds=args.hang_seconds,
+        release_rate=args.release_rate, enable_api=args.api, seed=args.seed
+    )
+    await server.start()
+    data_dir = tempfile.mkdtemp(prefix="harmony_bench_")
+    context = BenchContext(data_dir)
+    monitor = plugin_cls(context, build_config(server, size, args))
+
+    # 基准测试只测量显式触发的检查，关闭后台定时任务
+    monitor._is_running = False
+    if monitor._monitor_task:
+        monitor._monitor_task.cancel()
+    monitor._http_fetcher.api_base = server.api_base
+
+    sampler = ProcessSampler()
+    sampler.start()
+    runs = []
+    try:
+        for i in range(args.rounds):
+            requests_before = server.request_count
+            start = time.perf_counter()
+            await monitor._check_all_apps()
+            wall = time.perf_counter() - start
+            runs.append({
+                'round': i + 1,
+                'wall_seconds': round(wall, 3),
+                'pages_per_second': round(size / wall, 2) if wall > 0 else None,
+                'server_requests': server.request_count - requests_before,
+            })
+            print(f"  [{size}个应用] 第{i + 1}轮: {wall:.2f}秒, {size / wall:.1f} 页/秒")
+    finally:
+        await sampler.stop()
+        monitor.on_disable()
+        await asyncio.sleep(0.5)  # 等待浏览器与会话关闭
+        await server.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    tiers: Dict[str, int] = {}
+    failures = 0
+    for stats in monitor.fetch_stats.values():
+        failures += stats['failures']
+        for tier, count in stats['tiers'].items():
+            tiers[tier] = tiers.get(tier, 0) + count
+
+    phases = {
+        phase: {'count': count, 'p50_ms': round(p50 * 1000, 1),
+                'p95_ms': round(p95 * 1000, 1), 'p99_ms': round(p99 * 1000, 1)}
+        for phase, count, p50, p95, p99 in monitor.metrics.summarize("fetch_phase_seconds", "phase")
+    }
+
+    return {
+        'apps': size,
+        'rounds': runs,
+        'best_wall_seconds': min(r['wall_seconds'] for r in runs),
+        'peak_rss_self_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'peak_rss_tree_kb': sampler.peak_tree_rss_kb,
+        'peak_chromium_processes': sampler.peak_chromium,
+        'tiers': tiers,
+        'fetch_failures': failures,
+        'phases': phases,
+        'http_cache': monitor._http_fetcher.cache_stats(),
+        'browser': monitor._browser_pool.stats(),
+        'notifications_queued': context.sent_messages + len(monitor._outbox),
+    }
+
+
+async def main(args):
+    plugin_cls = load_plugin_class()
+    results = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'params': {k: v for k, v in vars(args).items() if k != 'output'},
+        'results': [],
+    }
+    for size in args.sizes:
+        print(f"运行 {size} 个应用 ...")
+        results['results'].append(await run_size(plugin_cls, size, args))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入: {args.output}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="鸿蒙应用监控检查流程基准测试")
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=[10, 100, 1000],
+                        help="应用数量，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=2, help="每个规模的检查轮数（第二轮起可命中缓存）")
+    parser.add_argument("--mode", choices=[MODE_STATIC, MODE_JS], default=MODE_JS, help="详情页渲染方式")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--payload-kb", type=int, default=64)
+    parser.add_argument("--render-delay-ms", type=int, default=100)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=120)
+    parser.add_argument("--release-rate", type=float, default=0.0, help="每次请求产生新版本的概率")
+    parser.add_argument("--api", action="store_true",
+                        help="开启模拟JSON接口（默认关闭，详情页走浏览器渲染路径）")
+    parser.add_argument("--no-http-fast-path", dest="http_fast_path", action="store_false")
+    parser.add_argument("--profile", choices=["lite", "full"], default="lite")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--host-rate", type=float, default=0.0, help="单主机限速，0为不限速")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,450 @@
+import asyncio
+import importlib.util
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from . import procstat
+
+# 抓取子进程也会导入本模块，不能依赖 AstrBot；在主进程中与 AstrBot 使用同一个日志器
+logger = logging.getLogger("astrbot")
+
+# Playwright 只检查是否已安装，首次启动浏览器时才导入（导入较慢，不拖慢插件加载）
+PLAYWRIGHT_AVAILABLE = importlib.util.find_spec("playwright") is not None
+if not PLAYWRIGHT_AVAILABLE:
+    logger.warning("[鸿蒙监控] Playwright未安装,抓取功能将不可用。")
+
+_playwright_api = None
+
+
+class PlaywrightTimeoutError(Exception):
+    """页面加载或等待元素超时（由 Playwright 的 TimeoutError 转换而来）"""
+
+
+class NavigationError(Exception):
+    """页面未能加载：导航出错或超时，或服务器返回 5xx/429（计入主机熔断）"""
+
+
+def _is_server_error(status: int) -> bool:
+    return status >= 500 or status == 429
+
+
+def _load_playwright():
+    """导入 playwright.async_api（只在首次调用时执行）"""
+    global _playwright_api
+    if _playwright_api is None:
+        start = time.perf_counter()
+        import playwright.async_api as api
+        _playwright_api = api
+        logger.info(f"[鸿蒙监控] Playwright已加载 (耗时{(time.perf_counter() - start) * 1000:.0f}ms)")
+    return _playwright_api
+
+
+def _is_playwright_timeout(error: BaseException) -> bool:
+    return _playwright_api is not None and isinstance(error, _playwright_api.TimeoutError)
+
+
+# 抓取配置：lite 拦截无关资源并以DOM就绪为准，full 保持完整页面加载
+FETCH_PROFILE_LITE = "lite"
+FETCH_PROFILE_FULL = "full"
+
+# lite 模式下直接中止的资源类型
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet", "imageset", "texttrack"})
+
+# 常见统计/埋点域名（按后缀匹配）
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "hm.baidu.com",
+    "cnzz.com",
+    "umeng.com",
+    "hiano.cn",
+    "dtm.huawei.com",
+    "metrics.dbankcloud.cn",
+    "metrics.dbankcloud.com",
+)
+
+
+# 页面加载与等待版本选择器的超时（毫秒）
+GOTO_TIMEOUT_MS = 60000
+SELECTOR_TIMEOUT_MS = 30000
+
+# 关闭浏览器/上下文的等待上限（秒），超过后强制结束进程
+CLOSE_TIMEOUT = 10.0
+
+# 读取页面快照（渲染后的DOM）的等待上限（秒）
+SNAPSHOT_TIMEOUT = 5.0
+
+
+def _is_blocked_host(host: str, blocked_domains: Iterable[str]) -> bool:
+    host = host.lower()
+    return any(host == d or host.endswith("." + d) for d in blocked_domains)
+
+
+class BrowserPool:
+    """共享浏览器池
+
+    插件生命周期内只保留一个常驻的Chromium进程，首次抓取时懒启动。
+    每次抓取分配一个独立的BrowserContext，用完即关，并发数由信号量限制。
+    浏览器崩溃或断开后，下一次获取页面时自动重新启动。
+
+    内存治理：
+    - 浏览器处理满 recycle_pages 个页面，或Chromium进程树RSS超过 memory_limit_mb 时回收：
+      新页面改用新启动的浏览器，旧浏览器在其页面全部结束后关闭
+    - 看门狗定期采样内存，关闭超过 page_deadline 秒仍未结束的页面；
+      关闭本身卡住时强制结束Chromium进程
+    """
+
+    def __init__(self, max_pages: int = 4, headless: bool = True,
+                 profile: str = FETCH_PROFILE_LITE, blocked_domains: Iterable[str] = (),
+                 recycle_pages: int = 0, memory_limit_mb: int = 0, page_deadline: float = 0,
+                 watchdog_interval: float = 10.0):
+        self.max_pages = max(1, int(max_pages))
+        self.headless = headless
+        self.profile = profile
+        self.blocked_domains = tuple(DEFAULT_BLOCKED_DOMAINS) + tuple(d.lower() for d in blocked_domains)
+        self.recycle_pages = max(0, int(recycle_pages))
+        self.memory_limit_mb = max(0, int(memory_limit_mb))
+        self.page_deadline = max(0.0, float(page_deadline))
+        self.watchdog_interval = max(1.0, float(watchdog_interval))
+        self._semaphore = asyncio.Semaphore(self.max_pages)
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._closed = False
+        # 各浏览器实例（含回收中的）当前打开的页面数，及其启动时新增的Chromium进程
+        self._browser_active: Dict[Any, int] = {}
+        self._browser_pids: Dict[Any, List[int]] = {}
+        # 打开中的页面: 序号 -> (开始时间, BrowserContext, 所属浏览器)
+        self._open_pages: Dict[int, Tuple[float, Any, Any]] = {}
+        self._page_ids = itertools.count(1)
+        self._pages_since_launch = 0
+        self._watchdog_task: Optional[asyncio.Task] = None
+        # 统计信息
+        self.launch_count = 0
+        self.crash_count = 0
+        self.active_pages = 0
+        self.blocked_requests = 0
+        self.recycle_count = 0
+        self.watchdog_kills = 0
+        self.chromium_processes = 0
+        self.rss_kb = 0
+        self.peak_rss_kb = 0
+
+    def configure(self, max_pages: int, profile: str, blocked_domains: Iterable[str],
+                  recycle_pages: int, memory_limit_mb: int, page_deadline: float):
+        """修改池参数（/refresh），不重启浏览器，从下一个页面起生效
+
+        页面数上限变化时换用新的信号量，已打开的页面在旧信号量上释放。
+        """
+        max_pages = max(1, int(max_pages))
+        if max_pages != self.max_pages:
+            self.max_pages = max_pages
+            self._semaphore = asyncio.Semaphore(max_pages)
+        self.profile = profile
+        self.blocked_domains = tuple(DEFAULT_BLOCKED_DOMAINS) + tuple(d.lower() for d in blocked_domains)
+        self.recycle_pages = max(0, int(recycle_pages))
+        self.memory_limit_mb = max(0, int(memory_limit_mb))
+        self.page_deadline = max(0.0, float(page_deadline))
+
+    @property
+    def is_alive(self) -> bool:
+        """浏览器是否处于可用状态"""
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _ensure_browser(self):
+        """确保浏览器已启动且健康，必要时重新启动"""
+        async with self._lock:
+            if self._closed:
+                raise RuntimeError("浏览器池已关闭")
+            if self.is_alive:
+                return self._browser
+
+            if self._browser is not None:
+                # 之前启动过但已断开，视为崩溃
+                self.crash_count += 1
+                logger.warning("[鸿蒙监控] 检测到浏览器已断开，正在重新启动")
+                await self._close_browser()
+
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            if self._playwright is None:
+                api = await loop.run_in_executor(None, _load_playwright)
+                self._playwright = await api.async_playwright().start()
+
+            # 启动前后的Chromium进程差集即本浏览器的进程，只统计和结束这些进程（及其子进程）
+            before = set(await loop.run_in_executor(None, procstat.chromium_pids))
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            after = await loop.run_in_executor(None, procstat.chromium_pids)
+            self._browser_pids[self._browser] = [pid for pid in after if pid not in before]
+            self.launch_count += 1
+            self._pages_since_launch = 0
+            logger.info(f"[鸿蒙监控] 浏览器已启动 (第{self.launch_count}次, 耗时{time.perf_counter() - start:.1f}秒)")
+            if self._watchdog_task is None or self._watchdog_task.done():
+                self._watchdog_task = asyncio.create_task(self._watchdog_loop())
+            return self._browser
+
+    async def _close_browser(self):
+        """关闭当前浏览器实例，忽略错误"""
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            await self._close_quietly(browser)
+
+    async def _close_quietly(self, browser):
+        """关闭指定浏览器，卡住时强制结束其Chromium进程"""
+        try:
+            await asyncio.wait_for(browser.close(), timeout=CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("[鸿蒙监控] 关闭浏览器超时，强制结束Chromium进程")
+            await self._force_kill(browser)
+        except Exception as e:
+            logger.debug(f"[鸿蒙监控] 关闭浏览器时出错: {e}")
+        self._browser_pids.pop(browser, None)
+
+    async def _force_kill(self, browser=None):
+        """强制结束浏览器的Chromium进程树（默认当前浏览器，断开后下次使用时重启）"""
+        browser = self._browser if browser is None else browser
+        roots = self._browser_pids.get(browser, [])
+        pids = await asyncio.get_running_loop().run_in_executor(None, procstat.process_tree, roots)
+        killed = procstat.kill_pids(pids)
+        self.watchdog_kills += 1
+        logger.warning(f"[鸿蒙监控] 已强制结束 {killed} 个Chromium进程")
+
+    async def _retire(self, reason: str):
+        """回收当前浏览器：之后的页面使用新浏览器，旧浏览器在页面全部结束后关闭"""
+        async with self._lock:
+            browser = self._browser
+            if browser is None:
+                return
+            self._browser = None
+            self._pages_since_launch = 0
+            self.recycle_count += 1
+        logger.info(f"[鸿蒙监控] 回收浏览器: {reason} (第{self.recycle_count}次)")
+        if not self._browser_active.get(browser):
+            await self._close_quietly(browser)
+
+    async def _release(self, browser):
+        """页面结束后更新计数，满足条件时回收浏览器"""
+        remaining = self._browser_active.get(browser, 1) - 1
+        if remaining > 0:
+            self._browser_active[browser] = remaining
+        else:
+            self._browser_active.pop(browser, None)
+
+        if browser is self._browser:
+            self._pages_since_launch += 1
+            if self.recycle_pages and self._pages_since_launch >= self.recycle_pages:
+                await self._retire(f"已处理{self._pages_since_launch}个页面")
+        elif remaining <= 0:
+            # 已回收的浏览器最后一个页面结束
+            await self._close_quietly(browser)
+
+    # ---------- 看门狗 ----------
+
+    async def _watchdog_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.watchdog_interval)
+            try:
+                await self.check_health()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"[鸿蒙监控] 浏览器看门狗出错: {e}")
+
+    async def check_health(self):
+        """采样Chromium内存，超过上限时回收浏览器；关闭超过期限的页面"""
+        if procstat.available():
+            roots = [pid for pids in self._browser_pids.values() for pid in pids]
+            count, rss_kb = await asyncio.get_running_loop().run_in_executor(None, procstat.tree_rss_kb, roots)
+            self.chromium_processes, self.rss_kb = count, rss_kb
+            self.peak_rss_kb = max(self.peak_rss_kb, rss_kb)
+            # 新浏览器尚未处理页面时不重复回收（内存可能来自还在收尾的旧浏览器）
+            if (self.memory_limit_mb and rss_kb > self.memory_limit_mb * 1024
+                    and self._browser is not None and self._pages_since_launch > 0):
+                await self._retire(f"内存 {rss_kb // 1024}MB 超过上限 {self.memory_limit_mb}MB")
+
+        if self.page_deadline:
+            now = time.monotonic()
+            for page_id, (started, context, browser) in list(self._open_pages.items()):
+                if now - started <= self.page_deadline:
+                    continue
+                self._open_pages.pop(page_id, None)
+                self.watchdog_kills += 1
+                logger.warning(f"[鸿蒙监控] 页面超过{self.page_deadline:.0f}秒未结束，强制关闭")
+                try:
+                    await asyncio.wait_for(context.close(), timeout=CLOSE_TIMEOUT)
+                except Exception:
+                    await self._force_kill(browser)
+
+    async def restart(self):
+        """强制重启浏览器"""
+        async with self._lock:
+            await self._close_browser()
+        await self._ensure_browser()
+
+    @property
+    def wait_until(self) -> str:
+        """page.goto 的等待条件，lite 模式下由版本选择器作为就绪信号"""
+        return "domcontentloaded" if self.profile == FETCH_PROFILE_LITE else "networkidle"
+
+    async def _route_handler(self, route):
+        """拦截图片、字体、样式等资源及埋点请求"""
+        request = route.request
+        try:
+            if (request.resource_type in BLOCKED_RESOURCE_TYPES
+                    or _is_blocked_host(urlparse(request.url).hostname or "", self.blocked_domains)):
+                self.blocked_requests += 1
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception as e:
+            # 页面关闭时路由可能已失效
+            logger.debug(f"[鸿蒙监控] 请求拦截处理失败: {e}")
+
+    @asynccontextmanager
+    async def page(self):
+        """获取一个隔离的页面，退出时关闭其所属的BrowserContext"""
+        async with self._semaphore:
+            browser = await self._ensure_browser()
+            try:
+                context = await browser.new_context()
+            except Exception as e:
+                # 健康检查失败：浏览器可能处于僵死状态，重启后再试一次
+                logger.warning(f"[鸿蒙监控] 创建浏览器上下文失败，重启浏览器: {e}")
+                self.crash_count += 1
+                await self.restart()
+                browser = self._browser
+                context = await browser.new_context()
+
+            page_id = next(self._page_ids)
+            self._open_pages[page_id] = (time.monotonic(), context, browser)
+            self._browser_active[browser] = self._browser_active.get(browser, 0) + 1
+            self.active_pages += 1
+            try:
+                if self.profile == FETCH_PROFILE_LITE:
+                    await context.route("**/*", self._route_handler)
+                page = await context.new_page()
+                yield page
+            finally:
+                self.active_pages -= 1
+                self._open_pages.pop(page_id, None)
+                try:
+                    await asyncio.wait_for(context.close(), timeout=CLOSE_TIMEOUT)
+                except Exception as e:
+                    logger.debug(f"[鸿蒙监控] 关闭浏览器上下文时出错: {e}")
+                await self._release(browser)
+
+    async def close(self):
+        """关闭浏览器与Playwright驱动"""
+        if self._watchdog_task is not None:
+            self._watchdog_task.cancel()
+        async with self._lock:
+            self._closed = True
+            await self._close_browser()
+            # 仍在收尾的已回收浏览器
+            for browser in list(self._browser_active):
+                await self._close_quietly(browser)
+            self._browser_active.clear()
+            playwright, self._playwright = self._playwright, None
+            if playwright is not None:
+                try:
+                    await playwright.stop()
+                except Exception as e:
+                    logger.debug(f"[鸿蒙监控] 停止Playwright时出错: {e}")
+        logger.info("[鸿蒙监控] 浏览器池已关闭")
+
+    def stats(self) -> dict:
+        """浏览器池统计信息"""
+        return {
+            'alive': self.is_alive,
+            'max_pages': self.max_pages,
+            'active_pages': self.active_pages,
+            'launch_count': self.launch_count,
+            'crash_count': self.crash_count,
+            'profile': self.profile,
+            'blocked_requests': self.blocked_requests,
+            'recycle_count': self.recycle_count,
+            'watchdog_kills': self.watchdog_kills,
+            'pages_since_launch': self._pages_since_launch,
+            'chromium_processes': self.chromium_processes,
+            'rss_mb': round(self.rss_kb / 1024, 1),
+            'peak_rss_mb': round(self.peak_rss_kb / 1024, 1),
+        }
+
+
+@contextmanager
+def _timed(phases: Dict[str, float], name: str):
+    """记录一个阶段的耗时（出错时同样记录）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = time.perf_counter() - start
+
+
+async def _snapshot(page, capture: Optional[Dict[str, str]], phases: Dict[str, float]):
+    """把渲染后的DOM写入 capture['html']，失败时忽略"""
+    if capture is None:
+        return
+    try:
+        with _timed(phases, "snapshot"):
+            capture['html'] = await asyncio.wait_for(page.content(), timeout=SNAPSHOT_TIMEOUT)
+    except Exception as e:
+        logger.debug(f"[鸿蒙监控] 读取页面快照失败: {e}")
+
+
+async def fetch_rendered(pool: "BrowserPool", url: str, extractor, phases: Dict[str, float],
+                         timeout: Optional[float] = None,
+                         capture: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """在浏览器池的页面中加载链接并提取字段
+
+    extractor 需提供 version_selector 与 extract_page(page)（ExtractionSpec 或 ListSource），
+    各阶段耗时（秒）写入 phases。timeout 为整个抓取的时间预算（秒），为空时使用各阶段的默认超时。
+    capture 不为空时，页面加载后（选择器等待失败时同样）把渲染后的DOM存入 capture['html']。
+    """
+    start = time.perf_counter()
+
+    def budget_ms(default_ms: int) -> float:
+        if timeout is None:
+            return default_ms
+        remaining = (timeout - (time.perf_counter() - start)) * 1000
+        return max(1000.0, min(default_ms, remaining))
+
+    try:
+        async with pool.page() as page:
+            # 等待空闲页面及可能的浏览器启动
+            phases["acquire"] = time.perf_counter() - start
+
+            # lite模式只等DOM就绪，以版本选择器出现作为页面可用的信号
+            with _timed(phases, "goto"):
+                try:
+                    response = await page.goto(url, wait_until=pool.wait_until, timeout=budget_ms(GOTO_TIMEOUT_MS))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    raise NavigationError(str(e) or type(e).__name__) from e
+            if response is not None and _is_server_error(response.status):
+                raise NavigationError(f"HTTP {response.status}")
+            try:
+                with _timed(phases, "wait_selector"):
+                    await page.wait_for_selector(extractor.version_selector, timeout=budget_ms(SELECTOR_TIMEOUT_MS))
+
+                # 一次 evaluate 取回全部字段
+                with _timed(phases, "extract"):
+                    record = await extractor.extract_page(page)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 选择器失效时的快照最有用，便于离线调试
+                await _snapshot(page, capture, phases)
+                raise
+            await _snapshot(page, capture, phases)
+            return record
+    except Exception as e:
+        if _is_playwright_timeout(e):
+            raise PlaywrightTimeoutError(str(e)) from e
+        raise
@@ -0,0 +1,244 @@
+import time
+from typing import Dict, List, Optional
+
+# 熔断状态
+STATE_CLOSED = "closed"        # 正常放行
+STATE_OPEN = "open"            # 熔断中，直接跳过
+STATE_HALF_OPEN = "half_open"  # 冷却结束，只放行一个探测请求
+
+# 自适应超时的下限（秒）：即使主机很快，也给偶发的慢请求留出余量
+MIN_TIMEOUT = 15.0
+
+
+class FetchSkippedError(Exception):
+    """本次抓取未执行，沿用最后一次成功获取的版本"""
+
+
+class CircuitOpenError(FetchSkippedError):
+    """主机熔断中，本次抓取被跳过"""
+
+
+class BudgetExhaustedError(FetchSkippedError):
+    """时间预算已用完，剩余抓取顺延到下次"""
+
+
+class FetchAttempt:
+    """一次抓取中主机的响应情况，决定计入熔断的结果
+
+    - responded: 主机有响应（包括选择器未命中、4xx 等页面问题），按成功计
+    - failed: 传输层失败（导航出错、超时、HTTP 5xx/429），且主机没有任何响应时按失败计
+    - 两者都没有（例如全部由缓存或其他主机的接口应答）时不计入熔断
+    """
+
+    __slots__ = ("samples", "responses", "failure")
+
+    def __init__(self):
+        self.samples: Dict[str, float] = {}   # 抓取层级 -> 本次耗时（秒）
+        self.responses = 0
+        self.failure: Optional[str] = None
+
+    def responded(self, tier: str, seconds: Optional[float] = None):
+        """主机有响应；seconds 不为空时作为该层级的延迟样本"""
+        self.responses += 1
+        if seconds is not None:
+            self.samples[tier] = seconds
+
+    def failed(self, reason: str):
+        self.failure = reason
+
+    @property
+    def outcome(self) -> Optional[bool]:
+        if self.responses:
+            return True
+        if self.failure is not None:
+            return False
+        return None
+
+
+class LatencyEstimator:
+    """平滑均值 + 4倍平均偏差的超时估计（同TCP重传超时的算法）"""
+
+    __slots__ = ("srtt", "rttvar")
+
+    def __init__(self, seconds: float):
+        self.srtt = seconds
+        self.rttvar = seconds / 2
+
+    def observe(self, seconds: float):
+        self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - seconds)
+        self.srtt = 0.875 * self.srtt + 0.125 * seconds
+
+    @property
+    def timeout(self) -> float:
+        return self.srtt + 4 * self.rttvar
+
+
+class HostCircuit:
+    """单个主机的熔断器与延迟估计
+
+    - 连续失败达到阈值后熔断，冷却期内的请求直接跳过
+    - 冷却结束后只放行一个探测请求：成功则恢复，失败则重新熔断
+    - 按抓取层级分别估计延迟：接口几百毫秒的应答不会压低浏览器渲染的超时
+    """
+
+    __slots__ = ("host", "state", "failures", "opened_at", "open_count", "probing", "latency")
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = STATE_CLOSED
+        self.failures = 0           # 连续失败次数
+        self.opened_at = 0.0        # 最近一次熔断的时间（monotonic）
+        self.open_count = 0         # 累计熔断次数
+        self.probing = False        # 半开状态下探测请求是否已发出
+        self.latency: Dict[str, LatencyEstimator] = {}   # 抓取层级 -> 延迟估计
+
+    def observe_latency(self, tier: str, seconds: float):
+        estimator = self.latency.get(tier)
+        if estimator is None:
+            self.latency[tier] = LatencyEstimator(seconds)
+        else:
+            estimator.observe(seconds)
+
+
+class CircuitBreakers:
+    """按主机名划分的熔断器
+
+    threshold <= 0 时不熔断，只做延迟估计。
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 300.0, max_timeout: float = 90.0):
+        self.threshold = int(threshold)
+        self.cooldown = max(1.0, float(cooldown))
+        self.max_timeout = max(MIN_TIMEOUT, float(max_timeout))
+        self._circuits: Dict[str, HostCircuit] = {}
+
+    def get(self, host: str) -> HostCircuit:
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = HostCircuit(host)
+        return circuit
+
+    def is_open(self, host: str) -> bool:
+        """主机是否处于熔断中（不改变状态，冷却结束待探测时返回 False）"""
+        circuit = self._circuits.get(host)
+        if circuit is None or circuit.state == STATE_CLOSED:
+            return False
+        if circuit.state == STATE_HALF_OPEN:
+            return circuit.probing
+        return time.monotonic() - circuit.opened_at < self.cooldown
+
+    def allow(self, host: str) -> bool:
+        """是否放行一次请求；冷却结束后的第一个请求作为探测请求放行"""
+        circuit = self.get(host)
+        if circuit.state == STATE_CLOSED:
+            return True
+        if circuit.state == STATE_OPEN:
+            if time.monotonic() - circuit.opened_at < self.cooldown:
+                return False
+            circuit.state = STATE_HALF_OPEN
+            circuit.probing = False
+        if circuit.probing:
+            return False
+        circuit.probing = True
+        return True
+
+    def record(self, host: str, ok: bool, samples: Optional[Dict[str, float]] = None):
+        """记录一次放行请求的结果，samples 为 抓取层级 -> 耗时（秒）"""
+        circuit = self.get(host)
+        circuit.probing = False
+        if ok:
+            circuit.state = STATE_CLOSED
+            circuit.failures = 0
+            for tier, seconds in (samples or {}).items():
+                circuit.observe_latency(tier, seconds)
+            return
+        circuit.failures += 1
+        if circuit.state == STATE_HALF_OPEN or (self.threshold > 0 and circuit.failures >= self.threshold):
+            if circuit.state != STATE_OPEN:
+                circuit.open_count += 1
+            circuit.state = STATE_OPEN
+            circuit.opened_at = time.monotonic()
+
+    def release(self, host: str):
+        """放行的请求被取消（未得出结果），允许下一个请求重新探测"""
+        circuit = self._circuits.get(host)
+        if circuit is not None:
+            circuit.probing = False
+
+    def timeout_for(self, host: str, tier: str) -> float:
+        """按该主机该层级观测到的延迟给出本次请求的超时，尚无样本时使用上限"""
+        circuit = self._circuits.get(host)
+        estimator = circuit.latency.get(tier) if circuit is not None else None
+        if estimator is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(MIN_TIMEOUT, estimator.timeout))
+
+    def open_hosts(self) -> List[str]:
+        return [host for host in self._circuits if self.is_open(host)]
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {
+            host: {
+                'state': circuit.state,
+                'failures': circuit.failures,
+                'open_count': circuit.open_count,
+                'timeouts': {tier: round(self.timeout_for(host, tier), 1) for tier in circuit.latency},
+            }
+            for host, circuit in self._circuits.items()
+        }
+
+
+class SweepBudget:
+    """按时间窗口累计的抓取时间预算
+
+    定时检查按各详情页的到期时间逐个派发，单批往往只有一个详情页，按批计算的预算不起作用；
+    这里累计窗口内“有抓取在进行”的墙钟时间（并发的抓取只计一次，与并发数无关），
+    用完后到窗口结束前不再发起新的定时抓取。seconds <= 0 时不限制。
+    """
+
+    __slots__ = ("seconds", "window", "window_start", "spent", "active", "busy_since")
+
+    def __init__(self, seconds: float, window: float):
+        self.window_start = time.monotonic()
+        self.spent = 0.0
+        self.active = 0             # 正在进行的抓取数
+        self.busy_since = 0.0       # 本段忙碌时间的起点
+        self.configure(seconds, window)
+
+    def configure(self, seconds: float, window: float):
+        self.seconds = max(0.0, float(seconds))
+        self.window = max(1.0, float(window))
+
+    def _roll(self, now: float):
+        if now - self.window_start >= self.window:
+            self.window_start = now
+            self.spent = 0.0
+            if self.active:
+                self.busy_since = now
+
+    def _used(self, now: float) -> float:
+        return self.spent + (now - self.busy_since if self.active else 0.0)
+
+    def remaining(self, now: Optional[float] = None) -> Optional[float]:
+        """本窗口剩余的预算（秒），不限制时返回 None"""
+        if self.seconds <= 0:
+            return None
+        now = time.monotonic() if now is None else now
+        self._roll(now)
+        return max(0.0, self.seconds - self._used(now))
+
+    def begin(self, now: Optional[float] = None):
+        """一次抓取开始（限速等待之后）"""
+        now = time.monotonic() if now is None else now
+        self._roll(now)
+        if not self.active:
+            self.busy_since = now
+        self.active += 1
+
+    def end(self, now: Optional[float] = None):
+        """一次抓取结束，与 begin 成对调用"""
+        now = time.monotonic() if now is None else now
+        self._roll(now)
+        self.active = max(0, self.active - 1)
+        if not self.active:
+            self.spent += max(0.0, now - self.busy_since)
@@ -0,0 +1,191 @@
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS instances (
+    instance_id TEXT PRIMARY KEY,
+    heartbeat   REAL NOT NULL,
+    started     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    shard   INTEGER PRIMARY KEY,
+    owner   TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS announcements (
+    app_key     TEXT NOT NULL,
+    version     TEXT NOT NULL,
+    instance_id TEXT NOT NULL,
+    claimed_at  REAL NOT NULL,
+    PRIMARY KEY (app_key, version)
+);
+"""
+
+# 通知去重记录的保留时间（秒）
+ANNOUNCEMENT_TTL = 90 * 86400
+
+
+def shard_of(key: str, shard_count: int) -> int:
+    """目标键 -> 分片号（各实例、各次启动结果一致）"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count
+
+
+class ClusterCoordinator:
+    """基于共享SQLite文件的多实例协调
+
+    - 每个实例定期写入心跳，超过租约时长未更新的实例视为已离开
+    - 监控列表按目标键哈希分为固定数量的分片，实例以有期限的租约认领分片，
+      每次心跳续约；每个实例最多持有 ceil(分片数 / 存活实例数) 个分片，
+      有实例加入时多出的分片被释放，实例离开后其租约过期、由其他实例接手
+    - 通知按 (应用, 版本) 去重：先写入记录的实例负责发送
+
+    所有写操作都在 BEGIN IMMEDIATE 事务中完成（跨进程互斥）。
+    所有方法都是同步的，由调用方放到线程池中执行。
+    """
+
+    def __init__(self, path: str, instance_id: str, shard_count: int = 16, lease_seconds: float = 60.0):
+        self.path = path
+        self.instance_id = instance_id
+        self.shard_count = max(1, int(shard_count))
+        self.lease_seconds = max(10.0, float(lease_seconds))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.owned: Set[int] = set()
+        self.owned_until = 0.0       # 本地视角下租约的有效期（time.time）
+        self.live_instances = 0
+
+    def open(self):
+        with self._lock:
+            if self._conn is not None:
+                return
+            # 手动管理事务；busy timeout 等待其他实例的写事务
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.executescript(SCHEMA)
+            self._conn = conn
+
+    def close(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+            if conn is not None:
+                conn.close()
+
+    def owns(self, key: str) -> bool:
+        return shard_of(key, self.shard_count) in self.owned
+
+    @property
+    def lease_valid(self) -> bool:
+        return time.time() < self.owned_until
+
+    def heartbeat(self) -> Set[int]:
+        """写入心跳、续约并按公平份额认领或释放分片，返回当前持有的分片"""
+        with self._lock:
+            conn = self._conn
+            now = time.time()
+            expires = now + self.lease_seconds
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO instances (instance_id, heartbeat, started) VALUES (?, ?, ?) "
+                    "ON CONFLICT(instance_id) DO UPDATE SET heartbeat = excluded.heartbeat",
+                    (self.instance_id, now, now)
+                )
+                conn.execute("DELETE FROM instances WHERE heartbeat < ?", (now - self.lease_seconds,))
+                live = conn.execute("SELECT COUNT(*) FROM instances").fetchone()[0]
+                share = math.ceil(self.shard_count / max(1, live))
+
+                # 分片数变化（配置修改）后超出范围的租约直接丢弃
+                conn.execute("DELETE FROM leases WHERE shard >= ?", (self.shard_count,))
+                conn.execute(
+                    "UPDATE leases SET expires = ? WHERE owner = ? AND expires >= ?",
+                    (expires, self.instance_id, now)
+                )
+                owned = [row[0] for row in conn.execute(
+                    "SELECT shard FROM leases WHERE owner = ? AND expires >= ? ORDER BY shard",
+                    (self.instance_id, now)
+                )]
+                if len(owned) > share:
+                    # 有新实例加入：释放多出的分片，由其在下次心跳时认领
+                    extra = owned[share:]
+                    conn.executemany("DELETE FROM leases WHERE shard = ?", [(shard,) for shard in extra])
+                    owned = owned[:share]
+                elif len(owned) < share:
+                    held = {row[0]: row[1] for row in conn.execute(
+                        "SELECT shard, expires FROM leases WHERE owner != ?", (self.instance_id,)
+                    )}
+                    free = [shard for shard in range(self.shard_count)
+                            if shard not in owned and held.get(shard, 0) < now]
+                    for shard in free[:share - len(owned)]:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO leases (shard, owner, expires) VALUES (?, ?, ?)",
+                            (shard, self.instance_id, expires)
+                        )
+                        owned.append(shard)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.owned = set(owned)
+            self.owned_until = expires
+            self.live_instances = live
+            return set(self.owned)
+
+    def leave(self):
+        """退出集群：删除心跳并释放全部租约，其他实例在下次心跳时接手"""
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM leases WHERE owner = ?", (self.instance_id,))
+                conn.execute("DELETE FROM instances WHERE instance_id = ?", (self.instance_id,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.owned = set()
+            self.owned_until = 0.0
+
+    def claim_announcements(self, items: List[tuple]) -> List[bool]:
+        """认领一组 (应用, 版本) 的通知权，返回各项是否由本实例发送
+
+        同一版本只有第一个认领的实例得到 True；本实例重复认领自己的记录同样返回 True
+        （如上次发送前被中断）。
+        """
+        with self._lock:
+            conn = self._conn
+            now = time.time()
+            result = []
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM announcements WHERE claimed_at < ?", (now - ANNOUNCEMENT_TTL,))
+                for app_key, version in items:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO announcements (app_key, version, instance_id, claimed_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (app_key, version, self.instance_id, now)
+                    )
+                    owner = conn.execute(
+                        "SELECT instance_id FROM announcements WHERE app_key = ? AND version = ?",
+                        (app_key, version)
+                    ).fetchone()[0]
+                    result.append(owner == self.instance_id)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'instance_id': self.instance_id,
+            'live_instances': self.live_instances,
+            'owned_shards': len(self.owned),
+            'shard_count': self.shard_count,
+            'lease_valid': self.lease_valid,
+        }
@@ -0,0 +1,178 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 版本号字段名，每个提取规则都必须包含
+VERSION_FIELD = "version"
+
+# 在页面内一次性读取所有字段的脚本，参数为 [[字段名, 选择器], ...]
+EXTRACT_JS = """
+(fields) => {
+    const out = {};
+    for (const [name, selector] of fields) {
+        let el = null;
+        try {
+            el = document.querySelector(selector);
+        } catch (e) {
+            el = null;
+        }
+        out[name] = el ? (el.textContent || "").trim() : null;
+    }
+    return out;
+}
+"""
+
+# 单个字段规则: (字段名, CSS选择器, 正则后处理)
+FieldRule = Tuple[str, str, str]
+
+# 合并多个别名的规则时，别名序号与字段名之间的分隔符
+ALIAS_SEPARATOR = "\x1f"
+
+
+class ExtractionSpec:
+    """一组命名字段的提取规则
+
+    每个字段由CSS选择器定位，可选一个正则做后处理：
+    正则有分组时取第一个分组，否则取整个匹配。
+    同一个规则对象既用于浏览器页面（单次 page.evaluate），也用于静态HTML。
+    """
+
+    __slots__ = ("rules", "_patterns", "_js_args")
+
+    def __init__(self, rules: Sequence[FieldRule]):
+        self.rules: Tuple[FieldRule, ...] = tuple(rules)
+        self._patterns: Dict[str, Optional["re.Pattern"]] = {
+            name: re.compile(regex) if regex else None for name, _, regex in self.rules
+        }
+        self._js_args: List[List[str]] = [[name, selector] for name, selector, _ in self.rules]
+
+    @property
+    def version_selector(self) -> str:
+        """用于判断页面就绪的选择器
+
+        合并规则时为各别名版本选择器的并集（逗号连接），任一别名的版本出现即视为就绪，
+        单个别名的选择器失效不会拖累同一页面的其他别名。
+        """
+        selectors: List[str] = []
+        for name, selector, _ in self.rules:
+            if name.rpartition(ALIAS_SEPARATOR)[2] == VERSION_FIELD and selector not in selectors:
+                selectors.append(selector)
+        return ", ".join(selectors)
+
+    @property
+    def field_names(self) -> List[str]:
+        return [name for name, _, _ in self.rules]
+
+    @property
+    def has_extra_fields(self) -> bool:
+        return any(name.rpartition(ALIAS_SEPARATOR)[2] != VERSION_FIELD for name, _, _ in self.rules)
+
+    def _post_process(self, name: str, text: Optional[str]) -> str:
+        if not text:
+            return ""
+        text = text.strip()
+        pattern = self._patterns.get(name)
+        if pattern is None:
+            return text
+        match = pattern.search(text)
+        if not match:
+            return ""
+        return (match.group(1) if match.groups() else match.group(0)).strip()
+
+    def _finish(self, raw: Dict[str, Optional[str]]) -> Dict[str, str]:
+        record = {}
+        for name, _, _ in self.rules:
+            value = self._post_process(name, raw.get(name))
+            if value:
+                record[name] = value
+        return record
+
+    def version_record(self, text: str) -> Dict[str, str]:
+        """把页面以外来源的版本文本（如JSON接口）按各版本字段的正则后处理
+
+        结果与页面提取的记录结构相同（合并规则时每个别名各有一个版本字段），
+        不同层级取得的版本号格式一致，不会被误判为更新。
+        """
+        return self._finish({
+            name: text for name, _, _ in self.rules
+            if name.rpartition(ALIAS_SEPARATOR)[2] == VERSION_FIELD
+        })
+
+    async def extract_page(self, page) -> Dict[str, str]:
+        """在浏览器页面中一次往返取回所有字段"""
+        raw = await page.evaluate(EXTRACT_JS, self._js_args)
+        return self._finish(raw or {})
+
+    def extract_soup(self, soup) -> Dict[str, str]:
+        """从BeautifulSoup文档中提取所有字段"""
+        raw = {}
+        for name, selector, _ in self.rules:
+            try:
+                node = soup.select_one(selector)
+            except Exception:
+                node = None
+            raw[name] = node.get_text(strip=True) if node else None
+        return self._finish(raw)
+
+
+@lru_cache(maxsize=256)
+def compile_spec(rules: Tuple[FieldRule, ...]) -> ExtractionSpec:
+    """编译并缓存提取规则，相同规则在多轮检查间复用"""
+    return ExtractionSpec(rules)
+
+
+def merge_specs(specs: Sequence[ExtractionSpec]) -> ExtractionSpec:
+    """合并同一页面上多个别名的提取规则，使页面只需加载一次
+
+    第一个规则保持原字段名，其余规则的字段名加上别名序号前缀，由 split_record 拆回。
+    合并后的 version_selector 为各别名版本选择器的并集。
+    """
+    if len(specs) == 1:
+        return specs[0]
+    rules = list(specs[0].rules)
+    for index, spec in enumerate(specs[1:], 1):
+        rules.extend((f"{index}{ALIAS_SEPARATOR}{name}", selector, regex) for name, selector, regex in spec.rules)
+    return compile_spec(tuple(rules))
+
+
+def split_record(record: Dict[str, str], count: int) -> List[Dict[str, str]]:
+    """将合并规则的提取结果拆分为每个规则各自的记录
+
+    某个别名的选择器未命中时其记录中没有对应字段（不沿用其他别名的结果），
+    由调用方按选择器失效处理。页面以外的来源需先经 ExtractionSpec.version_record 生成各别名的版本。
+    """
+    parts: List[Dict[str, str]] = [{} for _ in range(count)]
+    for name, value in record.items():
+        prefix, sep, field = name.partition(ALIAS_SEPARATOR)
+        if sep and prefix.isdigit() and int(prefix) < count:
+            parts[int(prefix)][field] = value
+        else:
+            parts[0][name] = value
+    return parts
+
+
+def parse_field_rules(lines: Sequence[str]) -> Dict[str, List[FieldRule]]:
+    """解析字段配置行
+
+    每行格式: 应用名称|字段名|CSS选择器|正则(可选)
+    应用名称为 * 时对所有应用生效。返回 {应用名称: [规则, ...]}。
+    """
+    result: Dict[str, List[FieldRule]] = {}
+    for line in lines:
+        parts = [p.strip() for p in line.split("|", 3)]
+        if len(parts) < 3 or not parts[0] or not parts[1] or not parts[2]:
+            raise ValueError(f"字段规则格式错误: {line}")
+        regex = parts[3] if len(parts) > 3 else ""
+        if regex:
+            re.compile(regex)  # 提前校验正则
+        result.setdefault(parts[0], []).append((parts[1], parts[2], regex))
+    return result
+
+
+def build_rules(version_selector: str, app_rules: Sequence[FieldRule] = (),
+                common_rules: Sequence[FieldRule] = ()) -> Tuple[FieldRule, ...]:
+    """合并版本选择器、公共字段与应用专属字段（后者覆盖前者）"""
+    merged: Dict[str, FieldRule] = {VERSION_FIELD: (VERSION_FIELD, version_selector, "")}
+    for rule in list(common_rules) + list(app_rules):
+        merged[rule[0]] = rule
+    return tuple(merged.values())
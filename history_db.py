@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 单次观测: (应用标识, 版本号, 观测时间戳, 抓取耗时毫秒)
+Observation = Tuple[str, str, int, Optional[int]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS version_history (
+    id         INTEGER PRIMARY KEY,
+    app_key    TEXT    NOT NULL,
+    version    TEXT    NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen  INTEGER NOT NULL,
+    fetch_ms   INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_history_app_time ON version_history (app_key, first_seen);
+CREATE INDEX IF NOT EXISTS idx_history_last_seen ON version_history (last_seen);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class HistoryDB:
+    """基于SQLite的版本历史库
+
+    每个 (应用, 版本) 只占一行：版本不变时仅更新 last_seen，
+    出现新版本时追加一行。按应用和时间建立索引，查询不需要加载全表。
+    所有方法都是同步的，由调用方放到线程池中执行。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            if self._conn is not None:
+                return
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.commit()
+            self._conn = conn
+
+    def close(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+            if conn is not None:
+                conn.close()
+
+    def import_legacy(self, items: Iterable[Tuple[str, str]]) -> int:
+        """一次性导入旧版 harmony_versions.json 中的最新版本，返回导入条数"""
+        with self._lock:
+            conn = self._conn
+            row = conn.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+            if row is not None:
+                return 0
+            now = int(time.time())
+            count = 0
+            with conn:
+                for app_key, version in items:
+                    if not version:
+                        continue
+                    exists = conn.execute(
+                        "SELECT 1 FROM version_history WHERE app_key = ? AND version = ? LIMIT 1",
+                        (app_key, version)
+                    ).fetchone()
+                    if exists is None:
+                        conn.execute(
+                            "INSERT INTO version_history (app_key, version, first_seen, last_seen, fetch_ms) "
+                            "VALUES (?, ?, ?, ?, NULL)",
+                            (app_key, version, now, now)
+                        )
+                        count += 1
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(now),))
+            return count
+
+    def record_sweep(self, observations: List[Observation]) -> int:
+        """在一个事务中写入一轮检查的全部观测，返回新增版本数"""
+        if not observations:
+            return 0
+        with self._lock:
+            conn = self._conn
+            inserted = 0
+            with conn:
+                for app_key, version, seen_at, fetch_ms in observations:
+                    # 最新一行即最后插入的一行，不依赖系统时钟单调
+                    latest = conn.execute(
+                        "SELECT id, version FROM version_history WHERE app_key = ? "
+                        "ORDER BY id DESC LIMIT 1",
+                        (app_key,)
+                    ).fetchone()
+                    if latest is not None and latest[1] == version:
+                        # 列表页得到的观测没有抓取耗时，保留详情页上次的耗时
+                        conn.execute(
+                            "UPDATE version_history SET last_seen = ?, fetch_ms = COALESCE(?, fetch_ms) WHERE id = ?",
+                            (seen_at, fetch_ms, latest[0])
+                        )
+                    else:
+                        conn.execute(
+                            "INSERT INTO version_history (app_key, version, first_seen, last_seen, fetch_ms) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (app_key, version, seen_at, seen_at, fetch_ms)
+                        )
+                        inserted += 1
+            return inserted
+
+    def query(self, app_key: str, limit: int = 10) -> List[Tuple[str, int, int, Optional[int]]]:
+        """按时间倒序返回应用最近的版本: [(版本, 首次发现, 最后确认, 抓取耗时), ...]"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT version, first_seen, last_seen, fetch_ms FROM version_history "
+                "WHERE app_key = ? ORDER BY first_seen DESC, id DESC LIMIT ?",
+                (app_key, limit)
+            ).fetchall()
+
+    def last_seen_times(self) -> Dict[str, int]:
+        """各应用最后一次成功检查的时间戳: {应用标识: last_seen}"""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT app_key, MAX(last_seen) FROM version_history GROUP BY app_key"
+            ).fetchall())
+
+    def count(self, app_key: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM version_history WHERE app_key = ?", (app_key,)
+            ).fetchone()[0]
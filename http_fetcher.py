@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .circuit import FetchAttempt
+from .extractor import VERSION_FIELD
+from .singleflight import SingleFlight
+from .watchlist import parse_package_id
+
+logger = logging.getLogger("astrbot")
+
+# 动态导入aiohttp / BeautifulSoup，缺失时快速通道自动关闭
+AIOHTTP_AVAILABLE = False
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    logger.warning("[鸿蒙监控] aiohttp未安装,HTTP快速通道将不可用。")
+
+BS4_AVAILABLE = False
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    logger.warning("[鸿蒙监控] beautifulsoup4未安装,静态页面解析将不可用。")
+
+# AppGallery 网页版（SPA）获取应用详情时调用的接口
+APPGALLERY_API_BASE = "https://web-drcn.hispace.dbankcloud.com/edge/webedge"
+INTERFACE_CODE_TTL = 600    # 接口码缓存时间（秒）
+INTERFACE_CODE_RETRY = 300  # 获取接口码失败后暂停请求的时间（秒）
+API_NEGATIVE_TTL = 600      # 接口查询失败的包名暂停查询的时间（秒）
+MAX_VALIDATORS = 4096     # 条件请求校验信息的最大缓存条数
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "zh-CN,zh;q=0.9",
+}
+
+# 抓取层级名称
+TIER_API = "api"
+TIER_HTML = "html"
+TIER_BROWSER = "browser"
+
+
+class Validators:
+    """单个URL的条件请求校验信息及上次的提取结果"""
+
+    __slots__ = ("etag", "last_modified", "body_hash", "record")
+
+    def __init__(self):
+        self.etag = ""
+        self.last_modified = ""
+        self.body_hash = ""
+        self.record: Dict[str, str] = {}
+
+
+def _body_hash(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class HttpFetcher:
+    """轻量HTTP抓取器
+
+    不启动浏览器，依次尝试：
+    1. AppGallery 网页版调用的 JSON 接口（按包名查询）
+    2. 直接请求详情页HTML并用CSS选择器解析
+    """
+
+    def __init__(self, timeout: float = 15.0, debug: bool = False, api_base: str = APPGALLERY_API_BASE):
+        self.timeout = timeout
+        self.debug = debug
+        self.api_base = api_base.rstrip("/")
+        self._session = None
+        self._interface_code = ""
+        self._interface_code_time = 0.0
+        self._interface_code_failed = 0.0
+        self._interface_code_lock = asyncio.Lock()
+        self._api_flights = SingleFlight()
+        self._api_failures: Dict[str, float] = {}   # 包名 -> 接口查询失败的时间
+        self._identity_id = uuid.uuid4().hex
+        self._validators: "OrderedDict[tuple, Validators]" = OrderedDict()
+        # 条件请求统计
+        self.not_modified_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+
+    @property
+    def available(self) -> bool:
+        return AIOHTTP_AVAILABLE
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=DEFAULT_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    def _get_validators(self, key: tuple) -> Validators:
+        """按键获取校验信息（LRU，超出上限时淘汰最久未用的）"""
+        validators = self._validators.get(key)
+        if validators is None:
+            validators = self._validators[key] = Validators()
+            while len(self._validators) > MAX_VALIDATORS:
+                self._validators.popitem(last=False)
+        else:
+            self._validators.move_to_end(key)
+        return validators
+
+    def cache_stats(self) -> Dict[str, float]:
+        """条件请求命中统计"""
+        total = self.not_modified_hits + self.hash_hits + self.misses
+        hits = self.not_modified_hits + self.hash_hits
+        return {
+            'not_modified': self.not_modified_hits,
+            'hash_hits': self.hash_hits,
+            'misses': self.misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+    def _interface_code_valid(self) -> bool:
+        return bool(self._interface_code) and time.time() - self._interface_code_time < INTERFACE_CODE_TTL
+
+    async def _get_interface_code(self) -> str:
+        """获取接口调用码（带缓存，并发调用只请求一次，失败后 INTERFACE_CODE_RETRY 秒内不再请求）"""
+        if self._interface_code_valid():
+            return self._interface_code
+        async with self._interface_code_lock:
+            # 等待期间可能已由其他调用获取
+            if self._interface_code_valid():
+                return self._interface_code
+            if time.time() - self._interface_code_failed < INTERFACE_CODE_RETRY:
+                raise RuntimeError("接口码暂不可用")
+            try:
+                session = await self._get_session()
+                payload = {"params": {}, "zone": "", "locale": "zh"}
+                async with session.post(f"{self.api_base}/getInterfaceCode", json=payload) as resp:
+                    resp.raise_for_status()
+                    code = json.loads(await resp.text())
+            except Exception:
+                self._interface_code_failed = time.time()
+                raise
+            self._interface_code = str(code).strip('"')
+            self._interface_code_time = time.time()
+            return self._interface_code
+
+    async def fetch_api(self, url: str) -> str:
+        """通过JSON接口获取版本号，失败返回空字符串
+
+        同一包名的并发查询共用一次请求；查询失败的包名在 API_NEGATIVE_TTL 秒内不再查询。
+        """
+        package_id = parse_package_id(url)
+        if not package_id:
+            return ""
+        failed_at = self._api_failures.get(package_id)
+        if failed_at is not None and time.time() - failed_at < API_NEGATIVE_TTL:
+            return ""
+        task, _ = self._api_flights.run(package_id, lambda: self._query_api(package_id))
+        # 单个调用方超时取消时，不影响其他等待同一结果的调用
+        return await asyncio.shield(task)
+
+    async def _query_api(self, package_id: str) -> str:
+        try:
+            code = await self._get_interface_code()
+        except Exception as e:
+            # 接口码本身不可用，由接口码的失败缓存控制重试，不记入包名
+            if self.debug:
+                logger.info(f"[鸿蒙监控] 获取接口码失败: {e}")
+            return ""
+
+        try:
+            session = await self._get_session()
+            headers = {
+                "Interface-Code": f"{code}_{int(time.time() * 1000)}",
+                "identity-id": self._identity_id,
+                "Content-Type": "application/json",
+            }
+            payload = {"pkgName": package_id, "appId": "", "locale": "zh_CN"}
+            async with session.post(f"{self.api_base}/appinfo", json=payload, headers=headers) as resp:
+                if resp.status != 200:
+                    if resp.status != 404:
+                        # 接口码可能失效，下次重新获取
+                        self._interface_code = ""
+                    raise RuntimeError(f"HTTP {resp.status}")
+                body = await resp.read()
+
+            # 接口返回内容未变化时直接复用上次结果，跳过解析
+            validators = self._get_validators(("api", package_id))
+            body_hash = _body_hash(body)
+            if body_hash == validators.body_hash and validators.record:
+                self.hash_hits += 1
+                self._api_failures.pop(package_id, None)
+                return validators.record.get(VERSION_FIELD, "")
+            self.misses += 1
+
+            data = json.loads(body)
+            version = str(data.get("version") or "").strip() if isinstance(data, dict) else ""
+            if not version:
+                raise RuntimeError("接口未返回版本号")
+            validators.body_hash = body_hash
+            validators.record = {VERSION_FIELD: version}
+            self._api_failures.pop(package_id, None)
+            return version
+        except Exception as e:
+            self._api_failures[package_id] = time.time()
+            if self.debug:
+                logger.info(f"[鸿蒙监控] 接口抓取失败 {package_id}: {e}")
+            return ""
+
+    async def fetch_html(self, url: str, spec, attempt: Optional[FetchAttempt] = None) -> Dict[str, str]:
+        """直接请求详情页并按提取规则解析，页面需JS渲染时返回空记录
+
+        attempt 不为空时记录主机是否有响应：连接出错、超时及 5xx/429 记为传输失败。
+        """
+        if not BS4_AVAILABLE:
+            return {}
+
+        # 提取结果与规则相关，校验信息按 (链接, 规则) 区分
+        validators = self._get_validators(("html", url, spec.rules))
+        headers = {}
+        if validators.etag:
+            headers["If-None-Match"] = validators.etag
+        if validators.last_modified:
+            headers["If-Modified-Since"] = validators.last_modified
+
+        start = time.monotonic()
+        try:
+            session = await self._get_session()
+            async with session.get(url, headers=headers) as resp:
+                if attempt is not None:
+                    if resp.status >= 500 or resp.status == 429:
+                        attempt.failed(f"HTTP {resp.status}")
+                    else:
+                        attempt.responded(TIER_HTML, time.monotonic() - start)
+                if resp.status == 304:
+                    # 页面未修改，只花费了一次响应头的开销
+                    self.not_modified_hits += 1
+                    return dict(validators.record)
+                if resp.status != 200:
+                    return {}
+                etag = resp.headers.get("ETag", "")
+                last_modified = resp.headers.get("Last-Modified", "")
+                body = await resp.read()
+                charset = resp.charset or "utf-8"
+
+            body_hash = _body_hash(body)
+            if body_hash == validators.body_hash:
+                self.hash_hits += 1
+                validators.etag, validators.last_modified = etag, last_modified
+                return dict(validators.record)
+            self.misses += 1
+
+            html = body.decode(charset, errors="replace")
+            record = spec.extract_soup(BeautifulSoup(html, "html.parser"))
+            # 解析成功后才保存校验信息：否则下次的 304 会返回过期或空的记录
+            validators.body_hash = body_hash
+            validators.record = record
+            validators.etag, validators.last_modified = etag, last_modified
+            return dict(record)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt is not None:
+                attempt.failed(f"{type(e).__name__}: {e}")
+            if self.debug:
+                logger.info(f"[鸿蒙监控] 静态页面抓取失败 {url}: {e}")
+            return {}
+        except Exception as e:
+            if self.debug:
+                logger.info(f"[鸿蒙监控] 静态页面抓取失败 {url}: {e}")
+            return {}
+
+    async def fetch(self, url: str, spec,
+                    attempt: Optional[FetchAttempt] = None) -> Tuple[Dict[str, str], Optional[str]]:
+        """按层级尝试抓取，返回 (提取记录, 成功的层级)
+
+        接口只提供版本号，配置了附加字段的应用直接跳过接口层。
+        接口值不符合版本正则时视为失败，继续尝试后面的层级。
+        接口在另一主机上，结果不计入详情页主机的熔断，只有静态页面请求记入 attempt。
+        """
+        if not self.available:
+            return {}, None
+
+        if not spec.has_extra_fields:
+            # 接口值按应用的版本规则（正则）处理，与页面提取的格式一致
+            record = spec.version_record(await self.fetch_api(url))
+            if record.get(VERSION_FIELD):
+                return record, TIER_API
+
+        record = await self.fetch_html(url, spec, attempt)
+        if record.get(VERSION_FIELD):
+            return record, TIER_HTML
+
+        return {}, None
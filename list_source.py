@@ -0,0 +1,137 @@
+import re
+from typing import Dict, List, Sequence, Tuple
+
+from .watchlist import parse_package_id
+
+# 通过列表页获取版本号的抓取层级
+TIER_LIST = "list"
+
+# 列表行中默认用于识别应用的元素：指向详情页的链接
+DEFAULT_ID_SELECTOR = 'a[href*="id="]'
+
+# 在页面内一次性读取所有行的脚本，参数为 [行选择器, 包名选择器, 版本选择器]
+ROWS_JS = """
+([rowSelector, idSelector, versionSelector]) => {
+    const read = (el) => el ? [el.getAttribute("href") || "", (el.textContent || "").trim()] : ["", ""];
+    const out = [];
+    let rows = [];
+    try {
+        rows = document.querySelectorAll(rowSelector);
+    } catch (e) {
+        return out;
+    }
+    for (const row of rows) {
+        let idEl = null, versionEl = null;
+        try {
+            idEl = row.querySelector(idSelector) || row;
+            versionEl = row.querySelector(versionSelector);
+        } catch (e) {
+            continue;
+        }
+        const [href, text] = read(idEl);
+        out.push([href, text, versionEl ? (versionEl.textContent || "").trim() : ""]);
+    }
+    return out;
+}
+"""
+
+# 行中读到的原始内容: (链接, 文本, 版本文本)
+RawRow = Tuple[str, str, str]
+
+_PACKAGE_PATTERN = re.compile(r"^[A-Za-z][\w]*(\.[A-Za-z0-9_]+)+$")
+
+
+class ListSource:
+    """开发者页或榜单页：一次加载取回多个应用的 (包名, 版本)
+
+    每行由行选择器定位，行内的链接（id= 参数）或文本给出包名（找不到时读取行本身），
+    版本选择器给出版本号，可选一个正则做后处理（有分组时取第一个分组）。
+    接口与 ExtractionSpec 一致（version_selector / rules / extract_page / extract_soup），
+    可直接交给 HttpFetcher.fetch_html 与浏览器抓取流程，结果为 {包名: 版本}。
+    """
+
+    __slots__ = ("url", "row_selector", "version_selector", "id_selector", "_pattern")
+
+    def __init__(self, url: str, row_selector: str, version_selector: str,
+                 id_selector: str = "", version_regex: str = ""):
+        self.url = url
+        self.row_selector = row_selector
+        self.version_selector = version_selector
+        self.id_selector = id_selector or DEFAULT_ID_SELECTOR
+        self._pattern = re.compile(version_regex) if version_regex else None
+
+    @property
+    def key(self) -> str:
+        return f"list:{self.url}"
+
+    @property
+    def version_regex(self) -> str:
+        return self._pattern.pattern if self._pattern else ""
+
+    @property
+    def rules(self) -> Tuple[str, ...]:
+        """用于区分HTTP条件请求缓存（与 ExtractionSpec.rules 的用途一致）"""
+        return (self.row_selector, self.id_selector, self.version_selector, self.version_regex)
+
+    def _version(self, text: str) -> str:
+        text = (text or "").strip()
+        if not text or self._pattern is None:
+            return text
+        match = self._pattern.search(text)
+        if not match:
+            return ""
+        return (match.group(1) if match.groups() else match.group(0)).strip()
+
+    def parse_rows(self, rows: Sequence[RawRow]) -> Dict[str, str]:
+        """行内容 -> {包名: 版本}，缺少包名或版本的行忽略"""
+        result: Dict[str, str] = {}
+        for href, text, version_text in rows:
+            package_id = parse_package_id(href) if href else ""
+            if not package_id and _PACKAGE_PATTERN.match(text or ""):
+                package_id = text
+            version = self._version(version_text)
+            if package_id and version:
+                result.setdefault(package_id, version)
+        return result
+
+    async def extract_page(self, page) -> Dict[str, str]:
+        """在浏览器页面中一次往返取回所有行"""
+        rows = await page.evaluate(ROWS_JS, [self.row_selector, self.id_selector, self.version_selector])
+        return self.parse_rows(rows or [])
+
+    def extract_soup(self, soup) -> Dict[str, str]:
+        """从BeautifulSoup文档中提取所有行"""
+        rows: List[RawRow] = []
+        try:
+            nodes = soup.select(self.row_selector)
+        except Exception:
+            return {}
+        for row in nodes:
+            try:
+                # 行内没有匹配的元素时读取行本身（行即链接的情况）
+                id_node = row.select_one(self.id_selector) or row
+                version_node = row.select_one(self.version_selector)
+            except Exception:
+                continue
+            rows.append((
+                id_node.get("href") or "",
+                id_node.get_text(strip=True),
+                version_node.get_text(strip=True) if version_node else "",
+            ))
+        return self.parse_rows(rows)
+
+
+def parse_list_sources(lines: Sequence[str]) -> List[ListSource]:
+    """解析列表页配置行
+
+    每行格式: 列表页链接|行选择器|版本选择器|包名选择器(可选)|版本正则(可选)
+    """
+    result: List[ListSource] = []
+    for line in lines:
+        parts = [p.strip() for p in line.split("|", 4)]
+        if len(parts) < 3 or not all(parts[:3]):
+            raise ValueError(f"列表页配置格式错误: {line}")
+        parts += [""] * (5 - len(parts))
+        result.append(ListSource(parts[0], parts[1], parts[2], parts[3], parts[4]))
+    return result
+
@@ -1,4 +1,4 @@
-from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
+from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult, MessageChain
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
 from astrbot.api.message_components import Plain
@@ -6,126 +6,352 @@ from astrbot.api import AstrBotConfig
 import asyncio
 import json
 import os
+import socket
 import time
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-# 动态导入Playwright
-PLAYWRIGHT_AVAILABLE = False
-try:
-    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    logger.warning("[鸿蒙监控] Playwright未安装,抓取功能将不可用。")
+from .browser_pool import (
+    BrowserPool, NavigationError, PlaywrightTimeoutError, PLAYWRIGHT_AVAILABLE,
+    FETCH_PROFILE_LITE, FETCH_PROFILE_FULL, GOTO_TIMEOUT_MS, SELECTOR_TIMEOUT_MS, fetch_rendered
+)
+from .rate_limit import HostRateLimiter
+from .http_fetcher import BS4_AVAILABLE, HttpFetcher, TIER_BROWSER, TIER_HTML
+from .extractor import (
+    ExtractionSpec, VERSION_FIELD, build_rules, compile_spec, merge_specs, parse_field_rules, split_record
+)
+from .version_store import VersionStore
+from .history_db import HistoryDB
+from .scheduler import AppScheduler, OUTCOME_CHANGED, OUTCOME_OK, OUTCOME_FAILED, OUTCOME_SKIPPED
+from .outbox import NotificationOutbox
+from .metrics import MetricsRegistry
+from .watchlist import AppRecord, FetchTarget, WatchList
+from .singleflight import SingleFlight
+from .list_source import ListSource, TIER_LIST, parse_list_sources
+from .worker_pool import ScraperWorkerPool, WorkerTimeoutError
+from .snapshot_cache import SnapshotCache, dry_run
+from .cluster import ClusterCoordinator
+from .circuit import (
+    BudgetExhaustedError, CircuitBreakers, CircuitOpenError, FetchAttempt, FetchSkippedError, STATE_OPEN,
+    SweepBudget
+)
+
+DEFAULT_APP_NAME = "一日记账"
+DEFAULT_DETAIL_URL = "https://appgallery.huawei.com/app/detail?id=com.ericple.onebill"
+DEFAULT_VERSION_SELECTOR = "span.content-value"
+# /check 流式回复时每条消息最多包含的结果行数，及结果最多等待多久（秒）就发出
+CHECK_STREAM_BATCH = 10
+CHECK_STREAM_INTERVAL = 2.0
+# 本轮剩余时间预算低于此值（秒）时不再发起新的抓取
+MIN_FETCH_BUDGET = 5.0
+# 启用抓取子进程时，外层期限比工作池的硬性期限多留的余量（秒），卡死的子进程由工作池结束
+WORKER_TIMEOUT_MARGIN = 5.0
 
 @register("harmony_app_monitor", "xianyao", "鸿蒙应用更新监控与推送插件", "1.0.0")
 class HarmonyAppMonitor(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
         """初始化插件"""
+        init_start = time.perf_counter()
         super().__init__(context)
         self._ctx = context
         self.config = config  # AstrBotConfig对象
         self._monitor_task = None
         self._is_running = False
+        self._scheduler: Optional[AppScheduler] = None
+        self._batch_tasks = set()
+        self._background_tasks = set()
+        self._checks_in_flight = SingleFlight()
         self.enable_debug_log = False  # 先初始化，避免后续访问时报错
+        self._watchlist_fallback = False  # 监控列表是否为配置失败时的默认列表
         
         logger.info(f"[鸿蒙监控] 插件初始化开始")
         
+        # 性能指标（各阶段耗时直方图与结果计数）
+        self.metrics = self._create_metrics()
+        self._metrics_task = None
+        
         # 初始化配置
         self._init_config()
         
         # 初始化数据存储
         self._init_data_store()
+        self._init_history_db()
+        self._snapshots: Optional[SnapshotCache] = None
+        self._init_snapshot_cache()
+        
+        # 可选：多个实例通过共享SQLite文件分片监控列表、去重通知
+        self._cluster: Optional[ClusterCoordinator] = None
+        self._cluster_task = None
+        self._cluster_failed = False
+        self._init_cluster()
+        
+        # 共享浏览器池（首次抓取时才启动Chromium）
+        self._browser_pool = BrowserPool(**self._browser_options())
+        
+        # 可选：在子进程中渲染页面，浏览器负载与崩溃不影响机器人进程
+        self._worker_pool = None
+        if self.scraper_workers > 0 and PLAYWRIGHT_AVAILABLE:
+            self._worker_pool = ScraperWorkerPool(
+                self.scraper_workers, self._browser_options(), job_timeout=self.scraper_job_timeout
+            )
+        
+        # 按主机限速，避免被应用市场限流
+        self._rate_limiter = HostRateLimiter(rate=self.host_rate_limit, burst=self.host_rate_burst)
+        
+        # 按主机熔断：应用市场故障时跳过抓取，沿用最后一次成功的版本
+        self._breakers = CircuitBreakers(
+            threshold=self.circuit_failure_threshold,
+            cooldown=self.circuit_cooldown,
+            max_timeout=(GOTO_TIMEOUT_MS + SELECTOR_TIMEOUT_MS) / 1000
+        )
+        # 定时检查的时间预算，按检查间隔的窗口累计所有抓取的耗时
+        self._sweep_budget = SweepBudget(self.sweep_budget, self.check_interval * 60)
+        # 各应用最后一次成功检查的时间戳（启动时从历史库读取）
+        self._last_success: Dict[str, int] = {}
+        
+        # HTTP快速通道：能直接解析时不启动浏览器
+        self._http_fetcher = HttpFetcher(debug=self.enable_debug_log)
+        self.fetch_stats: Dict[str, Dict[str, Any]] = {}
         
-        # 启动监控任务
-        self._start_monitor_task()
+        # 列表页结果: 链接 -> (抓取时间, {包名: 版本})，以及 包名 -> (版本, 抓取时间) 索引
+        self._list_results: Dict[str, tuple] = {}
+        self._listed_versions: Dict[str, tuple] = {}
         
-        logger.info(f"[鸿蒙监控] 插件初始化完成")
+        # 抓取并发上限在所有检查批次间共享
+        self._fetch_semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # 通知发件箱：检查流程只入队，由派发任务并发投递
+        self._outbox = NotificationOutbox(
+            os.path.join(self.data_dir, 'harmony_outbox.json'),
+            self._deliver_message,
+            concurrency=self.notify_concurrency,
+            max_retries=self.notify_max_retries,
+            formatter=self._format_digest
+        )
+        self._outbox.load()
+        self._outbox.start()
+        
+        # 启动监控任务（预热延迟后才开始检查，Playwright与浏览器在首次抓取时才加载）
+        self._start_monitor_task(delay=self.startup_delay)
+        
+        # 定期导出Prometheus文本格式指标
+        if self.metrics_textfile:
+            self._metrics_task = asyncio.create_task(self._metrics_export_loop())
+        
+        logger.info(f"[鸿蒙监控] 插件初始化完成 (耗时{(time.perf_counter() - init_start) * 1000:.0f}ms)")
     
     def _init_config(self):
         """初始化配置参数"""
+        # 解析失败时（如 /refresh 时配置有误）保留上次的监控列表
+        previous_watchlist = getattr(self, 'watchlist', None)
         try:
             # 先读取基础配置
             self.check_interval = int(self.config.get("check_interval_minutes", 30))
             self.command_prefix = str(self.config.get("command_prefix", "/"))
             self.enable_debug_log = bool(self.config.get("enable_debug_log", False))
+            self.browser_max_pages = max(1, int(self.config.get("browser_max_pages", 4)))
+            self.max_concurrency = max(1, int(self.config.get("max_concurrency", 4)))
+            self.host_rate_limit = float(self.config.get("host_rate_limit", 1.0))
+            self.host_rate_burst = max(1, int(self.config.get("host_rate_burst", 3)))
+            self.enable_http_fast_path = bool(self.config.get("enable_http_fast_path", True))
+            self.store_flush_delay = max(0.0, float(self.config.get("store_flush_delay_seconds", 5)))
+            self.prune_unwatched = bool(self.config.get("prune_unwatched_versions", True))
+            self.enable_history = bool(self.config.get("enable_history", True))
+            self.schedule_jitter = max(0, int(self.config.get("schedule_jitter_percent", 10))) / 100
+            self.adaptive_interval = bool(self.config.get("adaptive_interval", True))
+            self.adaptive_min_minutes = max(1, int(self.config.get("adaptive_min_minutes", 10)))
+            self.adaptive_max_minutes = max(1, int(self.config.get("adaptive_max_minutes", 240)))
+            self.failure_backoff_max_minutes = max(1, int(self.config.get("failure_backoff_max_minutes", 360)))
+            self.startup_delay = max(0, int(self.config.get("startup_delay_seconds", 60)))
+            self.circuit_failure_threshold = max(0, int(self.config.get("circuit_failure_threshold", 5)))
+            self.circuit_cooldown = max(10, int(self.config.get("circuit_cooldown_seconds", 300)))
+            self.sweep_budget = max(0, int(self.config.get("sweep_budget_seconds", 900)))
+            self.notify_digest = bool(self.config.get("notify_digest", False))
+            self.notify_digest_window = max(0, int(self.config.get("notify_digest_window_seconds", 60)))
+            self.notify_concurrency = max(1, int(self.config.get("notify_concurrency", 4)))
+            self.notify_max_retries = max(0, int(self.config.get("notify_max_retries", 5)))
+            self.notify_platform_id = str(self.config.get("notify_platform_id", "aiocqhttp")).strip() or "aiocqhttp"
+            self.metrics_textfile = str(self.config.get("metrics_textfile", "")).strip()
+            self.metrics_interval = max(5, int(self.config.get("metrics_interval_seconds", 60)))
+            self.snapshot_cache_mb = max(0, int(self.config.get("snapshot_cache_mb", 0)))
+            self.cluster_db_path = str(self.config.get("cluster_db_path", "")).strip()
+            self.cluster_instance_id = str(self.config.get("cluster_instance_id", "")).strip()
+            self.cluster_shards = max(1, int(self.config.get("cluster_shards", 16)))
+            self.cluster_lease = max(15, int(self.config.get("cluster_lease_seconds", 60)))
+            self.browser_recycle_pages = max(0, int(self.config.get("browser_recycle_pages", 200)))
+            self.browser_memory_limit_mb = max(0, int(self.config.get("browser_memory_limit_mb", 1024)))
+            self.browser_page_deadline = max(0, int(self.config.get("browser_page_deadline_seconds", 120)))
+            self.scraper_workers = max(0, int(self.config.get("scraper_workers", 0)))
+            self.scraper_job_timeout = max(10, int(self.config.get("scraper_job_timeout_seconds", 120)))
+            self.fetch_profile = str(self.config.get("fetch_profile", FETCH_PROFILE_LITE)).strip().lower()
+            if self.fetch_profile not in (FETCH_PROFILE_LITE, FETCH_PROFILE_FULL):
+                logger.warning(f"[鸿蒙监控] 未知的抓取模式 '{self.fetch_profile}'，使用 {FETCH_PROFILE_LITE}")
+                self.fetch_profile = FETCH_PROFILE_LITE
+            blocked_raw = self.config.get("blocked_domains", "")
+            self.extra_blocked_domains = self._parse_text_list(blocked_raw, "拦截域名")
             
             # 再读取列表配置
             # 1. 读取应用名称列表
-            app_names_raw = self.config.get("app_name_list", "一日记账")
+            app_names_raw = self.config.get("app_name_list", DEFAULT_APP_NAME)
             self.app_names = self._parse_text_list(app_names_raw, "应用名称")
             
             # 2. 读取应用链接列表
-            detail_urls_raw = self.config.get("detail_url_list", "https://appgallery.huawei.com/app/detail?id=com.ericple.onebill")
+            detail_urls_raw = self.config.get("detail_url_list", DEFAULT_DETAIL_URL)
             self.detail_urls = self._parse_text_list(detail_urls_raw, "应用链接")
             
             # 3. 读取版本选择器列表
-            selectors_raw = self.config.get("version_selector_list", "span.content-value")
+            selectors_raw = self.config.get("version_selector_list", DEFAULT_VERSION_SELECTOR)
             self.version_selectors = self._parse_text_list(selectors_raw, "版本选择器")
             
-            # 4. 通知配置
+            # 4. 附加字段提取规则（更新日期、包大小、更新说明等）
+            fields_raw = self.config.get("extract_field_list", "")
+            try:
+                self.field_rules = parse_field_rules(self._parse_text_list(fields_raw, "字段规则"))
+            except Exception as e:
+                logger.error(f"[鸿蒙监控] 解析字段规则失败: {e}")
+                self.field_rules = {}
+            
+            # 5. 开发者页/榜单页（一次加载获取多个应用的版本）
+            sources_raw = self.config.get("list_source_list", "")
+            try:
+                self.list_sources = parse_list_sources(self._parse_text_list(sources_raw, "列表页"))
+            except Exception as e:
+                logger.error(f"[鸿蒙监控] 解析列表页配置失败: {e}")
+                self.list_sources = []
+            self.list_max_age = max(1, int(self.config.get("list_source_max_age_minutes", 10))) * 60
+            
+            # 6. 单独的检查间隔（应用名称|分钟）
+            intervals_raw = self.config.get("app_interval_list", "")
+            self.app_intervals = self._parse_app_intervals(self._parse_text_list(intervals_raw, "检查间隔"))
+            
+            # 7. 通知配置
             groups_raw = self.config.get("notification_groups", "")
             self.notification_groups = self._parse_text_list(groups_raw, "通知群组")
             
             users_raw = self.config.get("notification_users", "")
             self.notification_users = self._parse_text_list(users_raw, "通知用户")
             
-            # 5. 构建应用监控列表
-            self.apps_to_watch = []
+            # 8. 构建应用监控列表（同一包名的条目合并为一个抓取目标）
+            self.watchlist = WatchList()
             min_length = min(len(self.app_names), len(self.detail_urls), len(self.version_selectors))
             
             if min_length > 0:
                 for i in range(min_length):
-                    self.apps_to_watch.append({
-                        'app_name': self.app_names[i],
-                        'detail_url': self.detail_urls[i],
-                        'version_selector': self.version_selectors[i]
-                    })
+                    app = AppRecord(self.app_names[i], self.detail_urls[i], self.version_selectors[i])
+                    if not self.watchlist.add(app):
+                        logger.warning(f"[鸿蒙监控] 忽略重复名称或无效链接的应用: {self.app_names[i]}")
                 
                 # 检查是否有行数不匹配
                 if len(self.app_names) != len(self.detail_urls) or len(self.app_names) != len(self.version_selectors):
                     logger.warning(f"[鸿蒙监控] 配置行数不匹配: 名称={len(self.app_names)}, 链接={len(self.detail_urls)}, 选择器={len(self.version_selectors)}")
                 
-                logger.info(f"[鸿蒙监控] 成功加载 {min_length} 个应用的监控配置")
+                logger.info(f"[鸿蒙监控] 成功加载 {len(self.watchlist)} 个应用的监控配置"
+                            f" ({len(self.watchlist.targets)}个详情页)")
+                self._watchlist_fallback = False
             else:
                 logger.warning("[鸿蒙监控] 配置不完整，至少一个列表为空")
                 # 使用默认配置
-                self.apps_to_watch = [{
-                    'app_name': "一日记账",
-                    'detail_url': "https://appgallery.huawei.com/app/detail?id=com.ericple.onebill",
-                    'version_selector': "span.content-value"
-                }]
+                self.watchlist = self._default_watchlist()
+                self._watchlist_fallback = True
             
             # 输出配置信息
             if self.enable_debug_log:
                 logger.info(f"[鸿蒙监控] 调试信息 - 配置详情:")
-                logger.info(f"  监控应用数: {len(self.apps_to_watch)}")
+                logger.info(f"  监控应用数: {len(self.watchlist)} (详情页{len(self.watchlist.targets)}个)")
                 logger.info(f"  检查间隔: {self.check_interval}分钟")
                 logger.info(f"  指令前缀: '{self.command_prefix}'")
                 logger.info(f"  通知群组数: {len(self.notification_groups)}")
                 logger.info(f"  通知用户数: {len(self.notification_users)}")
+                logger.info(f"  浏览器并发页面数: {self.browser_max_pages}")
+                logger.info(f"  并发检查数: {self.max_concurrency}")
+                logger.info(f"  单主机限速: {self.host_rate_limit}次/秒 (突发{self.host_rate_burst})")
+                logger.info(f"  HTTP快速通道: {self.enable_http_fast_path}")
+                logger.info(f"  抓取模式: {self.fetch_profile} (额外拦截域名{len(self.extra_blocked_domains)}个)")
+                logger.info(f"  抓取子进程: {self.scraper_workers or '不使用'} (任务期限{self.scraper_job_timeout}秒)")
+                logger.info(f"  浏览器回收: 每{self.browser_recycle_pages or '∞'}个页面, 内存上限"
+                            f"{self.browser_memory_limit_mb or '∞'}MB, 页面期限{self.browser_page_deadline or '∞'}秒")
+                logger.info(f"  字段规则: {sum(len(r) for r in self.field_rules.values())}条")
+                logger.info(f"  列表页: {len(self.list_sources)}个 (结果有效期{self.list_max_age // 60}分钟)")
+                logger.info(f"  调度: 抖动{int(self.schedule_jitter * 100)}%, 自适应{self.adaptive_interval} "
+                            f"({self.adaptive_min_minutes}-{self.adaptive_max_minutes}分钟), "
+                            f"失败退避上限{self.failure_backoff_max_minutes}分钟, 单独间隔{len(self.app_intervals)}个, "
+                            f"启动预热{self.startup_delay}秒")
+                logger.info(f"  熔断: 连续失败{self.circuit_failure_threshold or '∞'}次, 冷却{self.circuit_cooldown}秒, "
+                            f"每个检查间隔的时间预算{self.sweep_budget or '∞'}秒")
+                logger.info(f"  通知: 平台{self.notify_platform_id}, 并发{self.notify_concurrency}, "
+                            f"重试{self.notify_max_retries}次, 摘要{self.notify_digest} (窗口{self.notify_digest_window}秒)")
+                logger.info(f"  指标文件: {self.metrics_textfile or '未启用'} (每{self.metrics_interval}秒)")
+                logger.info(f"  页面快照: {f'{self.snapshot_cache_mb}MB' if self.snapshot_cache_mb else '未启用'}")
+                logger.info(f"  集群: {self.cluster_db_path or '未启用'} (分片{self.cluster_shards}个, 租约{self.cluster_lease}秒)")
+                logger.info(f"  版本记录落盘延迟: {self.store_flush_delay}秒, 清理未监控记录: {self.prune_unwatched}")
                 logger.info(f"  启用调试: {self.enable_debug_log}")
                 
                 # 输出每个应用的配置
-                for i, app in enumerate(self.apps_to_watch, 1):
-                    logger.info(f"  应用{i}: {app['app_name']}")
-                    logger.info(f"    链接: {app['detail_url']}")
-                    logger.info(f"    选择器: {app['version_selector']}")
+                for i, app in enumerate(self.watchlist, 1):
+                    logger.info(f"  应用{i}: {app.name} [{app.key}]")
+                    logger.info(f"    链接: {app.detail_url}")
+                    logger.info(f"    选择器: {app.version_selector}")
+                    logger.info(f"    提取字段: {', '.join(self._get_extract_spec(app).field_names)}")
             
         except Exception as e:
             logger.error(f"[鸿蒙监控] 配置初始化失败: {e}")
-            # 使用默认配置
-            self.apps_to_watch = [{
-                'app_name': "一日记账",
-                'detail_url': "https://appgallery.huawei.com/app/detail?id=com.ericple.onebill",
-                'version_selector': "span.content-value"
-            }]
+            # 使用默认配置；已有监控列表时保留，不按默认列表清理版本记录
+            if previous_watchlist is not None:
+                logger.warning("[鸿蒙监控] 保留上次的监控列表")
+                self.watchlist = previous_watchlist
+            else:
+                self.watchlist = self._default_watchlist()
+                self._watchlist_fallback = True
             self.check_interval = 30
             self.command_prefix = "/"
+            self.browser_max_pages = 4
+            self.max_concurrency = 4
+            self.host_rate_limit = 1.0
+            self.host_rate_burst = 3
+            self.enable_http_fast_path = True
+            self.store_flush_delay = 5.0
+            self.prune_unwatched = True
+            self.enable_history = True
+            self.schedule_jitter = 0.1
+            self.adaptive_interval = True
+            self.adaptive_min_minutes = 10
+            self.adaptive_max_minutes = 240
+            self.failure_backoff_max_minutes = 360
+            self.startup_delay = 60
+            self.circuit_failure_threshold = 5
+            self.circuit_cooldown = 300
+            self.sweep_budget = 900
+            self.notify_digest = False
+            self.notify_digest_window = 60
+            self.notify_concurrency = 4
+            self.notify_max_retries = 5
+            self.notify_platform_id = "aiocqhttp"
+            self.metrics_textfile = ""
+            self.metrics_interval = 60
+            self.snapshot_cache_mb = 0
+            self.cluster_db_path = ""
+            self.cluster_instance_id = ""
+            self.cluster_shards = 16
+            self.cluster_lease = 60
+            self.app_intervals = {}
+            self.list_sources = []
+            self.list_max_age = 600
+            self.fetch_profile = FETCH_PROFILE_LITE
+            self.browser_recycle_pages = 200
+            self.browser_memory_limit_mb = 1024
+            self.browser_page_deadline = 120
+            self.scraper_workers = 0
+            self.scraper_job_timeout = 120
+            self.extra_blocked_domains = []
             self.notification_groups = []
             self.notification_users = []
+            self.field_rules = {}
             self.enable_debug_log = False
     
+    @staticmethod
+    def _default_watchlist() -> WatchList:
+        return WatchList([AppRecord(DEFAULT_APP_NAME, DEFAULT_DETAIL_URL, DEFAULT_VERSION_SELECTOR)])
+    
     def _parse_text_list(self, text: str, field_name: str) -> List[str]:
         """解析文本列表，处理各种格式"""
         result = []
@@ -160,17 +386,115 @@ class HarmonyAppMonitor(Star):
         # 如果需要调试日志，调用方可以在调用后自己输出
         return result
     
+    @staticmethod
+    def _create_metrics() -> MetricsRegistry:
+        """创建指标注册表并登记说明"""
+        metrics = MetricsRegistry(prefix="harmony")
+        metrics.describe("fetch_phase_seconds", "Time spent in each phase of a browser fetch")
+        metrics.describe("fetch_seconds", "Total time to fetch one app, by tier")
+        metrics.describe("fetch", "Fetch results by outcome")
+        metrics.describe("store_flush_seconds", "Time to flush the version store to disk")
+        metrics.describe("history_write_seconds", "Time to write one batch to the history database")
+        metrics.describe("notify_send_seconds", "Time to deliver one notification")
+        metrics.describe("notify", "Notification deliveries by outcome")
+        metrics.describe("check_batch_seconds", "Wall time of one check batch")
+        return metrics
+    
+    async def _metrics_export_loop(self):
+        """定期写出Prometheus文本格式指标文件（配置清空后退出）"""
+        while self.metrics_textfile:
+            await asyncio.sleep(self.metrics_interval)
+            try:
+                await self._run_in_thread(self.metrics.write_textfile, self.metrics_textfile)
+            except Exception as e:
+                logger.error(f"[鸿蒙监控] 写入指标文件失败: {e}")
+    
+    def _browser_options(self) -> Dict[str, Any]:
+        """浏览器池参数（进程内与抓取子进程共用）"""
+        return {
+            'max_pages': self.browser_max_pages,
+            'profile': self.fetch_profile,
+            'blocked_domains': self.extra_blocked_domains,
+            'recycle_pages': self.browser_recycle_pages,
+            'memory_limit_mb': self.browser_memory_limit_mb,
+            'page_deadline': self.browser_page_deadline,
+        }
+    
+    def _apply_fetch_settings(self, old_concurrency: int, old_browser_options: Dict[str, Any]) -> List[str]:
+        """把抓取相关的配置应用到运行中的对象（/refresh），返回有变化的项目"""
+        changed = []
+        if self.max_concurrency != old_concurrency:
+            # 正在进行的抓取在旧信号量上释放，新的抓取按新上限排队
+            self._fetch_semaphore = asyncio.Semaphore(self.max_concurrency)
+            changed.append("并发检查数")
+        if (self._rate_limiter.rate, self._rate_limiter.burst) != (self.host_rate_limit, self.host_rate_burst):
+            self._rate_limiter.configure(self.host_rate_limit, self.host_rate_burst)
+            changed.append("单主机限速")
+        browser_options = self._browser_options()
+        if browser_options != old_browser_options:
+            self._browser_pool.configure(**browser_options)
+            changed.append("浏览器参数")
+        
+        workers = self.scraper_workers if PLAYWRIGHT_AVAILABLE else 0
+        current = self._worker_pool
+        if current is not None and current.size == workers and browser_options == old_browser_options:
+            current.job_timeout = max(10.0, float(self.scraper_job_timeout))
+        elif current is not None or workers:
+            # 子进程在启动时读取浏览器参数：换用新的工作池，旧的在已派发的任务完成后关闭
+            self._worker_pool = None
+            if workers:
+                self._worker_pool = ScraperWorkerPool(
+                    workers, browser_options, job_timeout=self.scraper_job_timeout
+                )
+            if current is not None:
+                task = asyncio.create_task(current.close(drain=current.job_timeout))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+            changed.append("抓取子进程")
+        return changed
+    
+    def _apply_notify_settings(self) -> List[str]:
+        """把通知与历史相关的配置应用到运行中的对象（/refresh），返回有变化的项目"""
+        changed = []
+        if (self._outbox.concurrency, self._outbox.max_retries) != (self.notify_concurrency, self.notify_max_retries):
+            self._outbox.configure(self.notify_concurrency, self.notify_max_retries)
+            changed.append("通知并发与重试")
+        if self.enable_history and self.history_db is None:
+            self._init_history_db()
+            if self.history_db is not None:
+                changed.append("版本历史（已启用）")
+        elif not self.enable_history and self.history_db is not None:
+            # 先摘下引用，之后的检查不再写入；正在进行的写入出错时只记录日志
+            db, self.history_db = self.history_db, None
+            try:
+                db.close()
+            except Exception as e:
+                logger.error(f"[鸿蒙监控] 关闭版本历史库失败: {e}")
+            changed.append("版本历史（已停用）")
+        return changed
+    
+    def _parse_app_intervals(self, lines: List[str]) -> Dict[str, int]:
+        """解析单独的检查间隔配置，每行格式: 应用名称|分钟"""
+        result = {}
+        for line in lines:
+            name, sep, minutes = line.rpartition('|')
+            name = name.strip()
+            if not sep or not name or not minutes.strip().isdigit():
+                logger.warning(f"[鸿蒙监控] 忽略格式错误的检查间隔: {line}")
+                continue
+            result[name] = max(1, int(minutes.strip()))
+        return result
+    
     def _init_data_store(self):
         """初始化数据存储"""
         try:
             # 尝试使用AstrBot的数据目录
             if hasattr(self._ctx, 'get_data_dir'):
-                data_dir = self._ctx.get_data_dir()
-                self.version_store_file = os.path.join(data_dir, 'harmony_versions.json')
+                self.data_dir = self._ctx.get_data_dir()
             else:
                 # 回退到插件目录
-                plugin_dir = os.path.dirname(os.path.abspath(__file__))
-                self.version_store_file = os.path.join(plugin_dir, 'harmony_versions.json')
+                self.data_dir = os.path.dirname(os.path.abspath(__file__))
+            self.version_store_file = os.path.join(self.data_dir, 'harmony_versions.json')
             
             logger.info(f"[鸿蒙监控] 版本存储文件: {self.version_store_file}")
             self.version_store = self._load_version_store()
@@ -178,143 +502,802 @@ class HarmonyAppMonitor(Star):
         except Exception as e:
             logger.error(f"[鸿蒙监控] 初始化数据存储失败: {e}")
             # 使用插件目录作为回退
-            plugin_dir = os.path.dirname(os.path.abspath(__file__))
-            self.version_store_file = os.path.join(plugin_dir, 'harmony_versions.json')
-            self.version_store = {}
+            self.data_dir = os.path.dirname(os.path.abspath(__file__))
+            self.version_store_file = os.path.join(self.data_dir, 'harmony_versions.json')
+            self.version_store = VersionStore(self.version_store_file)
+        
+        # 清理已不在监控列表中的旧记录
+        if self.prune_unwatched:
+            self._prune_version_store()
+    
+    def _init_history_db(self):
+        """初始化版本历史库，并一次性导入旧的版本记录"""
+        self.history_db = None
+        if not self.enable_history:
+            return
+        try:
+            db = HistoryDB(os.path.join(self.data_dir, 'harmony_history.db'))
+            db.open()
+            imported = db.import_legacy(
+                (name, record.get(VERSION_FIELD, '')) for name, record in self.version_store.items()
+            )
+            if imported:
+                logger.info(f"[鸿蒙监控] 已从版本记录导入 {imported} 条历史")
+            self.history_db = db
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 初始化版本历史库失败: {e}")
+    
+    def _init_snapshot_cache(self):
+        """按配置启用、停用页面快照缓存或调整其大小"""
+        if not self.snapshot_cache_mb:
+            self._snapshots = None
+            return
+        max_bytes = self.snapshot_cache_mb * 1024 * 1024
+        if self._snapshots is not None:
+            self._snapshots.resize(max_bytes)
+            return
+        try:
+            cache = SnapshotCache(os.path.join(self.data_dir, 'snapshots'), max_bytes)
+            cache.load()
+            self._snapshots = cache
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 初始化页面快照缓存失败: {e}")
+    
+    def _init_cluster(self):
+        """打开集群协调库并启动心跳任务（修改集群配置需重新加载插件）"""
+        if not self.cluster_db_path:
+            return
+        instance_id = self.cluster_instance_id or f"{socket.gethostname()}-{os.getpid()}"
+        try:
+            cluster = ClusterCoordinator(self.cluster_db_path, instance_id, self.cluster_shards, self.cluster_lease)
+            cluster.open()
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 打开集群协调库失败，按单实例运行: {e}")
+            return
+        self._cluster = cluster
+        self._cluster_task = asyncio.create_task(self._cluster_loop())
+        logger.info(f"[鸿蒙监控] 已加入集群: 实例 {instance_id}, 协调库 {self.cluster_db_path}")
+    
+    async def _cluster_loop(self):
+        """定期心跳：续约并按存活实例数重新分配分片"""
+        cluster = self._cluster
+        while True:
+            try:
+                before = set(cluster.owned)
+                owned = await self._run_in_thread(cluster.heartbeat)
+                if self._cluster_failed:
+                    logger.info("[鸿蒙监控] 集群协调库已恢复")
+                self._cluster_failed = False
+                if owned != before:
+                    logger.info(f"[鸿蒙监控] 集群分片变化: 持有 {len(owned)}/{cluster.shard_count} 个 "
+                                f"(存活实例{cluster.live_instances}个)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not self._cluster_failed:
+                    logger.error(f"[鸿蒙监控] 集群心跳失败，租约过期后按单实例检查全部应用: {e}")
+                self._cluster_failed = True
+            await asyncio.sleep(cluster.lease_seconds / 3)
+    
+    def _owns_target(self, key: str) -> bool:
+        """本实例是否负责定时检查该详情页
+
+        未启用集群时负责全部；协调库不可用且租约已过期时同样检查全部（宁可重复，不漏检）。
+        """
+        cluster = self._cluster
+        if cluster is None:
+            return True
+        if self._cluster_failed and not cluster.lease_valid:
+            return True
+        return cluster.owns(key)
+    
+    async def _claim_updates(self, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """集群模式下按 (应用, 版本) 去重，只保留由本实例发送的更新"""
+        if self._cluster is None or not updates:
+            return updates
+        try:
+            claimed = await self._run_in_thread(
+                self._cluster.claim_announcements, [(u['app_name'], u['new_ver']) for u in updates]
+            )
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 通知去重失败，照常发送: {e}")
+            return updates
+        kept = [update for update, ok in zip(updates, claimed) if ok]
+        if len(kept) < len(updates):
+            logger.info(f"[鸿蒙监控] {len(updates) - len(kept)} 个更新已由其他实例通知，跳过")
+        return kept
+    
+    def _save_snapshot(self, url: str, capture: Optional[Dict[str, str]]):
+        """在线程池中压缩并写入页面快照，不等待完成"""
+        if self._snapshots is None or not capture or not capture.get('html'):
+            return
+        asyncio.get_event_loop().run_in_executor(None, self._snapshots.put, url, capture['html'])
+    
+    async def _run_in_thread(self, func, *args):
+        """在线程池中执行阻塞操作（数据库等）"""
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
+    
+    async def _record_history(self, observations: List[tuple]):
+        """将一轮检查的观测结果写入历史库（单个事务）"""
+        if self.history_db is None or not observations:
+            return
+        try:
+            with self.metrics.timer("history_write_seconds"):
+                await self._run_in_thread(self.history_db.record_sweep, observations)
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 写入版本历史失败: {e}")
+    
+    def _get_extract_spec(self, app: AppRecord) -> ExtractionSpec:
+        """获取应用的提取规则（编译结果跨轮次缓存）"""
+        rules = build_rules(
+            app.version_selector or DEFAULT_VERSION_SELECTOR,
+            self.field_rules.get(app.name, ()),
+            self.field_rules.get('*', ())
+        )
+        return compile_spec(rules)
     
-    def _start_monitor_task(self):
-        """启动监控任务"""
-        if self.apps_to_watch and PLAYWRIGHT_AVAILABLE:
+    def _get_target_spec(self, target: FetchTarget) -> tuple:
+        """合并同一详情页所有别名的提取规则，返回 (合并规则, 各别名对应的规则序号)"""
+        specs: List[ExtractionSpec] = []
+        indexes: List[int] = []
+        for app in target.apps:
+            spec = self._get_extract_spec(app)
+            # compile_spec 有缓存，规则相同的别名得到同一个对象
+            if spec not in specs:
+                specs.append(spec)
+            indexes.append(specs.index(spec))
+        return merge_specs(specs), indexes
+    
+    def _get_stored_version(self, app_name: str) -> Optional[str]:
+        """读取已记录的版本号"""
+        return self.version_store.get_version(app_name)
+    
+    def _get_app_interval(self, app_name: str) -> int:
+        """应用的检查间隔（秒），未单独配置时使用全局间隔"""
+        return self.app_intervals.get(app_name, self.check_interval) * 60
+    
+    def _get_target_interval(self, target: FetchTarget) -> int:
+        """详情页的检查间隔取其所有别名中最短的一个"""
+        return min(self._get_app_interval(name) for name in target.names)
+    
+    def _scheduler_params(self) -> Dict[str, Any]:
+        return {
+            'jitter_ratio': self.schedule_jitter,
+            'adaptive': self.adaptive_interval,
+            'min_interval': self.adaptive_min_minutes * 60,
+            'max_interval': self.adaptive_max_minutes * 60,
+            'max_backoff': self.failure_backoff_max_minutes * 60,
+        }
+    
+    def _build_scheduler(self, delay: float = 0):
+        """按当前监控列表创建调度器，首次检查在 delay 秒后的抖动窗口内分散进行"""
+        self._scheduler = AppScheduler(**self._scheduler_params())
+        for key, target in self.watchlist.targets.items():
+            self._scheduler.add(key, self._get_target_interval(target), delay=delay)
+    
+    async def _seed_scheduler(self):
+        """按历史库中的最后检查时间推迟首次检查，重启后不重复检查刚检查过的详情页"""
+        if self.history_db is None or self._scheduler is None:
+            return
+        try:
+            last_seen = await self._run_in_thread(self.history_db.last_seen_times)
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 读取最后检查时间失败: {e}")
+            return
+        for name, seen_at in last_seen.items():
+            if seen_at > self._last_success.get(name, 0):
+                self._last_success[name] = seen_at
+        postponed = 0
+        for key, target in self.watchlist.targets.items():
+            times = [last_seen.get(name) for name in target.names]
+            if not all(times):
+                # 有别名从未成功检查过，按预热排期尽快检查
+                continue
+            if self._scheduler.postpone(key, min(times) + self._get_target_interval(target)):
+                postponed += 1
+        if postponed:
+            logger.info(f"[鸿蒙监控] 按上次检查时间推迟了 {postponed} 个详情页的首次检查")
+    
+    def _sync_scheduler(self, old_watchlist: WatchList) -> Dict[str, int]:
+        """按新的监控列表增量更新调度器
+
+        只为新增的详情页排期，移除不再监控的，间隔变化的原地更新；
+        其余详情页保留原有的排期、自适应间隔与失败计数。
+        """
+        counts = {'added': 0, 'removed': 0, 'updated': 0}
+        self._scheduler.configure(**self._scheduler_params())
+        targets = self.watchlist.targets
+        for key in old_watchlist.targets:
+            if key not in targets:
+                # 正在检查中的详情页完成后 reschedule 会直接忽略
+                self._scheduler.remove(key)
+                counts['removed'] += 1
+        for key, target in targets.items():
+            interval = self._get_target_interval(target)
+            schedule = self._scheduler.get(key)
+            if schedule is None:
+                self._scheduler.add(key, interval)
+                counts['added'] += 1
+            elif schedule.base_interval != interval:
+                self._scheduler.update_interval(key, interval)
+                counts['updated'] += 1
+        return counts
+    
+    def _fetch_available(self) -> bool:
+        """是否至少有一个抓取层级可用（浏览器，或HTTP快速通道）"""
+        return PLAYWRIGHT_AVAILABLE or (self.enable_http_fast_path and self._http_fetcher.available)
+    
+    def _start_monitor_task(self, delay: float = 0):
+        """启动监控任务，首次检查推迟 delay 秒"""
+        if self.watchlist and self._fetch_available():
             self._is_running = True
+            self._build_scheduler(delay)
             self._monitor_task = asyncio.create_task(self._monitor_loop())
-            logger.info(f"[鸿蒙监控] 定时监控任务已启动，间隔: {self.check_interval}分钟")
+            logger.info(f"[鸿蒙监控] 定时监控任务已启动，间隔: {self.check_interval}分钟, 首次检查约{delay:.0f}秒后开始")
+            if not PLAYWRIGHT_AVAILABLE:
+                logger.warning("[鸿蒙监控] Playwright不可用，只通过HTTP快速通道检查（需要JS渲染的页面将无法获取）")
         else:
             reason = []
-            if not self.apps_to_watch:
+            if not self.watchlist:
                 reason.append("监控列表为空")
-            if not PLAYWRIGHT_AVAILABLE:
-                reason.append("Playwright不可用")
+            if not self._fetch_available():
+                reason.append("Playwright不可用且HTTP快速通道未启用或缺少aiohttp")
             logger.warning(f"[鸿蒙监控] 监控未启动: {'; '.join(reason)}")
     
-    def _load_version_store(self) -> Dict[str, str]:
+    def _load_version_store(self) -> VersionStore:
         """加载版本记录"""
-        try:
-            if os.path.exists(self.version_store_file):
-                with open(self.version_store_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.error(f"[鸿蒙监控] 加载版本记录失败: {e}")
-        return {}
+        store = VersionStore(self.version_store_file, debounce_seconds=self.store_flush_delay)
+        store.load()
+        return store
     
     def _save_version_store(self):
-        """保存版本记录"""
-        try:
-            # 确保目录存在
-            os.makedirs(os.path.dirname(self.version_store_file), exist_ok=True)
-            with open(self.version_store_file, 'w', encoding='utf-8') as f:
-                json.dump(self.version_store, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"[鸿蒙监控] 保存版本记录失败: {e}")
+        """将本轮修改一次性原子写入磁盘（无修改时不写）"""
+        if not self.version_store.dirty:
+            return
+        with self.metrics.timer("store_flush_seconds"):
+            flushed = self.version_store.flush()
+        if flushed and self.enable_debug_log:
+            logger.info(f"[鸿蒙监控] 版本记录已保存 (第{self.version_store.flush_count}次写入)")
     
-    async def _send_notification(self, app_name: str, old_ver: str, new_ver: str, url: str):
-        """发送更新通知"""
-        message = (
+    def _prune_version_store(self):
+        """删除已不再监控的应用的版本记录（监控列表为默认配置时不清理）"""
+        if self._watchlist_fallback:
+            logger.warning("[鸿蒙监控] 监控列表配置缺失或解析失败，跳过清理版本记录")
+            return
+        removed = self.version_store.prune(self.watchlist.names)
+        if removed:
+            logger.info(f"[鸿蒙监控] 已清理不再监控的版本记录: {', '.join(removed)}")
+    
+    def _format_update_message(self, app_name: str, old_ver: str, new_ver: str, url: str,
+                               record: Optional[Dict[str, str]] = None) -> str:
+        """生成单个应用的更新通知"""
+        extra_lines = "".join(
+            f"📝 {name}: {value}\n"
+            for name, value in (record or {}).items() if name != VERSION_FIELD
+        )
+        return (
             f"🚀 鸿蒙应用更新通知\n\n"
             f"📱 应用: {app_name}\n"
             f"🔄 版本: v{old_ver} → v{new_ver}\n"
+            f"{extra_lines}"
             f"🔗 链接: {url}\n"
             f"⏰ 时间: {time.strftime('%Y-%m-%d %H:%M:%S')}"
         )
-        
+    
+    def _format_digest(self, updates: List[Dict[str, Any]]) -> str:
+        """发件箱合并摘要时调用：只有一个更新时使用普通的更新通知格式"""
+        if len(updates) == 1:
+            update = updates[0]
+            return self._format_update_message(
+                update['app_name'], update['old_ver'], update['new_ver'], update['url'], update.get('record')
+            )
+        return self._format_digest_message(updates)
+    
+    def _format_digest_message(self, updates: List[Dict[str, Any]]) -> str:
+        """将一个摘要窗口内的多个更新合并为一条消息"""
+        lines = [f"🚀 鸿蒙应用更新通知 (共{len(updates)}个)", ""]
+        for update in updates:
+            lines.append(f"📱 {update['app_name']}: v{update['old_ver']} → v{update['new_ver']}")
+            for name, value in (update.get('record') or {}).items():
+                if name != VERSION_FIELD:
+                    lines.append(f"   📝 {name}: {value}")
+            lines.append(f"   🔗 {update['url']}")
+        lines.append("")
+        lines.append(f"⏰ 时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        return "\n".join(lines)
+    
+    def _notification_targets(self) -> List[tuple]:
+        """当前所有通知目标: [(类型, ID), ...]"""
+        return ([('group', group_id) for group_id in self.notification_groups]
+                + [('user', user_id) for user_id in self.notification_users])
+    
+    async def _send_notification(self, app_name: str, old_ver: str, new_ver: str, url: str,
+                                 record: Optional[Dict[str, str]] = None):
+        """将更新通知放入发件箱，由派发任务异步投递"""
         logger.info(f"[鸿蒙监控] 发现更新: {app_name} v{old_ver} -> v{new_ver}")
-        
-        # 发送到所有通知群组
-        for group_id in self.notification_groups:
-            try:
-                # 根据实际的消息发送API调整
-                # 示例：await self._ctx.send_group_message(group_id, message)
-                logger.info(f"[鸿蒙监控] 发送通知到群组: {group_id}")
-            except Exception as e:
-                logger.error(f"[鸿蒙监控] 发送群组通知失败 {group_id}: {e}")
-        
-        # 发送到所有通知用户
-        for user_id in self.notification_users:
-            try:
-                # 根据实际的消息发送API调整
-                # 示例：await self._ctx.send_private_message(user_id, message)
-                logger.info(f"[鸿蒙监控] 发送通知到用户: {user_id}")
-            except Exception as e:
-                logger.error(f"[鸿蒙监控] 发送用户通知失败 {user_id}: {e}")
+        message = self._format_update_message(app_name, old_ver, new_ver, url, record)
+        self._outbox.enqueue(message, self._notification_targets())
+    
+    async def _send_notifications(self, updates: List[Dict[str, Any]]):
+        """提交一批检查的更新
+
+        开启摘要时并入发件箱的摘要窗口：窗口内（跨多个定时批次）发现的更新，每个目标只收到一条消息。
+        """
+        if not updates:
+            return
+        if self.notify_digest:
+            for update in updates:
+                logger.info(f"[鸿蒙监控] 发现更新: {update['app_name']} v{update['old_ver']} -> v{update['new_ver']}")
+            self._outbox.enqueue_digest(updates, self._notification_targets(), self.notify_digest_window)
+            return
+        for update in updates:
+            await self._send_notification(
+                update['app_name'], update['old_ver'], update['new_ver'], update['url'], update.get('record')
+            )
+    
+    async def _deliver_message(self, target_type: str, target_id: str, message: str) -> bool:
+        """通过AstrBot投递一条消息
+
+        目标ID可以直接填写完整的会话标识（平台:消息类型:ID），
+        否则按配置的平台拼接群聊/私聊会话。
+        """
+        if ':' in target_id:
+            session = target_id
+        else:
+            message_type = 'GroupMessage' if target_type == 'group' else 'FriendMessage'
+            session = f"{self.notify_platform_id}:{message_type}:{target_id}"
+        try:
+            with self.metrics.timer("notify_send_seconds", target_type=target_type):
+                ok = await self._ctx.send_message(session, MessageChain().message(message))
+        except Exception:
+            self.metrics.inc("notify", result="error", target_type=target_type)
+            raise
+        if ok is False:
+            self.metrics.inc("notify", result="no_platform", target_type=target_type)
+            logger.warning(f"[鸿蒙监控] 未找到消息平台，发送失败: {session}")
+            return False
+        self.metrics.inc("notify", result="success", target_type=target_type)
+        if self.enable_debug_log:
+            logger.info(f"[鸿蒙监控] 已发送通知到: {session}")
+        return True
     
     async def _monitor_loop(self):
-        """定时监控循环"""
-        while self._is_running:
-            try:
-                await self._check_all_apps()
-            except Exception as e:
-                logger.error(f"[鸿蒙监控] 监控循环出错: {e}")
-            
-            # 等待指定间隔
-            await asyncio.sleep(self.check_interval * 60)
+        """定时监控循环：按各详情页的到期时间派发检查，不等待上一批完成"""
+        try:
+            await self._seed_scheduler()
+            while self._is_running:
+                try:
+                    delay = self._scheduler.seconds_until_next()
+                    if delay is None:
+                        await asyncio.sleep(60)
+                        continue
+                    if delay > 0:
+                        # 最多睡眠一分钟，便于及时响应调度变化
+                        await asyncio.sleep(min(delay, 60))
+                        continue
+                    
+                    # 正在被手动检查的详情页也照常派发，会直接加入进行中的检查
+                    targets = []
+                    for key in self._scheduler.pop_due():
+                        if key not in self.watchlist.targets:
+                            continue
+                        if not self._owns_target(key):
+                            # 由集群中其他实例负责：保持排期，取得分片后按原节奏检查
+                            self._scheduler.reschedule(key, OUTCOME_SKIPPED)
+                            continue
+                        targets.append(self.watchlist.targets[key])
+                    if targets:
+                        task = asyncio.create_task(self._run_scheduled_batch(targets))
+                        self._batch_tasks.add(task)
+                        task.add_done_callback(self._batch_tasks.discard)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"[鸿蒙监控] 监控循环出错: {e}")
+                    await asyncio.sleep(5)
+        finally:
+            for task in list(self._batch_tasks):
+                task.cancel()
     
-    async def _check_all_apps(self):
+    async def _run_scheduled_batch(self, targets: List[FetchTarget]):
+        """检查一批到期的详情页，并根据结果重新排期"""
+        outcomes: Dict[str, str] = {}
+        try:
+            outcomes = await self._check_apps(targets, scheduled=True)
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 定时检查出错: {e}")
+        finally:
+            for target in targets:
+                next_due = self._scheduler.reschedule(target.key, outcomes.get(target.key, OUTCOME_FAILED))
+                if self.enable_debug_log and next_due:
+                    logger.info(f"[鸿蒙监控] {target.key} 下次检查: {time.strftime('%H:%M:%S', time.localtime(next_due))}")
+    
+    async def _check_all_apps(self, on_result: Optional[Callable[[FetchTarget, Dict[str, Any]], None]] = None):
         """检查所有应用"""
-        if not self.apps_to_watch:
+        if not self.watchlist:
             return
-            
-        logger.info(f"[鸿蒙监控] 开始检查 ({time.strftime('%H:%M:%S')})")
         
-        for app in self.apps_to_watch:
-            app_name = app.get('app_name', '未知应用')
-            detail_url = app.get('detail_url', '')
-            selector = app.get('version_selector', 'span.content-value')
-            
-            if not detail_url:
-                logger.warning(f"[鸿蒙监控] 应用 '{app_name}' 缺少链接")
+        await self._check_apps(list(self.watchlist.targets.values()), on_result)
+        if self.prune_unwatched:
+            self._prune_version_store()
+            self._save_version_store()
+    
+    async def _fetch_guarded(self, app_key: str, url: str, deadline: Optional[float],
+                             fetch: Callable[[float, FetchAttempt], Any]) -> tuple:
+        """在主机熔断与本轮时间预算的保护下执行一次抓取，返回 (结果, 耗时秒)
+
+        fetch 接收浏览器渲染的超时秒数（按该主机渲染的延迟自适应，且不超过本轮剩余预算）
+        及记录主机响应情况的 FetchAttempt。只有传输层失败（导航出错、超时、5xx/429）计入熔断，
+        页面已加载但选择器未命中按主机正常计。
+        熔断中或预算不足时抛出 FetchSkippedError：在等待并发名额之前先判断一次，不阻塞调用方；
+        取得名额后再判断一次，排队期间主机已熔断的抓取同样跳过，也不占用限速令牌。
+        """
+        host = HostRateLimiter.host_of(url)
+        if deadline is not None and deadline - time.monotonic() < MIN_FETCH_BUDGET:
+            raise BudgetExhaustedError("本轮检查时间预算已用完")
+        if self._breakers.is_open(host):
+            self.metrics.inc("fetch", result="circuit_open", app=app_key, host=host)
+            raise CircuitOpenError(f"{host} 熔断中")
+        
+        record: Dict[str, str] = {}
+        error: Optional[Exception] = None
+        attempt = FetchAttempt()
+        allowed = False
+        timeout = limit = self._breakers.timeout_for(host, TIER_BROWSER)
+        start = time.monotonic()
+        try:
+            async with self._fetch_semaphore:
+                if deadline is not None and deadline - time.monotonic() < MIN_FETCH_BUDGET:
+                    raise BudgetExhaustedError("本轮检查时间预算已用完")
+                # 半开状态下只有一个抓取能取得探测名额
+                if not self._breakers.allow(host):
+                    self.metrics.inc("fetch", result="circuit_open", app=app_key, host=host)
+                    raise CircuitOpenError(f"{host} 熔断中")
+                allowed = True
+                await self._rate_limiter.acquire(url)
+                # 限速等待不计入耗时与时间预算
+                start = time.monotonic()
+                if deadline is not None:
+                    timeout = max(MIN_FETCH_BUDGET, min(timeout, deadline - time.monotonic()))
+                # 浏览器渲染之前可能先走HTTP快速通道（接口与静态页面各一次请求），整体期限留出余量
+                limit = timeout
+                if self._worker_pool is not None:
+                    # 不能先于工作池的硬性期限取消：否则卡死的子进程不会被结束，之后的任务仍派给它
+                    limit = max(limit, self._worker_pool.job_timeout + WORKER_TIMEOUT_MARGIN)
+                if self.enable_http_fast_path and self._http_fetcher.available:
+                    limit += 2 * self._http_fetcher.timeout
+                self._sweep_budget.begin()
+                try:
+                    record = await asyncio.wait_for(fetch(timeout, attempt), timeout=limit)
+                finally:
+                    self._sweep_budget.end()
+        except asyncio.TimeoutError:
+            attempt.failed("timeout")
+            self.metrics.inc("fetch", result="timeout", app=app_key, host=host)
+            logger.error(f"[鸿蒙监控] 抓取超过{limit:.0f}秒，放弃: {url}")
+        except (asyncio.CancelledError, FetchSkippedError):
+            # 没有得出结果，不计入熔断
+            if allowed:
+                self._breakers.release(host)
+            raise
+        except Exception as e:
+            error = e
+        elapsed = time.monotonic() - start
+
+        ok = attempt.outcome
+        if ok is None:
+            # 未请求该主机（结果来自接口或缓存）或出错原因与主机无关
+            self._breakers.release(host)
+            if error is not None:
+                raise error
+            return record, elapsed
+        circuit = self._breakers.get(host)
+        previous = circuit.state
+        self._breakers.record(host, ok, attempt.samples)
+        if circuit.state != previous:
+            if circuit.state == STATE_OPEN:
+                logger.warning(f"[鸿蒙监控] {host} 连续失败{circuit.failures}次，暂停抓取{self.circuit_cooldown}秒")
+            else:
+                logger.info(f"[鸿蒙监控] {host} 探测成功，恢复抓取")
+        if error is not None:
+            raise error
+        return record, elapsed
+    
+    async def _check_target(self, target: FetchTarget, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """抓取一个详情页并提交各别名的版本记录
+
+        同一详情页同时只会有一个此任务（见 _check_apps），版本记录不会被并发检查覆盖。
+        主机熔断或时间预算用完时不抓取，结果为 skipped，各别名保留最后一次成功的版本。
+        返回: {'outcome', 'apps': [(名称, 版本, 旧版本)], 'observations', 'updates', 'error', 'skipped'}
+        """
+        result: Dict[str, Any] = {'outcome': OUTCOME_FAILED, 'apps': [], 'observations': [], 'updates': [],
+                                  'error': None, 'skipped': None}
+        spec, indexes = self._get_target_spec(target)
+        # 列表页只提供版本号，配置了附加字段的详情页仍需单独加载
+        listed = None if spec.has_extra_fields else self._get_listed_version(target.key)
+        # 按各别名的版本规则处理，与详情页提取的格式一致
+        listed = spec.version_record(listed) if listed else None
+        try:
+            if listed and listed.get(VERSION_FIELD):
+                record, fetch_ms = listed, None
+                self.metrics.inc("fetch", result="listed", app=target.key, host=HostRateLimiter.host_of(target.url))
+                self._record_fetch_tier(target.key, TIER_LIST)
+            else:
+                record, elapsed = await self._fetch_guarded(
+                    target.key, target.url, deadline,
+                    lambda timeout, attempt: self._fetch_version_tiered(
+                        target.key, target.url, spec, timeout, attempt
+                    )
+                )
+                fetch_ms = int(elapsed * 1000)
+        except asyncio.CancelledError:
+            raise
+        except FetchSkippedError as e:
+            result['outcome'] = OUTCOME_SKIPPED
+            result['skipped'] = str(e)
+            result['apps'] = [(app.name, None, self._get_stored_version(app.name)) for app in target.apps]
+            return result
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 检查 {'/'.join(target.names)} 出错: {e}")
+            result['error'] = str(e)
+            result['apps'] = [(app.name, None, self._get_stored_version(app.name)) for app in target.apps]
+            return result
+        
+        parts = split_record(record, max(indexes) + 1)
+        seen_at = int(time.time())
+        for app, index in zip(target.apps, indexes):
+            app_name = app.name
+            if app_name not in self.watchlist:
+                # 检查期间已通过 /refresh 移除
                 continue
-                
-            version = await self._fetch_version(detail_url, selector)
+            record = parts[index]
+            version = record.get(VERSION_FIELD)
+            old_version = self._get_stored_version(app_name)
+            result['apps'].append((app_name, version, old_version))
             if not version:
-                logger.warning(f"[鸿蒙监控] 无法获取 {app_name} 的版本号")
+                if any(part.get(VERSION_FIELD) for part in parts):
+                    # 页面已加载，只有该别名的选择器未命中
+                    logger.warning(f"[鸿蒙监控] {app_name} 的版本选择器未匹配（同一页面的其他别名已取得版本），"
+                                   f"请检查选择器: {app.version_selector}")
+                else:
+                    logger.warning(f"[鸿蒙监控] 无法获取 {app_name} 的版本号")
                 continue
-                
-            old_version = self.version_store.get(app_name)
             
+            result['observations'].append((app_name, version, seen_at, fetch_ms))
+            self._last_success[app_name] = seen_at
+            # 只标记脏数据，本轮结束后统一落盘；版本未变时附加字段的变化也会记录
+            self.version_store.set(app_name, record)
+            if result['outcome'] == OUTCOME_FAILED:
+                result['outcome'] = OUTCOME_OK
             if old_version is None:
-                self.version_store[app_name] = version
-                self._save_version_store()
                 logger.info(f"[鸿蒙监控] 首次记录 {app_name}: v{version}")
             elif version != old_version:
-                self.version_store[app_name] = version
-                self._save_version_store()
-                logger.info(f"[鸿蒙监控] 发现更新 {app_name}: v{old_version} -> v{version}")
-                await self._send_notification(app_name, old_version, version, detail_url)
+                result['outcome'] = OUTCOME_CHANGED
+                result['updates'].append({
+                    'app_name': app_name, 'old_ver': old_version, 'new_ver': version,
+                    'url': app.detail_url, 'record': record
+                })
+        return result
+    
+    async def _check_apps(self, targets: List[FetchTarget],
+                          on_result: Optional[Callable[[FetchTarget, Dict[str, Any]], None]] = None,
+                          scheduled: bool = False) -> Dict[str, str]:
+        """检查一组详情页（有界并发抓取），返回 目标键 -> 检查结果
+
+        每个详情页只加载一次，提取结果分发给该页面的所有别名。
+        检查是单飞的：详情页已在检查中（定时批次或其他 /check）时直接加入该检查，
+        历史与通知只由发起检查的一方提交。每个详情页完成时调用 on_result。
+        scheduled 为真时使用按检查间隔累计的时间预算，否则本次调用单独计算预算。
+        """
+        outcomes: Dict[str, str] = {}
+        if not targets:
+            return outcomes
+        
+        app_count = sum(len(target.apps) for target in targets)
+        logger.info(f"[鸿蒙监控] 开始检查 {app_count} 个应用 ({len(targets)}个详情页, {time.strftime('%H:%M:%S')})")
+        start_time = time.time()
+        # 整体时间预算：各次抓取的超时不超过剩余预算，用完后其余详情页顺延
+        if scheduled:
+            remaining = self._sweep_budget.remaining()
+            deadline = None if remaining is None else time.monotonic() + remaining
+        else:
+            deadline = time.monotonic() + self.sweep_budget if self.sweep_budget else None
+        
+        # 先刷新覆盖这些详情页的列表页，命中的详情页不再单独加载
+        await self._refresh_list_sources(targets, deadline)
+        
+        tasks: Dict[asyncio.Task, tuple] = {}
+        joined = 0
+        for index, target in enumerate(targets):
+            task, owned = self._checks_in_flight.run(
+                target.key, lambda target=target: self._check_target(target, deadline)
+            )
+            tasks[task] = (index, target, owned)
+            joined += not owned
+        if joined:
+            logger.info(f"[鸿蒙监控] {joined} 个详情页正在检查中，直接等待其结果")
+        
+        owned_results = []
+        skipped = 0
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, target, owned = tasks[task]
+                try:
+                    result = task.result()
+                except asyncio.CancelledError:
+                    result = {'outcome': OUTCOME_FAILED, 'apps': [], 'observations': [], 'updates': [],
+                              'error': "已取消", 'skipped': None}
+                except Exception as e:
+                    result = {'outcome': OUTCOME_FAILED, 'apps': [], 'observations': [], 'updates': [],
+                              'error': str(e), 'skipped': None}
+                outcomes[target.key] = result['outcome']
+                skipped += result['outcome'] == OUTCOME_SKIPPED
+                if owned:
+                    owned_results.append((index, result))
+                if on_result is not None:
+                    on_result(target, result)
+        
+        # 抓取是并发的，但历史与通知按配置顺序提交
+        owned_results.sort(key=lambda item: item[0])
+        observations = [obs for _, result in owned_results for obs in result['observations']]
+        updates = [update for _, result in owned_results for update in result['updates']]
+        
+        self._save_version_store()
+        await self._record_history(observations)
+        self.metrics.observe("check_batch_seconds", time.time() - start_time)
+        # 只入队，投递由发件箱异步完成，不阻塞检查；集群中每个版本只由一个实例通知
+        await self._send_notifications(await self._claim_updates(updates))
+        
+        skipped_info = f"，{skipped}个详情页因熔断或时间预算跳过" if skipped else ""
+        logger.info(f"[鸿蒙监控] 检查完成，共 {app_count} 个应用，耗时 {time.time() - start_time:.1f}秒{skipped_info}")
+        return outcomes
+    
+    def _get_listed_version(self, package_id: str) -> Optional[str]:
+        """从未过期的列表页结果中读取版本号"""
+        entry = self._listed_versions.get(package_id)
+        if entry is None or time.time() - entry[1] > self.list_max_age:
+            return None
+        return entry[0]
+    
+    async def _refresh_list_sources(self, targets: List[FetchTarget], deadline: Optional[float] = None):
+        """抓取已过期且与这批详情页相关的列表页（单飞、并发）"""
+        if not self.list_sources:
+            return
+        now = time.time()
+        keys = {target.key for target in targets}
+        stale = []
+        for source in self.list_sources:
+            fetched = self._list_results.get(source.url)
+            if fetched and now - fetched[0] <= self.list_max_age:
+                continue
+            # 首次抓取前覆盖范围未知；之后只刷新包含这批详情页的列表页
+            if fetched and fetched[1] and keys.isdisjoint(fetched[1]):
+                continue
+            stale.append(source)
+        tasks = [
+            self._checks_in_flight.run(source.key, lambda source=source: self._fetch_list_source(source, deadline))[0]
+            for source in stale
+        ]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _fetch_list_source(self, source: ListSource, deadline: Optional[float] = None) -> Dict[str, str]:
+        """加载一个列表页并更新 包名 -> 版本 索引，先尝试静态HTML，再用浏览器渲染"""
+        host = HostRateLimiter.host_of(source.url)
+        tier = None
+        
+        async def fetch(timeout: float, attempt: FetchAttempt) -> Dict[str, str]:
+            nonlocal tier
+            if self.enable_http_fast_path and self._http_fetcher.available:
+                with self.metrics.timer("fetch_phase_seconds", phase="http", app=source.key, host=host):
+                    versions = await self._http_fetcher.fetch_html(source.url, source, attempt)
+                if versions:
+                    tier = TIER_HTML
+                    return versions
+            # ListSource 与 ExtractionSpec 接口一致，直接复用浏览器抓取流程
+            versions = await self._fetch_version(source.url, source, source.key, timeout, attempt)
+            tier = TIER_BROWSER if versions else None
+            return versions
+        
+        try:
+            versions, elapsed = await self._fetch_guarded(source.key, source.url, deadline, fetch)
+        except FetchSkippedError as e:
+            logger.info(f"[鸿蒙监控] 跳过列表页 {source.url}: {e}")
+            return {}
+        self.metrics.observe("fetch_seconds", elapsed, app=source.key, host=host, tier=tier or "none")
+        self._record_fetch_tier(source.key, tier)
+        
+        now = time.time()
+        self._list_results[source.url] = (now, versions)
+        for package_id, version in versions.items():
+            self._listed_versions[package_id] = (version, now)
+        covered = sum(1 for package_id in versions if package_id in self.watchlist.targets)
+        logger.info(f"[鸿蒙监控] 列表页 {source.url} 取得 {len(versions)} 个应用版本 (监控中{covered}个)")
+        return versions
+    
+    async def _fetch_version_tiered(self, app_key: str, url: str, spec: ExtractionSpec,
+                                    timeout: Optional[float] = None,
+                                    attempt: Optional[FetchAttempt] = None) -> Dict[str, str]:
+        """分层抓取：先走HTTP快速通道，失败再回退到浏览器渲染（渲染的时间预算为 timeout 秒）"""
+        host = HostRateLimiter.host_of(url)
+        start = time.perf_counter()
+        record, tier = {}, None
+        if self.enable_http_fast_path and self._http_fetcher.available:
+            with self.metrics.timer("fetch_phase_seconds", phase="http", app=app_key, host=host):
+                record, tier = await self._http_fetcher.fetch(url, spec, attempt)
+        
+        if not record.get(VERSION_FIELD):
+            record = await self._fetch_version(url, spec, app_key, timeout, attempt)
+            tier = TIER_BROWSER if record.get(VERSION_FIELD) else None
+        
+        self.metrics.observe("fetch_seconds", time.perf_counter() - start,
+                             app=app_key, host=host, tier=tier or "none")
+        if tier:
+            self.metrics.inc("fetch", result="success", app=app_key, host=host)
+        self._record_fetch_tier(app_key, tier)
+        if self.enable_debug_log and tier:
+            logger.info(f"[鸿蒙监控] {app_key} 通过 {tier} 获取: {record}")
+        return record
+    
+    def _record_fetch_tier(self, app_key: str, tier: Optional[str]):
+        """记录每个详情页的抓取层级统计"""
+        stats = self.fetch_stats.setdefault(app_key, {'last_tier': None, 'tiers': {}, 'failures': 0})
+        if tier:
+            stats['last_tier'] = tier
+            stats['tiers'][tier] = stats['tiers'].get(tier, 0) + 1
+        else:
+            stats['failures'] += 1
     
-    async def _fetch_version(self, url: str, selector: str) -> str:
-        """抓取版本号"""
+    async def _fetch_version(self, url: str, spec: ExtractionSpec, app_key: str = "",
+                             timeout: Optional[float] = None,
+                             attempt: Optional[FetchAttempt] = None) -> Dict[str, str]:
+        """通过浏览器渲染抓取版本号及附加字段（启用子进程时在子进程中渲染），timeout 为时间预算（秒）
+
+        attempt 不为空时记录主机的响应情况：页面加载完成记一次渲染延迟样本，
+        页面已加载但等待选择器超时只记为有响应，导航失败与子进程卡死记为传输失败。
+        """
         if not PLAYWRIGHT_AVAILABLE:
             logger.warning(f"[鸿蒙监控] Playwright不可用，无法抓取: {url}")
-            return ""
-            
+            return {}
+        
+        attempt = attempt if attempt is not None else FetchAttempt()
+        labels = {'app': app_key, 'host': HostRateLimiter.host_of(url)}
+        phases: Dict[str, float] = {}
+        capture: Optional[Dict[str, str]] = {} if self._snapshots is not None else None
+        start = time.monotonic()
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
-                
-                # 设置超时和重试
-                await page.goto(url, wait_until="networkidle", timeout=60000)
-                await page.wait_for_selector(selector, timeout=30000)
-                
-                text = await page.text_content(selector)
-                await browser.close()
-                
-                return text.strip() if text else ""
+            if self._worker_pool is not None:
+                record = await self._worker_pool.fetch(url, spec, phases, timeout, capture)
+            else:
+                record = await fetch_rendered(self._browser_pool, url, spec, phases, timeout, capture)
+            attempt.responded(TIER_BROWSER, time.monotonic() - start)
+            return record
+        except NavigationError as e:
+            attempt.failed(str(e))
+            self.metrics.inc("fetch", result="error", **labels)
+            logger.error(f"[鸿蒙监控] 页面加载失败 {url}: {e}")
+            return {}
         except PlaywrightTimeoutError:
+            # 页面已加载，等待选择器超时：多半是选择器失效，不代表主机故障
+            attempt.responded(TIER_BROWSER)
+            self.metrics.inc("fetch", result="timeout", **labels)
+            logger.error(f"[鸿蒙监控] 抓取超时: {url}")
+            return {}
+        except WorkerTimeoutError:
+            attempt.failed("worker timeout")
+            self.metrics.inc("fetch", result="timeout", **labels)
             logger.error(f"[鸿蒙监控] 抓取超时: {url}")
-            return ""
+            return {}
         except Exception as e:
+            self.metrics.inc("fetch", result="error", **labels)
             logger.error(f"[鸿蒙监控] 抓取失败 {url}: {e}")
-            return ""
+            return {}
+        finally:
+            for phase, seconds in phases.items():
+                self.metrics.observe("fetch_phase_seconds", seconds, phase=phase, **labels)
+            self._save_snapshot(url, capture)
     
     # ---------- 插件管理指令 ----------
     
@@ -323,64 +1306,413 @@ class HarmonyAppMonitor(Star):
         """查看状态 /status"""
         status = [
             "📊 鸿蒙监控状态",
-            f"• 监控应用: {len(self.apps_to_watch)}个",
-            f"• 检查间隔: {self.check_interval}分钟",
+            f"• 监控应用: {len(self.watchlist)}个 (详情页{len(self.watchlist.targets)}个)",
+            f"• 检查间隔: {self.check_interval}分钟 (自适应: {'✅' if self.adaptive_interval else '❌'})",
+            f"• 下次检查: {self._format_next_due()}",
+            f"• 并发检查: {self.max_concurrency}个 (单主机 {self.host_rate_limit}次/秒)",
+            f"• 主机熔断: {self._format_circuit_summary()}",
             f"• 运行状态: {'✅ 运行中' if self._is_running else '❌ 已停止'}",
             f"• Playwright: {'✅ 可用' if PLAYWRIGHT_AVAILABLE else '❌ 不可用'}",
+            f"• 浏览器: {'✅ 运行中' if self._browser_pool.is_alive else '💤 未启动'} (启动{self._browser_pool.launch_count}次, 崩溃重启{self._browser_pool.crash_count}次)",
+            f"• 浏览器内存: {self._format_browser_memory()}",
+            f"• 抓取模式: {self.fetch_profile} (已拦截请求{self._browser_pool.blocked_requests}个)",
+            f"• 抓取子进程: {self._format_worker_summary()}",
             f"• 通知群组: {len(self.notification_groups)}个",
             f"• 通知用户: {len(self.notification_users)}个",
+            f"• 待发送通知: {len(self._outbox)}条",
             f"• 版本记录: {len(self.version_store)}个",
+            f"• 抓取层级: {self._format_tier_summary()}",
+            f"• 列表页: {len(self.list_sources)}个 (当前覆盖{self._count_listed_targets()}个详情页)",
+            f"• 条件请求: {self._format_cache_summary()}",
+            f"• 页面快照: {self._format_snapshot_summary()}",
+            f"• 集群: {self._format_cluster_summary()}",
             f"• 调试模式: {'✅ 开启' if self.enable_debug_log else '❌ 关闭'}"
         ]
         yield event.plain_result("\n".join(status))
     
+    def _format_next_due(self) -> str:
+        """最近一次计划检查的时间"""
+        if self._scheduler is None:
+            return "未调度"
+        delay = self._scheduler.seconds_until_next()
+        if delay is None:
+            return "未调度"
+        return f"{time.strftime('%H:%M:%S', time.localtime(time.time() + delay))} ({len(self._checks_in_flight)}个检查中)"
+    
+    def _format_circuit_summary(self) -> str:
+        """熔断中的主机与各主机当前的自适应超时"""
+        stats = self._breakers.stats()
+        if not stats:
+            return "暂无"
+        open_hosts = self._breakers.open_hosts()
+        timeouts = ", ".join(
+            f"{host} " + "/".join(f"{tier} {seconds:.0f}秒" for tier, seconds in item['timeouts'].items())
+            for host, item in stats.items() if item['timeouts']
+        )
+        state = f"⚠️ 熔断中: {', '.join(open_hosts)}" if open_hosts else "✅ 正常"
+        return f"{state} (超时: {timeouts})" if timeouts else state
+    
+    @staticmethod
+    def _format_age(timestamp: float) -> str:
+        seconds = max(0, time.time() - timestamp)
+        if seconds < 3600:
+            return f"{seconds // 60:.0f}分钟前"
+        if seconds < 86400:
+            return f"{seconds / 3600:.1f}小时前"
+        return f"{seconds / 86400:.1f}天前"
+    
+    def _format_last_known(self, app_name: str) -> str:
+        """最后一次成功获取的版本及其确认时间"""
+        version = self._get_stored_version(app_name)
+        if not version:
+            return "v未知"
+        last_success = self._last_success.get(app_name)
+        age = f"{self._format_age(last_success)}确认" if last_success else "确认时间未知"
+        return f"v{version}, {age}"
+    
+    def _format_browser_memory(self) -> str:
+        """Chromium内存与回收情况（启用子进程时为各子进程合计）"""
+        if self._worker_pool is not None:
+            stats = self._worker_pool.browser_stats()
+        else:
+            stats = self._browser_pool.stats()
+        return (f"{stats['rss_mb']:.0f}MB / 峰值{stats['peak_rss_mb']:.0f}MB "
+                f"({stats['chromium_processes']}个进程), 回收{stats['recycle_count']}次, "
+                f"看门狗强制结束{stats['watchdog_kills']}次")
+    
+    def _format_worker_summary(self) -> str:
+        if self._worker_pool is None:
+            return "未启用（在机器人进程内渲染）"
+        stats = self._worker_pool.stats()
+        return (f"{stats['alive']}/{stats['workers']}个运行中, 处理中{stats['pending']}个, "
+                f"已完成{stats['jobs_done']}个, 崩溃{stats['crash_count']}次, 超时结束{stats['kill_count']}次")
+    
+    def _count_listed_targets(self) -> int:
+        return sum(1 for key in self.watchlist.targets if self._get_listed_version(key))
+    
+    def _format_cache_summary(self) -> str:
+        """HTTP条件请求（304/内容哈希）命中情况"""
+        stats = self._http_fetcher.cache_stats()
+        if not stats['not_modified'] + stats['hash_hits'] + stats['misses']:
+            return "暂无"
+        return (f"命中率 {stats['hit_rate']:.0%} "
+                f"(304: {stats['not_modified']}, 哈希: {stats['hash_hits']}, 未命中: {stats['misses']})")
+    
+    def _format_cluster_summary(self) -> str:
+        if self._cluster is None:
+            return "未启用（单实例）"
+        stats = self._cluster.stats()
+        owned = sum(1 for key in self.watchlist.targets if self._cluster.owns(key))
+        state = "⚠️ 协调库不可用" if self._cluster_failed else "✅ 正常"
+        return (f"{state}, 实例 {stats['instance_id']} (存活{stats['live_instances']}个), "
+                f"持有分片 {stats['owned_shards']}/{stats['shard_count']} (负责{owned}个详情页)")
+    
+    def _format_snapshot_summary(self) -> str:
+        if self._snapshots is None:
+            return "未启用"
+        stats = self._snapshots.stats()
+        return (f"{stats['entries']}个页面, {stats['bytes'] / 1048576:.1f}/{stats['max_bytes'] / 1048576:.0f}MB "
+                f"({stats['codec']}, 淘汰{stats['evictions']}个)")
+    
+    def _format_tier_summary(self) -> str:
+        """汇总各抓取层级的成功次数"""
+        totals: Dict[str, int] = {}
+        for stats in self.fetch_stats.values():
+            for tier, count in stats['tiers'].items():
+                totals[tier] = totals.get(tier, 0) + count
+        if not totals:
+            return "暂无"
+        return ", ".join(f"{tier}={count}" for tier, count in sorted(totals.items()))
+    
     @filter.command("check")
     async def cmd_check(self, event: AstrMessageEvent):
-        """立即检查更新 /check"""
-        yield event.plain_result("🔍 正在检查所有应用更新，请稍候...")
+        """立即检查更新 /check [应用名称或包名]"""
+        args = event.get_plain_text().strip().split()
+        query = " ".join(args[1:])
+        if query:
+            apps = self.watchlist.find(query)
+            if not apps:
+                yield event.plain_result(f"❌ 未找到应用: {query}")
+                return
+        else:
+            apps = self.watchlist.apps
+        if not apps:
+            yield event.plain_result("📭 当前没有监控任何应用")
+            return
+        
+        wanted = {app.name for app in apps}
+        targets = list({app.key: self.watchlist.targets[app.key] for app in apps}.values())
+        yield event.plain_result(f"🔍 正在检查 {len(apps)} 个应用，结果将陆续返回...")
         
+        # 检查在后台进行，每个详情页完成即放入队列；攒够一批或等待超过 CHECK_STREAM_INTERVAL 秒即回复
+        queue: asyncio.Queue = asyncio.Queue()
         start_time = time.time()
-        await self._check_all_apps()
-        elapsed = time.time() - start_time
+        sweep = asyncio.create_task(self._check_apps(targets, lambda target, result: queue.put_nowait(result)))
         
-        # 获取当前版本信息
-        current_info = []
-        for app in self.apps_to_watch:
-            app_name = app['app_name']
-            version = self.version_store.get(app_name, "未知")
-            current_info.append(f"  • {app_name}: v{version}")
+        lines, received, counts = [], 0, {'updated': 0, 'failed': 0, 'skipped': 0}
+        flush_at = None
+        while received < len(targets):
+            if queue.empty():
+                if sweep.done():
+                    # 检查提前结束（出错），不再等待剩余结果
+                    break
+                timeout = None if flush_at is None else max(0.0, flush_at - time.monotonic())
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, sweep}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    if flush_at is not None and time.monotonic() >= flush_at:
+                        yield event.plain_result("\n".join(lines))
+                        lines, flush_at = [], None
+                    continue
+                result = getter.result()
+            else:
+                result = queue.get_nowait()
+            received += 1
+            for app_name, version, old_version in result['apps']:
+                if app_name not in wanted:
+                    continue
+                if result.get('skipped'):
+                    # 熔断中或预算用完：不等待抓取，给出最后一次成功的版本及其时效
+                    counts['skipped'] += 1
+                    lines.append(f"  ⏸️ {app_name}: {self._format_last_known(app_name)} ({result['skipped']})")
+                elif not version:
+                    counts['failed'] += 1
+                    lines.append(f"  ❌ {app_name}: 获取失败 (记录: v{old_version or '未知'})")
+                elif old_version and version != old_version:
+                    counts['updated'] += 1
+                    lines.append(f"  🆕 {app_name}: v{old_version} → v{version}")
+                else:
+                    lines.append(f"  • {app_name}: v{version}")
+            if lines and flush_at is None:
+                flush_at = time.monotonic() + CHECK_STREAM_INTERVAL
+            if len(lines) >= CHECK_STREAM_BATCH or (lines and time.monotonic() >= flush_at):
+                yield event.plain_result("\n".join(lines))
+                lines, flush_at = [], None
+        if lines:
+            yield event.plain_result("\n".join(lines))
         
-        result = [
-            f"✅ 检查完成！耗时: {elapsed:.1f}秒",
-            "",
-            "📋 当前版本信息:"
-        ] + current_info
+        try:
+            await sweep
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 手动检查出错: {e}")
+            yield event.plain_result(f"❌ 检查出错: {e}")
+            return
+        if not query and self.prune_unwatched:
+            self._prune_version_store()
+            self._save_version_store()
         
-        yield event.plain_result("\n".join(result))
+        elapsed = time.time() - start_time
+        yield event.plain_result(
+            f"✅ 检查完成！耗时: {elapsed:.1f}秒 "
+            f"(更新{counts['updated']}个, 失败{counts['failed']}个, 跳过{counts['skipped']}个)"
+        )
     
     @filter.command("list")
     async def cmd_list(self, event: AstrMessageEvent):
-        """列出监控应用 /list"""
-        if not self.apps_to_watch:
+        """列出监控应用 /list [应用名称或包名]"""
+        if not self.watchlist:
             yield event.plain_result("📭 当前没有监控任何应用")
             return
         
+        args = event.get_plain_text().strip().split()
+        query = " ".join(args[1:])
+        apps = self.watchlist.find(query) if query else self.watchlist.apps
+        if not apps:
+            yield event.plain_result(f"❌ 未找到应用: {query}")
+            return
+        
         result = ["📱 监控应用列表:"]
-        for i, app in enumerate(self.apps_to_watch, 1):
-            current_version = self.version_store.get(app['app_name'], '未知')
-            result.append(f"{i}. {app['app_name']} (当前: v{current_version})")
-            result.append(f"   链接: {app['detail_url'][:50]}...")
-            result.append(f"   选择器: {app['version_selector']}")
+        for i, app in enumerate(apps, 1):
+            result.append(f"{i}. {app.name} (当前: {self._format_last_known(app.name)})")
+            result.append(f"   包名: {app.key}")
+            result.append(f"   链接: {app.detail_url[:50]}...")
+            result.append(f"   选择器: {app.version_selector}")
+            aliases = [name for name in self.watchlist.targets[app.key].names if name != app.name]
+            if aliases:
+                result.append(f"   同页别名: {', '.join(aliases)}")
+            schedule = self._scheduler.get(app.key) if self._scheduler else None
+            if schedule:
+                next_check = time.strftime('%m-%d %H:%M', time.localtime(schedule.next_due))
+                backoff = f", 连续失败{schedule.failures}次" if schedule.failures else ""
+                result.append(f"   间隔: {schedule.interval / 60:.0f}分钟, 下次: {next_check}{backoff}")
+            last_tier = self.fetch_stats.get(app.key, {}).get('last_tier')
+            if last_tier:
+                result.append(f"   抓取方式: {last_tier}")
+            if not self._owns_target(app.key):
+                result.append("   🔀 定时检查由集群中其他实例负责")
+            if self._breakers.is_open(HostRateLimiter.host_of(app.detail_url)):
+                result.append("   ⚠️ 应用市场熔断中，显示的是最后一次成功获取的版本")
+            result.append("")
+        
+        result.append(f"总计: {len(apps)} 个应用")
+        yield event.plain_result("\n".join(result))
+    
+    @filter.command("stats")
+    async def cmd_stats(self, event: AstrMessageEvent):
+        """查看性能统计 /stats [应用名称或包名]"""
+        args = event.get_plain_text().strip().split()
+        query = " ".join(args[1:])
+        filters = {}
+        if query:
+            # 抓取指标按详情页（包名）记录，名称先解析为包名
+            target = self.watchlist.target_of(query)
+            filters['app'] = target.key if target else query
+        
+        title = f"⏱️ 性能统计 - {query}" if filters else "⏱️ 性能统计"
+        result = [title, "", "抓取阶段 (次数 / p50 / p95 / p99):"]
+        
+        def fmt(row):
+            name, count, p50, p95, p99 = row
+            return f"  • {name}: {count}次 / {p50 * 1000:.0f}ms / {p95 * 1000:.0f}ms / {p99 * 1000:.0f}ms"
+        
+        phases = self.metrics.summarize("fetch_phase_seconds", "phase", **filters)
+        if phases:
+            result.extend(fmt(row) for row in phases)
+        else:
+            result.append("  暂无数据")
+        
+        tiers = self.metrics.summarize("fetch_seconds", "tier", **filters)
+        if tiers:
+            result.append("")
+            result.append("单次抓取总耗时（按层级）:")
+            result.extend(fmt(row) for row in tiers)
+        
+        outcomes = self.metrics.counter_totals("fetch", "result", **filters)
+        if outcomes:
+            result.append("")
+            result.append("抓取结果: " + ", ".join(f"{k}={int(v)}" for k, v in sorted(outcomes.items())))
+        
+        if not filters:
+            result.append("")
+            result.append("其他:")
+            for metric, label in (("store_flush_seconds", "版本记录落盘"),
+                                  ("history_write_seconds", "历史库写入"),
+                                  ("notify_send_seconds", "通知发送"),
+                                  ("check_batch_seconds", "检查批次")):
+                for row in self.metrics.summarize(metric, "__all__"):
+                    result.append(fmt((label,) + row[1:]))
+            notify = self.metrics.counter_totals("notify", "result")
+            if notify:
+                result.append("  通知结果: " + ", ".join(f"{k}={int(v)}" for k, v in sorted(notify.items())))
+        
+        yield event.plain_result("\n".join(result))
+    
+    @filter.command("history")
+    async def cmd_history(self, event: AstrMessageEvent):
+        """查看版本历史 /history <应用名称> [条数]"""
+        args = event.get_plain_text().strip().split()
+        
+        if len(args) < 2:
+            yield event.plain_result("❌ 用法: /history <应用名称> [条数]\n例如: /history 一日记账 10")
+            return
+        if self.history_db is None:
+            yield event.plain_result("❌ 版本历史未启用或初始化失败")
+            return
+        
+        limit = 10
+        if len(args) > 2 and args[-1].isdigit():
+            limit = max(1, min(int(args[-1]), 100))
+            app_name = " ".join(args[1:-1])
+        else:
+            app_name = " ".join(args[1:])
+        
+        try:
+            rows = await self._run_in_thread(self.history_db.query, app_name, limit)
+            total = await self._run_in_thread(self.history_db.count, app_name)
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 查询版本历史失败: {e}")
+            yield event.plain_result(f"❌ 查询失败: {e}")
+            return
+        
+        if not rows:
+            yield event.plain_result(f"📭 没有 {app_name} 的版本历史")
+            return
+        
+        fmt = lambda ts: time.strftime('%Y-%m-%d %H:%M', time.localtime(ts))
+        result = [f"📜 {app_name} 版本历史 (最近{len(rows)}条 / 共{total}条):"]
+        for version, first_seen, last_seen, cost in rows:
+            line = f"  • v{version}  发现: {fmt(first_seen)}  最后确认: {fmt(last_seen)}"
+            if cost is not None:
+                line += f"  ({cost}ms)"
+            result.append(line)
+        
+        # 按首次发现时间估算发版间隔
+        if len(rows) > 1:
+            span_days = (rows[0][1] - rows[-1][1]) / 86400
             result.append("")
+            result.append(f"平均发版间隔: {span_days / (len(rows) - 1):.1f}天")
         
-        result.append(f"总计: {len(self.apps_to_watch)} 个应用")
         yield event.plain_result("\n".join(result))
     
+    @filter.command("trysel")
+    async def cmd_trysel(self, event: AstrMessageEvent):
+        """离线试验选择器 /trysel <应用名称或包名> [选择器]
+
+        在最近一次渲染的页面快照上执行，不访问网络也不启动浏览器；
+        省略选择器时按应用当前的提取规则提取。
+        """
+        args = event.get_plain_text().strip().split()
+        if len(args) < 2:
+            yield event.plain_result("❌ 用法: /trysel <应用名称或包名> [选择器]\n例如: /trysel 一日记账 span.content-value")
+            return
+        if self._snapshots is None:
+            yield event.plain_result("❌ 页面快照未启用，请先配置页面快照缓存大小")
+            return
+        if not BS4_AVAILABLE:
+            yield event.plain_result("❌ 需要安装 beautifulsoup4")
+            return
+        
+        # 应用名称可能含空格：取能匹配到应用的最长前缀，其余为选择器
+        app, selector = None, ""
+        for end in range(len(args), 1, -1):
+            apps = self.watchlist.find(" ".join(args[1:end]))
+            if apps:
+                app, selector = apps[0], " ".join(args[end:])
+                break
+        if app is None:
+            yield event.plain_result(f"❌ 未找到应用: {args[1]}")
+            return
+        
+        url = self.watchlist.targets[app.key].url
+        spec = compile_spec(build_rules(selector)) if selector else self._get_extract_spec(app)
+        try:
+            snapshot = await self._run_in_thread(self._snapshots.get, url)
+            if snapshot is None:
+                yield event.plain_result(f"📭 还没有 {app.name} 的页面快照，浏览器抓取一次后才会保存")
+                return
+            result = await self._run_in_thread(dry_run, snapshot.html, spec, selector)
+        except ValueError as e:
+            yield event.plain_result(f"❌ {e}")
+            return
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 离线试验选择器失败: {e}")
+            yield event.plain_result(f"❌ 试验失败: {e}")
+            return
+        
+        lines = [
+            f"🧪 {app.name} 页面快照 ({self._format_age(snapshot.saved_at)}保存, {len(snapshot.html) // 1024}KB)",
+            f"• 选择器: {selector or '当前配置'}",
+        ]
+        if selector:
+            lines.append(f"• 匹配: {result['count']}个元素")
+            for i, text in enumerate(result['texts'], 1):
+                lines.append(f"  {i}. {text[:80] or '(空文本)'}")
+        record = result['record']
+        if record:
+            lines.append("• 提取结果:")
+            lines.extend(f"  {name}: {value}" for name, value in record.items())
+        else:
+            lines.append("• 提取结果: 无（选择器未匹配到非空文本）")
+        lines.append(f"⏱️ 解析{result['parse_ms']:.0f}ms, 执行{result['eval_ms']:.1f}ms")
+        yield event.plain_result("\n".join(lines))
+    
     @filter.command("notify")
     async def cmd_notify(self, event: AstrMessageEvent):
         """查看通知配置 /notify"""
         groups_info = "无" if not self.notification_groups else "\n".join([f"  • {g}" for g in self.notification_groups])
         users_info = "无" if not self.notification_users else "\n".join([f"  • {u}" for u in self.notification_users])
+        outbox_stats = self._outbox.stats()
         
         result = [
             "🔔 通知配置:",
@@ -391,7 +1723,11 @@ class HarmonyAppMonitor(Star):
             "👤 通知用户:",
             users_info,
             "",
-            f"总计: {len(self.notification_groups)} 个群组, {len(self.notification_users)} 个用户"
+            f"总计: {len(self.notification_groups)} 个群组, {len(self.notification_users)} 个用户",
+            "",
+            f"📮 发件箱: 待发送{outbox_stats['pending']}条, 已发送{outbox_stats['sent']}条, "
+            f"失败重试{outbox_stats['failed']}次, 放弃{outbox_stats['dropped']}条",
+            f"📰 摘要模式: {f'✅ 开启 (窗口{self.notify_digest_window}秒)' if self.notify_digest else '❌ 关闭'}"
         ]
         
         yield event.plain_result("\n".join(result))
@@ -503,29 +1839,55 @@ class HarmonyAppMonitor(Star):
     
     @filter.command("refresh")
     async def cmd_refresh(self, event: AstrMessageEvent):
-        """刷新配置 /refresh"""
-        # 保存当前运行状态
-        was_running = self._is_running
-        
-        # 停止监控任务
-        if self._is_running and self._monitor_task:
-            self._is_running = False
-            self._monitor_task.cancel()
-            try:
-                await self._monitor_task
-            except asyncio.CancelledError:
-                pass
-            await asyncio.sleep(1)
+        """刷新配置 /refresh（增量生效，不中断监控任务与正在进行的检查）"""
+        old_watchlist = self.watchlist
+        old_concurrency = self.max_concurrency
+        old_browser_options = self._browser_options()
+        old_cluster = (self.cluster_db_path, self.cluster_instance_id, self.cluster_shards, self.cluster_lease)
         
-        # 重新初始化配置
+        # 重新读取配置，只重建配置项与监控列表，浏览器、缓存与调度状态均保留
         self._init_config()
+        added, removed, changed = old_watchlist.diff(self.watchlist)
+        fetch_changes = self._apply_fetch_settings(old_concurrency, old_browser_options)
+        fetch_changes += self._apply_notify_settings()
+        self.version_store.debounce_seconds = self.store_flush_delay
+        self._http_fetcher.debug = self.enable_debug_log
+        self._breakers.threshold = self.circuit_failure_threshold
+        self._breakers.cooldown = self.circuit_cooldown
+        self._sweep_budget.configure(self.sweep_budget, self.check_interval * 60)
+        self._init_snapshot_cache()
+        # 丢弃已移除的列表页结果（索引中的版本随有效期自然过期）
+        source_urls = {source.url for source in self.list_sources}
+        for url in [url for url in self._list_results if url not in source_urls]:
+            del self._list_results[url]
+        if removed and self.prune_unwatched:
+            self._prune_version_store()
+            self._save_version_store()
         
-        # 重新启动监控任务
-        if was_running and self.apps_to_watch and PLAYWRIGHT_AVAILABLE:
-            self._is_running = True
-            self._monitor_task = asyncio.create_task(self._monitor_loop())
+        if self._is_running and self._scheduler is not None:
+            counts = self._sync_scheduler(old_watchlist)
+            schedule_info = f"调度: 新增{counts['added']}个, 移除{counts['removed']}个, 间隔更新{counts['updated']}个详情页"
+        else:
+            # 之前未启动（如列表为空），按新配置启动
+            self._start_monitor_task()
+            schedule_info = f"监控任务: {'✅ 已启动' if self._is_running else '❌ 未启动'}"
         
-        yield event.plain_result("✅ 配置已刷新，监控任务已重启")
+        if self.metrics_textfile and (self._metrics_task is None or self._metrics_task.done()):
+            self._metrics_task = asyncio.create_task(self._metrics_export_loop())
+        
+        logger.info(f"[鸿蒙监控] 配置已刷新: 新增{len(added)}个, 移除{len(removed)}个, 修改{len(changed)}个应用"
+                    f"{'; 已更新' + '、'.join(fetch_changes) if fetch_changes else ''}")
+        lines = [
+            "✅ 配置已刷新",
+            f"• 应用: 新增{len(added)}个, 移除{len(removed)}个, 修改{len(changed)}个",
+            f"• {schedule_info}",
+        ]
+        if fetch_changes:
+            lines.append(f"• 已更新: {'、'.join(fetch_changes)}")
+        new_cluster = (self.cluster_db_path, self.cluster_instance_id, self.cluster_shards, self.cluster_lease)
+        if new_cluster != old_cluster:
+            lines.append("• ⚠️ 集群配置的修改需重新加载插件后生效")
+        yield event.plain_result("\n".join(lines))
     
     @filter.command("help")
     async def cmd_help(self, event: AstrMessageEvent):
@@ -535,8 +1897,11 @@ class HarmonyAppMonitor(Star):
             "",
             "🔧 配置指令:",
             "  /status - 查看插件状态",
-            "  /check - 立即检查更新",
-            "  /list - 列出监控应用",
+            "  /check [应用名称或包名] - 立即检查更新",
+            "  /list [应用名称或包名] - 列出监控应用",
+            "  /stats [应用名称或包名] - 查看性能统计",
+            "  /history <应用名称> [条数] - 查看版本历史",
+            "  /trysel <应用名称或包名> [选择器] - 用页面快照离线试验选择器",
             "  /notify - 查看通知配置",
             "  /add_notify <group|user> <ID> - 添加通知目标",
             "  /del_notify <group|user> <ID或序号> - 删除通知目标",
@@ -562,4 +1927,42 @@ class HarmonyAppMonitor(Star):
         if self._is_running and self._monitor_task:
             self._is_running = False
             self._monitor_task.cancel()
-            logger.info("[鸿蒙监控] 监控任务已停止")
\ No newline at end of file
+            logger.info("[鸿蒙监控] 监控任务已停止")
+        
+        # 取消正在进行的检查，落盘尚未保存的版本记录
+        self._checks_in_flight.cancel_all()
+        self._save_version_store()
+        
+        # 停止指标导出
+        if self._metrics_task:
+            self._metrics_task.cancel()
+        
+        # 停止通知派发，未发送的消息保留到下次启动
+        self._outbox.stop()
+        
+        # 退出集群：释放分片租约，其他实例在下次心跳时接手
+        if self._cluster is not None:
+            if self._cluster_task:
+                self._cluster_task.cancel()
+            try:
+                self._cluster.leave()
+                self._cluster.close()
+            except Exception as e:
+                logger.error(f"[鸿蒙监控] 退出集群失败: {e}")
+        
+        # 关闭版本历史库
+        if self.history_db is not None:
+            try:
+                self.history_db.close()
+            except Exception as e:
+                logger.error(f"[鸿蒙监控] 关闭版本历史库失败: {e}")
+        
+        # 关闭共享浏览器与HTTP会话
+        try:
+            loop = asyncio.get_event_loop()
+            loop.create_task(self._browser_pool.close())
+            if self._worker_pool is not None:
+                loop.create_task(self._worker_pool.close())
+            loop.create_task(self._http_fetcher.close())
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 释放抓取资源失败: {e}")
\ No newline at end of file
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+# 直方图分桶（秒），覆盖从HTTP快速通道到浏览器超时的范围
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 90)
+# 每个序列保留的最近样本数，用于计算分位数
+RESERVOIR_SIZE = 1024
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def quantile(samples: List[float], q: float) -> float:
+    """最近邻法计算分位数，samples 需已排序"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(q * (len(samples) - 1)))))
+    return samples[index]
+
+
+class Histogram:
+    """单个序列的直方图：累计分桶 + 最近样本（计算分位数用）"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "samples")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        self.samples.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """进程内指标：直方图与计数器，按标签区分序列"""
+
+    def __init__(self, prefix: str = "harmony"):
+        self.prefix = prefix
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels):
+        series = self._histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        series = self._counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """计时代码块（异常时同样记录）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # ---------- 查询 ----------
+
+    def summarize(self, name: str, group_by: str, **filters) -> List[Tuple[str, int, float, float, float]]:
+        """按某个标签汇总直方图: [(标签值, 次数, p50, p95, p99), ...]"""
+        groups: Dict[str, List[float]] = {}
+        counts: Dict[str, int] = {}
+        for key, histogram in self._histograms.get(name, {}).items():
+            labels = dict(key)
+            if any(labels.get(k) != str(v) for k, v in filters.items()):
+                continue
+            group = labels.get(group_by, "")
+            groups.setdefault(group, []).extend(histogram.samples)
+            counts[group] = counts.get(group, 0) + histogram.count
+        result = []
+        for group, samples in sorted(groups.items()):
+            samples.sort()
+            result.append((group, counts[group], quantile(samples, 0.5),
+                           quantile(samples, 0.95), quantile(samples, 0.99)))
+        return result
+
+    def counter_totals(self, name: str, group_by: str, **filters) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for key, value in self._counters.get(name, {}).items():
+            labels = dict(key)
+            if any(labels.get(k) != str(v) for k, v in filters.items()):
+                continue
+            group = labels.get(group_by, "")
+            totals[group] = totals.get(group, 0) + value
+        return totals
+
+    # ---------- Prometheus 文本格式 ----------
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for name in sorted(self._histograms):
+            full = f"{self.prefix}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} histogram")
+            for key, histogram in sorted(self._histograms[name].items()):
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{full}_bucket{_format_labels(key, [('le', repr(float(bound)))])} {count}")
+                lines.append(f"{full}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{full}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+        for name in sorted(self._counters):
+            full = f"{self.prefix}_{name}_total"
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} counter")
+            for key, value in sorted(self._counters[name].items()):
+                lines.append(f"{full}{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """原子写入 node_exporter textfile collector 可读取的文件"""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".harmony_metrics.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render_prometheus())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
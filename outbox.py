@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 与 AstrBot 使用同一个日志器，模块本身不依赖 AstrBot
+logger = logging.getLogger("astrbot")
+
+# 投递函数: (目标类型, 目标ID, 消息文本) -> 是否成功
+Sender = Callable[[str, str, str], Awaitable[bool]]
+# 摘要格式化函数: 合并的条目 -> 消息文本
+Formatter = Callable[[List[Dict[str, Any]]], str]
+
+
+class NotificationOutbox:
+    """通知发件箱
+
+    检查流程只负责把消息放入发件箱，由独立的派发任务负责投递：
+    - 每条消息按目标拆分，多个目标以有限并发同时发送
+    - 发送失败按指数退避重试，超过次数后丢弃并记录日志
+    - 未投递的消息持久化到磁盘，重启后继续发送
+    - 摘要消息在一个时间窗口内收集条目，窗口结束时由 formatter 合并为一条发送
+    """
+
+    def __init__(self, path: str, sender: Sender, concurrency: int = 4,
+                 max_retries: int = 5, retry_base_seconds: float = 10.0,
+                 formatter: Optional[Formatter] = None):
+        self.path = path
+        self.sender = sender
+        self.formatter = formatter
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.retry_base_seconds = max(1.0, float(retry_base_seconds))
+        self._messages: List[Dict] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # 统计信息
+        self.sent_count = 0
+        self.failed_count = 0
+        self.dropped_count = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def configure(self, concurrency: int, max_retries: int):
+        """修改投递并发与重试次数，从下一次派发起生效（已在重试中的消息按新次数判断）"""
+        self.concurrency = max(1, int(concurrency))
+        self.max_retries = max(0, int(max_retries))
+
+    # ---------- 持久化 ----------
+
+    def load(self):
+        """加载上次未投递的消息"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._messages = [m for m in json.load(f) if isinstance(m, dict)]
+                if self._messages:
+                    logger.info(f"[鸿蒙监控] 发件箱中有 {len(self._messages)} 条待发送通知")
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 加载发件箱失败: {e}")
+            self._messages = []
+
+    def persist(self):
+        """原子地保存未投递的消息"""
+        directory = os.path.dirname(self.path) or "."
+        tmp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".harmony_outbox.", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._messages, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 保存发件箱失败: {e}")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    # ---------- 入队 ----------
+
+    def enqueue(self, text: str, targets: Sequence[Tuple[str, str]]):
+        """为每个目标生成一条待发送消息，立即落盘并唤醒派发任务"""
+        if not targets:
+            return
+        now = time.time()
+        for target_type, target_id in targets:
+            self._messages.append({
+                'id': uuid.uuid4().hex,
+                'target_type': target_type,
+                'target_id': target_id,
+                'text': text,
+                'attempts': 0,
+                'next_attempt': now,
+                'created': now,
+            })
+        self.persist()
+        self._wakeup.set()
+
+    def enqueue_digest(self, items: Sequence[Dict[str, Any]], targets: Sequence[Tuple[str, str]],
+                       window: float):
+        """把条目并入各目标正在收集中的摘要，没有时新建一条，window 秒后合并发送
+
+        条目需可JSON序列化。摘要开始发送后不再并入，之后的条目进入新的摘要。
+        """
+        if not items or not targets:
+            return
+        now = time.time()
+        for target_type, target_id in targets:
+            collecting = next((
+                m for m in self._messages
+                if 'items' in m and m['attempts'] == 0 and m['next_attempt'] > now
+                and m['target_type'] == target_type and m['target_id'] == target_id
+            ), None)
+            if collecting is not None:
+                collecting['items'].extend(items)
+                continue
+            self._messages.append({
+                'id': uuid.uuid4().hex,
+                'target_type': target_type,
+                'target_id': target_id,
+                'text': "",
+                'items': list(items),
+                'attempts': 0,
+                'next_attempt': now + max(0.0, window),
+                'created': now,
+            })
+        self.persist()
+        self._wakeup.set()
+
+    def _render(self, message: Dict) -> str:
+        if message.get('items') and self.formatter is not None:
+            return self.formatter(message['items'])
+        return message['text']
+
+    # ---------- 派发 ----------
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._dispatch_loop())
+            if self._messages:
+                self._wakeup.set()
+
+    def stop(self):
+        """停止派发并保存剩余消息"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.persist()
+
+    def _seconds_until_next(self) -> Optional[float]:
+        if not self._messages:
+            return None
+        return max(0.0, min(m['next_attempt'] for m in self._messages) - time.time())
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                delay = self._seconds_until_next()
+                if delay is None or delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._dispatch_ready()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[鸿蒙监控] 通知派发出错: {e}")
+                await asyncio.sleep(5)
+
+    async def _dispatch_ready(self):
+        """并发发送所有已到期的消息"""
+        now = time.time()
+        ready = [m for m in self._messages if m['next_attempt'] <= now]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send_one(message: Dict) -> bool:
+            async with semaphore:
+                try:
+                    return bool(await self.sender(message['target_type'], message['target_id'], self._render(message)))
+                except Exception as e:
+                    logger.error(f"[鸿蒙监控] 发送通知失败 {message['target_type']}:{message['target_id']}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(send_one(m) for m in ready))
+
+        done_ids = set()
+        for message, ok in zip(ready, results):
+            if ok:
+                self.sent_count += 1
+                done_ids.add(message['id'])
+                continue
+            self.failed_count += 1
+            message['attempts'] += 1
+            if message['attempts'] > self.max_retries:
+                self.dropped_count += 1
+                done_ids.add(message['id'])
+                logger.error(f"[鸿蒙监控] 通知重试{self.max_retries}次仍失败，已放弃: "
+                             f"{message['target_type']}:{message['target_id']}")
+            else:
+                message['next_attempt'] = time.time() + self.retry_base_seconds * (2 ** (message['attempts'] - 1))
+
+        self._messages = [m for m in self._messages if m['id'] not in done_ids]
+        self.persist()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': len(self._messages),
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'dropped': self.dropped_count,
+        }
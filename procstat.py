@@ -0,0 +1,95 @@
+import os
+import signal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Chromium 相关的进程名（/proc/<pid>/comm）
+CHROMIUM_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def available() -> bool:
+    """是否可以读取进程信息（仅Linux）"""
+    return os.path.isdir("/proc")
+
+
+def read_children() -> Dict[int, List[int]]:
+    """读取 /proc 构建 父进程 -> 子进程 映射"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read().decode("utf-8", "replace")
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def descendants(pid: int, children: Optional[Dict[int, List[int]]] = None) -> List[int]:
+    children = read_children() if children is None else children
+    stack, result = [pid], []
+    while stack:
+        for child in children.get(stack.pop(), []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+
+def process_name(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/comm", "r") as f:
+            return f.read().strip().lower()
+    except OSError:
+        return ""
+
+
+def process_rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def chromium_pids(root: Optional[int] = None) -> List[int]:
+    """root（默认本进程）下所有Chromium子孙进程"""
+    if not available():
+        return []
+    root = os.getpid() if root is None else root
+    return [pid for pid in descendants(root) if any(n in process_name(pid) for n in CHROMIUM_NAMES)]
+
+
+def process_tree(roots: Iterable[int]) -> List[int]:
+    """仍存活的根进程及其全部子孙进程"""
+    if not available():
+        return []
+    children = read_children()
+    result: List[int] = []
+    for root in roots:
+        if root in result or not os.path.exists(f"/proc/{root}"):
+            continue
+        result.extend(pid for pid in [root] + descendants(root, children) if pid not in result)
+    return result
+
+
+def tree_rss_kb(roots: Iterable[int]) -> Tuple[int, int]:
+    """返回 (进程数, RSS合计KB)"""
+    pids = process_tree(roots)
+    return len(pids), sum(process_rss_kb(pid) for pid in pids)
+
+
+def kill_pids(pids: List[int]) -> int:
+    """强制结束一组进程，返回成功发送信号的数量"""
+    killed = 0
+    for pid in pids:
+        try:
+            os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            killed += 1
+        except (ProcessLookupError, PermissionError, OSError):
+            continue
+    return killed
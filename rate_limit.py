@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """令牌桶：以固定速率补充令牌，允许短时突发"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """取走一个令牌，令牌不足时等待（按到达顺序排队）"""
+        async with self._lock:
+            while True:
+                if self.rate <= 0:
+                    # 等待期间限速被关闭（/refresh）
+                    return
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class HostRateLimiter:
+    """按主机名划分的限速器，每个主机一个令牌桶
+
+    rate <= 0 时不做任何限速。
+    """
+
+    def __init__(self, rate: float = 1.0, burst: float = 2.0):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def configure(self, rate: float, burst: float):
+        """修改速率与突发容量，已有的令牌桶立即生效"""
+        self.rate = float(rate)
+        self.burst = float(burst)
+        for bucket in self._buckets.values():
+            bucket.rate = self.rate
+            bucket.capacity = max(1.0, self.burst)
+            bucket._tokens = min(bucket._tokens, bucket.capacity)
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    async def acquire(self, url: str):
+        if self.rate <= 0:
+            return
+        host = self.host_of(url)
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
@@ -0,0 +1,169 @@
+import heapq
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 检查结果
+OUTCOME_CHANGED = "changed"   # 发现新版本
+OUTCOME_OK = "ok"             # 成功但版本未变
+OUTCOME_FAILED = "failed"     # 抓取失败
+OUTCOME_SKIPPED = "skipped"   # 未抓取（主机熔断或本轮时间预算用完）
+
+
+class AppSchedule:
+    """单个应用的调度状态"""
+
+    __slots__ = ("key", "base_interval", "interval", "planned", "next_due", "failures", "token")
+
+    def __init__(self, key: str, base_interval: float, next_due: float):
+        self.key = key
+        self.base_interval = base_interval   # 配置的检查间隔（秒）
+        self.interval = base_interval        # 自适应后的当前间隔（秒）
+        self.planned = next_due              # 不含抖动的计划时间，用于推算下一次，避免抖动累积
+        self.next_due = next_due             # 实际的下次检查时间戳（含抖动）
+        self.failures = 0                    # 连续失败次数
+        self.token = 0                       # 堆中条目的有效性标记
+
+
+class AppScheduler:
+    """按下次到期时间排序的优先队列调度器
+
+    - 每个应用独立间隔，可单独配置
+    - 下次时间按“上次计划时间 + 间隔”推算，不受检查耗时影响，不会漂移
+    - 随机抖动分散负载，避免所有应用同时触发
+    - 自适应：发现新版本时缩短间隔，长期不变时逐步放宽
+    - 连续失败时指数退避
+    """
+
+    def __init__(self, jitter_ratio: float = 0.1, adaptive: bool = True,
+                 min_interval: float = 600, max_interval: float = 14400,
+                 max_backoff: float = 21600):
+        self.configure(jitter_ratio, adaptive, min_interval, max_interval, max_backoff)
+        self._schedules: Dict[str, AppSchedule] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = 0
+
+    def configure(self, jitter_ratio: float, adaptive: bool, min_interval: float,
+                  max_interval: float, max_backoff: float):
+        """更新调度参数，已有应用的排期保持不变，从下次重新排期起生效"""
+        self.jitter_ratio = max(0.0, jitter_ratio)
+        self.adaptive = adaptive
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.max_backoff = max_backoff
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._schedules
+
+    def get(self, key: str) -> Optional[AppSchedule]:
+        return self._schedules.get(key)
+
+    def _jitter(self, interval: float) -> float:
+        spread = interval * self.jitter_ratio
+        return random.uniform(-spread, spread) if spread > 0 else 0.0
+
+    def _push(self, schedule: AppSchedule):
+        # 旧条目通过 token 失效（惰性删除），无需在堆中查找
+        schedule.token += 1
+        self._seq += 1
+        heapq.heappush(self._heap, (schedule.next_due, self._seq, schedule.key, schedule.token))
+
+    def add(self, key: str, interval: float, first_due: Optional[float] = None, delay: float = 0.0):
+        """加入应用；first_due 为空时在 delay 秒后的一个抖动窗口内检查"""
+        if first_due is None:
+            spread = min(max(60.0, delay), interval * self.jitter_ratio)
+            first_due = time.time() + delay + random.uniform(0, spread)
+        schedule = AppSchedule(key, interval, first_due)
+        self._schedules[key] = schedule
+        self._push(schedule)
+
+    def remove(self, key: str):
+        schedule = self._schedules.pop(key, None)
+        if schedule is not None:
+            schedule.token += 1
+
+    def postpone(self, key: str, due: float) -> bool:
+        """把尚未执行的检查推迟到 due 之后（含抖动），已晚于 due 时不变。返回是否推迟"""
+        schedule = self._schedules.get(key)
+        if schedule is None or due <= schedule.next_due:
+            return False
+        schedule.planned = due
+        schedule.next_due = due + abs(self._jitter(schedule.interval))
+        self._push(schedule)
+        return True
+
+    def update_interval(self, key: str, interval: float):
+        """修改应用的基础间隔，并按新间隔重新计算下次时间"""
+        schedule = self._schedules.get(key)
+        if schedule is None or schedule.base_interval == interval:
+            return
+        last_planned = schedule.planned - schedule.interval
+        schedule.base_interval = interval
+        schedule.interval = interval
+        schedule.planned = max(time.time(), last_planned + interval)
+        schedule.next_due = schedule.planned
+        self._push(schedule)
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        """距离最近一个到期应用的秒数，没有应用时返回 None"""
+        now = time.time() if now is None else now
+        while self._heap:
+            due, _, key, token = self._heap[0]
+            schedule = self._schedules.get(key)
+            if schedule is None or schedule.token != token:
+                heapq.heappop(self._heap)
+                continue
+            return max(0.0, due - now)
+        return None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """取出所有已到期的应用（按到期时间排序）。
+
+        取出后应用不在堆中，直到调用 reschedule 重新排期。
+        """
+        now = time.time() if now is None else now
+        due_keys = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key, token = heapq.heappop(self._heap)
+            schedule = self._schedules.get(key)
+            if schedule is None or schedule.token != token:
+                continue
+            due_keys.append(key)
+        return due_keys
+
+    def reschedule(self, key: str, outcome: str, now: Optional[float] = None) -> Optional[float]:
+        """根据检查结果计算下次检查时间，返回新的到期时间"""
+        schedule = self._schedules.get(key)
+        if schedule is None:
+            return None
+        now = time.time() if now is None else now
+
+        if outcome == OUTCOME_FAILED:
+            schedule.failures += 1
+            # 失败后不按计划时间推算，而是从现在起退避
+            delay = min(schedule.interval * (2 ** min(schedule.failures, 10)), self.max_backoff)
+            schedule.planned = now + delay
+            schedule.next_due = schedule.planned + self._jitter(delay)
+        else:
+            # 跳过时没有得到结果，间隔与失败计数保持不变
+            if outcome != OUTCOME_SKIPPED:
+                schedule.failures = 0
+                if self.adaptive and outcome == OUTCOME_CHANGED:
+                    # 发版频繁的应用检查得更勤
+                    schedule.interval = min(schedule.interval, max(self.min_interval, schedule.interval / 2))
+                elif self.adaptive:
+                    # 长期不变的应用逐步放宽，上限至少为配置的间隔
+                    upper = max(self.max_interval, schedule.base_interval)
+                    schedule.interval = min(upper, schedule.interval * 1.25)
+            planned = schedule.planned + schedule.interval
+            if planned <= now:
+                # 错过了计划时间（如长时间挂起），从现在起重新排期，不做补偿性集中检查
+                planned = now + schedule.interval
+            schedule.planned = planned
+            schedule.next_due = planned + self._jitter(schedule.interval)
+
+        self._push(schedule)
+        return schedule.next_due
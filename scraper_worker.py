@@ -0,0 +1,96 @@
+"""抓取子进程的入口
+
+子进程以 spawn 方式启动，会重新导入本模块及其依赖，因此这里（以及 browser_pool、
+extractor、list_source）不导入 AstrBot，日志使用标准库 logging。
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .browser_pool import BrowserPool, NavigationError, PlaywrightTimeoutError, fetch_rendered
+from .extractor import compile_spec
+from .list_source import ListSource
+
+# 提取器描述，可跨进程传递: ("spec", 规则) 或 ("list", 构造参数)
+ExtractorDesc = Tuple[str, tuple]
+
+
+def describe_extractor(extractor) -> ExtractorDesc:
+    if isinstance(extractor, ListSource):
+        return ("list", (extractor.url, extractor.row_selector, extractor.version_selector,
+                         extractor.id_selector, extractor.version_regex))
+    return ("spec", tuple(extractor.rules))
+
+
+def build_extractor(desc: ExtractorDesc):
+    kind, args = desc
+    if kind == "list":
+        return ListSource(*args)
+    return compile_spec(tuple(tuple(rule) for rule in args))
+
+
+# ---------- 子进程 ----------
+
+def _worker_main(conn, options: Dict[str, Any]):
+    """子进程入口：独占一个浏览器，循环处理父进程发来的抓取任务"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(processName)s] %(levelname)s %(message)s")
+    if hasattr(os, "setpgrp"):
+        # 独立进程组，父进程可以连同Chromium子进程一起结束
+        os.setpgrp()
+    try:
+        asyncio.run(_worker_serve(conn, options))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_serve(conn, options: Dict[str, Any]):
+    pool = BrowserPool(**options)
+    loop = asyncio.get_running_loop()
+    send_lock = threading.Lock()
+    tasks = set()
+
+    def send(message: Dict[str, Any]):
+        with send_lock:
+            conn.send(message)
+
+    def recv() -> Optional[Dict[str, Any]]:
+        try:
+            return conn.recv()
+        except (EOFError, OSError):
+            return None
+
+    async def run_job(job: Dict[str, Any]):
+        phases: Dict[str, float] = {}
+        capture: Optional[Dict[str, str]] = {} if job.get('capture') else None
+        reply = {'id': job['id'], 'record': {}, 'phases': phases, 'error': None, 'timeout': False,
+                 'navigation': False}
+        try:
+            reply['record'] = await fetch_rendered(
+                pool, job['url'], build_extractor(job['extractor']), phases, job.get('timeout'), capture
+            )
+        except NavigationError as e:
+            reply['error'], reply['navigation'] = str(e), True
+        except PlaywrightTimeoutError as e:
+            reply['error'], reply['timeout'] = str(e) or "timeout", True
+        except Exception as e:
+            reply['error'] = f"{type(e).__name__}: {e}"
+        # 附带浏览器池统计（内存、回收次数），供父进程展示
+        reply['browser'] = pool.stats()
+        if capture:
+            reply['html'] = capture.get('html', "")
+        send(reply)
+
+    try:
+        while True:
+            job = await loop.run_in_executor(None, recv)
+            if job is None or job.get('op') == 'stop':
+                break
+            task = asyncio.create_task(run_job(job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        for task in list(tasks):
+            task.cancel()
+        await pool.close()
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Iterator, Tuple
+
+
+class SingleFlight:
+    """同一个键同时只执行一次
+
+    键已有进行中的任务时，后来的调用直接加入该任务、共享其结果，
+    任务结束后自动移除，下次调用重新执行。
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tasks
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._tasks))
+
+    def run(self, key: str, factory: Callable[[], Awaitable]) -> Tuple[asyncio.Task, bool]:
+        """返回 (任务, 是否由本次调用新建)"""
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            return task, False
+        task = asyncio.ensure_future(factory())
+        self._tasks[key] = task
+        task.add_done_callback(lambda done, key=key: self._discard(key, done))
+        return task, True
+
+    def _discard(self, key: str, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def cancel_all(self):
+        for task in self._tasks.values():
+            task.cancel()
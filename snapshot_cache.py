@@ -0,0 +1,235 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# zstd 压缩更快、压缩率更高，未安装 zstandard 时使用标准库 gzip
+ZSTD_AVAILABLE = False
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger("astrbot")
+
+SUFFIX_ZSTD = ".html.zst"
+SUFFIX_GZIP = ".html.gz"
+
+# 读取快照时表示文件损坏或截断的异常
+CORRUPT_ERRORS = (OSError, EOFError, ValueError) + ((zstandard.ZstdError,) if ZSTD_AVAILABLE else ())
+
+
+def _file_key(url: str) -> str:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Snapshot:
+    """一份页面快照"""
+
+    __slots__ = ("url", "html", "saved_at")
+
+    def __init__(self, url: str, html: str, saved_at: float):
+        self.url = url
+        self.html = html
+        self.saved_at = saved_at
+
+
+class SnapshotCache:
+    """按URL保存最近一次渲染后的页面（压缩、限制总大小、LRU淘汰）
+
+    每个URL一个文件，首行为元数据（链接、保存时间），其后为HTML。
+    写入采用 临时文件 + rename；索引只在内存中保存文件大小与使用顺序，启动时按修改时间重建。
+    所有方法都是同步的，由调用方放到线程池中执行。
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.suffix = SUFFIX_ZSTD if ZSTD_AVAILABLE else SUFFIX_GZIP
+        self._index: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()  # 文件键 -> (路径, 字节数)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # 统计信息
+        self.writes = 0
+        self.evictions = 0
+
+    # ---------- 索引 ----------
+
+    def load(self):
+        """扫描缓存目录重建索引，按修改时间从旧到新排列"""
+        with self._lock:
+            self._index.clear()
+            self._bytes = 0
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith((SUFFIX_ZSTD, SUFFIX_GZIP)):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, name.split(".", 1)[0], path, stat.st_size))
+            for _, key, path, size in sorted(entries):
+                self._index[key] = (path, size)
+                self._bytes += size
+            self._evict()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._index:
+            _, (path, size) = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def resize(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max(0, int(max_bytes))
+            self._evict()
+
+    # ---------- 压缩 ----------
+
+    @staticmethod
+    def _compress(data: bytes, suffix: str) -> bytes:
+        if suffix == SUFFIX_ZSTD:
+            return zstandard.ZstdCompressor(level=6).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(data: bytes, path: str) -> bytes:
+        if path.endswith(SUFFIX_ZSTD):
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("快照为zstd格式，但未安装zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    # ---------- 读写 ----------
+
+    def put(self, url: str, html: str) -> bool:
+        """保存页面快照（替换同一URL的旧快照），失败时只记录日志"""
+        if not html:
+            return False
+        key = _file_key(url)
+        header = json.dumps({'url': url, 'saved_at': time.time()}, ensure_ascii=False)
+        try:
+            payload = self._compress(f"{header}\n{html}".encode("utf-8"), self.suffix)
+            if len(payload) > self.max_bytes:
+                return False
+            path = os.path.join(self.directory, key + self.suffix)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".snapshot-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except Exception as e:
+            logger.warning(f"[鸿蒙监控] 保存页面快照失败 {url}: {e}")
+            return False
+
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+                if old[0] != path:
+                    # 压缩格式变化（如新装了zstandard），删除旧格式的文件
+                    try:
+                        os.remove(old[0])
+                    except OSError:
+                        pass
+            self._index[key] = (path, len(payload))
+            self._bytes += len(payload)
+            self.writes += 1
+            self._evict()
+        return True
+
+    def get(self, url: str) -> Optional[Snapshot]:
+        """读取URL的最近一次快照，不存在时返回 None"""
+        key = _file_key(url)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            self._index.move_to_end(key)
+        path = entry[0]
+        try:
+            with open(path, "rb") as f:
+                data = self._decompress(f.read(), path).decode("utf-8", errors="replace")
+            header, _, html = data.partition("\n")
+            meta = json.loads(header)
+            if not isinstance(meta, dict):
+                raise ValueError("元数据格式错误")
+            snapshot = Snapshot(meta.get('url', url), html, float(meta.get('saved_at', 0)))
+            os.utime(path)
+        except FileNotFoundError:
+            self._discard(key, entry)
+            return None
+        except CORRUPT_ERRORS as e:
+            # 损坏或截断的文件直接删除，下次抓取时重新保存
+            logger.warning(f"[鸿蒙监控] 页面快照已损坏，已删除 {url}: {e}")
+            self._discard(key, entry)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return snapshot
+
+    def _discard(self, key: str, entry: Tuple[str, int]):
+        """从索引中移除条目（期间已被新快照替换时不动）"""
+        with self._lock:
+            if self._index.get(key) == entry:
+                del self._index[key]
+                self._bytes -= entry[1]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'entries': len(self._index),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'codec': "zstd" if self.suffix == SUFFIX_ZSTD else "gzip",
+            'writes': self.writes,
+            'evictions': self.evictions,
+        }
+
+
+def dry_run(html: str, spec, selector: str = "", limit: int = 5) -> Dict[str, object]:
+    """在快照上离线执行提取（需要 beautifulsoup4，不访问网络也不启动浏览器）
+
+    spec 的 extract_soup 与正式抓取的静态解析一致；selector 不为空时额外返回
+    其匹配数与前 limit 个元素的文本。选择器语法错误时抛出 ValueError。
+    """
+    from bs4 import BeautifulSoup
+
+    start = time.perf_counter()
+    soup = BeautifulSoup(html, "html.parser")
+    result: Dict[str, object] = {'parse_ms': (time.perf_counter() - start) * 1000}
+    start = time.perf_counter()
+    if selector:
+        try:
+            nodes = soup.select(selector)
+        except Exception as e:
+            raise ValueError(f"选择器无效: {e}")
+        result['count'] = len(nodes)
+        result['texts'] = [node.get_text(" ", strip=True) for node in nodes[:limit]]
+    result['record'] = spec.extract_soup(soup)
+    result['eval_ms'] = (time.perf_counter() - start) * 1000
+    return result
@@ -0,0 +1,13 @@
+import os
+import sys
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 被测的是不依赖 AstrBot 的纯模块，直接从插件目录导入
+sys.path.insert(0, PLUGIN_DIR)
+
+# 使用相对导入的模块（from .extractor import ...）需要按包导入：from plugin.version_store import ...
+plugin = types.ModuleType("plugin")
+plugin.__path__ = [PLUGIN_DIR]
+sys.modules.setdefault("plugin", plugin)
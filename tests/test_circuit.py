@@ -0,0 +1,197 @@
+import pytest
+
+import circuit as circuit_module
+from circuit import (
+    MIN_TIMEOUT, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreakers, FetchAttempt, SweepBudget
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def trip(breakers, host="h", times=None):
+    for _ in range(times or breakers.threshold):
+        assert breakers.allow(host)
+        breakers.record(host, False)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breakers = CircuitBreakers(threshold=3, cooldown=60)
+    trip(breakers, times=2)
+    assert breakers.get("h").state == STATE_CLOSED
+    # 成功清零连续失败次数
+    assert breakers.allow("h")
+    breakers.record("h", True)
+    trip(breakers, times=2)
+    assert not breakers.is_open("h")
+    trip(breakers, times=1)
+    assert breakers.get("h").state == STATE_OPEN
+    assert breakers.is_open("h")
+    assert not breakers.allow("h")
+    assert breakers.open_hosts() == ["h"]
+    assert breakers.get("h").open_count == 1
+
+
+def test_half_open_admits_a_single_probe(clock):
+    breakers = CircuitBreakers(threshold=1, cooldown=60)
+    trip(breakers)
+    clock[0] += 59
+    assert not breakers.allow("h")
+    clock[0] += 1
+    # 冷却结束：is_open 不改变状态，第一个 allow 取得探测名额
+    assert not breakers.is_open("h")
+    assert breakers.allow("h")
+    assert breakers.get("h").state == STATE_HALF_OPEN
+    assert breakers.is_open("h")
+    assert not breakers.allow("h")
+    breakers.record("h", True)
+    assert breakers.get("h").state == STATE_CLOSED
+    assert breakers.allow("h")
+
+
+def test_failed_probe_reopens(clock):
+    breakers = CircuitBreakers(threshold=3, cooldown=60)
+    trip(breakers)
+    clock[0] += 60
+    assert breakers.allow("h")
+    breakers.record("h", False)
+    circuit = breakers.get("h")
+    assert circuit.state == STATE_OPEN
+    assert circuit.opened_at == clock[0]
+    assert circuit.open_count == 2
+
+
+def test_release_frees_the_probe_without_a_result(clock):
+    breakers = CircuitBreakers(threshold=1, cooldown=60)
+    trip(breakers)
+    clock[0] += 60
+    assert breakers.allow("h")
+    breakers.release("h")
+    assert breakers.get("h").state == STATE_HALF_OPEN
+    assert breakers.allow("h")
+    # 未知主机上调用不出错
+    breakers.release("other")
+
+
+def test_zero_threshold_never_opens(clock):
+    breakers = CircuitBreakers(threshold=0)
+    trip(breakers, times=50)
+    assert breakers.get("h").state == STATE_CLOSED
+    assert breakers.allow("h")
+
+
+def test_timeout_defaults_to_max_without_samples():
+    breakers = CircuitBreakers(max_timeout=90)
+    assert breakers.timeout_for("h", "browser") == 90
+    # 上限不低于下限
+    assert CircuitBreakers(max_timeout=1).max_timeout == MIN_TIMEOUT
+
+
+def test_timeout_is_clamped_between_min_and_max():
+    breakers = CircuitBreakers(max_timeout=90)
+    breakers.record("fast", True, {"browser": 1.0})
+    # 1 + 4 * 0.5 = 3 秒，低于下限
+    assert breakers.timeout_for("fast", "browser") == MIN_TIMEOUT
+    breakers.record("slow", True, {"browser": 60.0})
+    # 60 + 4 * 30 = 180 秒，超过上限
+    assert breakers.timeout_for("slow", "browser") == 90
+
+
+def test_latency_is_estimated_per_tier():
+    breakers = CircuitBreakers(max_timeout=90)
+    breakers.record("h", True, {"browser": 10.0})
+    for _ in range(20):
+        breakers.record("h", True, {"html": 0.2})
+    # 静态页面的快速应答不影响浏览器渲染的超时
+    estimator = breakers.get("h").latency["browser"]
+    assert (estimator.srtt, estimator.rttvar) == (10.0, 5.0)
+    assert breakers.timeout_for("h", "browser") == 30.0
+    assert breakers.timeout_for("h", "html") == MIN_TIMEOUT
+    assert breakers.stats()["h"]["timeouts"] == {"browser": 30.0, "html": MIN_TIMEOUT}
+
+
+def test_smoothed_latency_update():
+    breakers = CircuitBreakers(max_timeout=90)
+    breakers.record("h", True, {"browser": 8.0})
+    breakers.record("h", True, {"browser": 16.0})
+    estimator = breakers.get("h").latency["browser"]
+    assert estimator.rttvar == pytest.approx(0.75 * 4.0 + 0.25 * 8.0)
+    assert estimator.srtt == pytest.approx(0.875 * 8.0 + 0.125 * 16.0)
+
+
+def test_failures_do_not_add_latency_samples():
+    breakers = CircuitBreakers(threshold=0)
+    breakers.record("h", False, {"browser": 80.0})
+    assert breakers.get("h").latency == {}
+
+
+def test_fetch_attempt_outcome():
+    attempt = FetchAttempt()
+    assert attempt.outcome is None
+    attempt.failed("HTTP 503")
+    assert attempt.outcome is False
+    # 主机有任何响应（如选择器未命中）即按成功计
+    attempt.responded("browser")
+    assert attempt.outcome is True
+    assert attempt.samples == {}
+    attempt.responded("html", 0.3)
+    assert attempt.samples == {"html": 0.3}
+
+
+def test_sweep_budget_accumulates_within_window():
+    budget = SweepBudget(10, window=100)
+    budget.window_start = 0.0
+    assert budget.remaining(now=1) == 10
+    budget.begin(now=1)
+    # 进行中的抓取同样计入
+    assert budget.remaining(now=5) == 6
+    budget.end(now=8)
+    budget.begin(now=20)
+    budget.end(now=25)
+    assert budget.remaining(now=30) == 0
+    # 新窗口重新计算
+    assert budget.remaining(now=100) == 10
+    assert budget.window_start == 100
+
+
+def test_sweep_budget_counts_concurrent_fetches_once():
+    budget = SweepBudget(100, window=1000)
+    budget.window_start = 0.0
+    # 8 个并发抓取各 10 秒，只占用 10 秒预算
+    for _ in range(8):
+        budget.begin(now=0)
+    for _ in range(8):
+        budget.end(now=10)
+    assert budget.remaining(now=10) == 90
+    # 部分重叠：20-30 与 25-35 合计 15 秒
+    budget.begin(now=20)
+    budget.begin(now=25)
+    budget.end(now=30)
+    assert budget.remaining(now=32) == 78
+    budget.end(now=35)
+    assert budget.remaining(now=40) == 75
+
+
+def test_sweep_budget_fetch_spanning_windows():
+    budget = SweepBudget(100, window=50)
+    budget.window_start = 0.0
+    budget.begin(now=40)
+    # 跨窗口的抓取在新窗口中从窗口起点（滚动时刻）开始计
+    assert budget.remaining(now=60) == 100
+    assert budget.window_start == 60
+    budget.end(now=70)
+    assert budget.remaining(now=70) == 90
+
+
+def test_sweep_budget_unlimited_and_reconfigure():
+    budget = SweepBudget(0, window=100)
+    budget.begin()
+    budget.end()
+    assert budget.remaining() is None
+    budget.configure(30, window=0)
+    assert budget.window == 1.0
+    assert 0 < budget.remaining() <= 30
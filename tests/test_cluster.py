@@ -0,0 +1,104 @@
+import pytest
+
+import cluster as cluster_module
+from cluster import ANNOUNCEMENT_TTL, ClusterCoordinator, shard_of
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cluster_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def make_node(tmp_path):
+    nodes = []
+
+    def make(instance_id, shard_count=16, lease_seconds=60):
+        node = ClusterCoordinator(str(tmp_path / "cluster.db"), instance_id, shard_count, lease_seconds)
+        node.open()
+        nodes.append(node)
+        return node
+
+    yield make
+    for node in nodes:
+        node.close()
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert shard_of("com.example.app", 16) == shard_of("com.example.app", 16)
+    assert all(0 <= shard_of(f"app{i}", 7) < 7 for i in range(100))
+
+
+def test_single_instance_owns_every_shard(clock, make_node):
+    node = make_node("a")
+    assert node.heartbeat() == set(range(16))
+    assert node.live_instances == 1
+    assert node.owns("any.key")
+    assert node.lease_valid
+    clock[0] += 61
+    assert not node.lease_valid
+
+
+def test_joining_instance_rebalances_to_fair_share(clock, make_node):
+    a, b = make_node("a"), make_node("b")
+    a.heartbeat()
+    # b 加入时分片仍由 a 持有，先拿不到
+    assert b.heartbeat() == set()
+    # a 下次心跳释放多出的分片，b 随后认领
+    assert len(a.heartbeat()) == 8
+    assert len(b.heartbeat()) == 8
+    assert a.owned.isdisjoint(b.owned)
+    assert a.owned | b.owned == set(range(16))
+
+
+def test_leave_hands_shards_to_remaining_instance(clock, make_node):
+    a, b = make_node("a"), make_node("b")
+    a.heartbeat()
+    b.heartbeat()
+    a.heartbeat()
+    b.heartbeat()
+    b.leave()
+    assert b.owned == set()
+    assert not b.lease_valid
+    assert a.heartbeat() == set(range(16))
+    assert a.live_instances == 1
+
+
+def test_dead_instance_leases_are_taken_over_after_expiry(clock, make_node):
+    a, b = make_node("a"), make_node("b")
+    a.heartbeat()
+    b.heartbeat()
+    a.heartbeat()
+    b.heartbeat()
+    # b 停止心跳；租约到期前 a 不会抢占
+    clock[0] += 30
+    assert len(a.heartbeat()) == 8
+    clock[0] += 31
+    assert a.heartbeat() == set(range(16))
+    assert a.live_instances == 1
+
+
+def test_shrinking_shard_count_drops_out_of_range_leases(clock, make_node):
+    make_node("a", shard_count=16).heartbeat()
+    node = make_node("a", shard_count=4)
+    assert node.heartbeat() == set(range(4))
+
+
+def test_first_claim_wins_and_owner_may_reclaim(clock, make_node):
+    a, b = make_node("a"), make_node("b")
+    assert a.claim_announcements([("x", "1.0"), ("y", "1.0")]) == [True, True]
+    assert b.claim_announcements([("x", "1.0"), ("z", "1.0")]) == [False, True]
+    # 本实例重复认领（如上次发送前被中断）仍由自己发送
+    assert a.claim_announcements([("x", "1.0")]) == [True]
+    assert b.claim_announcements([("y", "1.0")]) == [False]
+    # 新版本重新认领
+    assert b.claim_announcements([("x", "2.0")]) == [True]
+
+
+def test_announcements_expire_after_ttl(clock, make_node):
+    a, b = make_node("a"), make_node("b")
+    assert a.claim_announcements([("x", "1.0")]) == [True]
+    clock[0] += ANNOUNCEMENT_TTL + 1
+    assert b.claim_announcements([("x", "1.0")]) == [True]
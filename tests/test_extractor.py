@@ -0,0 +1,128 @@
+import asyncio
+import re
+
+import pytest
+
+from extractor import (
+    ALIAS_SEPARATOR, VERSION_FIELD, build_rules, compile_spec, merge_specs, parse_field_rules, split_record
+)
+
+
+class FakePage:
+    """按 选择器 -> 文本 模拟页面，选择器列表（逗号连接）中任一命中即可"""
+
+    def __init__(self, elements):
+        self.elements = elements
+        self.waited = []
+
+    def _query(self, selector):
+        for part in selector.split(","):
+            if part.strip() in self.elements:
+                return self.elements[part.strip()]
+        return None
+
+    async def wait_for_selector(self, selector, timeout=None):
+        self.waited.append(selector)
+        if self._query(selector) is None:
+            raise TimeoutError(f"waiting for {selector}")
+
+    async def evaluate(self, script, fields):
+        return {name: self._query(selector) for name, selector in fields}
+
+
+async def render(page, extractor):
+    """与 browser_pool.fetch_rendered 相同的顺序：等待版本选择器出现后一次取回全部字段"""
+    await page.wait_for_selector(extractor.version_selector)
+    return await extractor.extract_page(page)
+
+
+def spec(selector, *extra):
+    return compile_spec(((VERSION_FIELD, selector, ""),) + tuple(extra))
+
+
+def test_merged_version_selector_is_union_of_aliases():
+    merged = merge_specs([spec("span.a"), spec("span.b"), spec("span.a")])
+    assert merged.version_selector == "span.a, span.b"
+    assert spec("span.a").version_selector == "span.a"
+
+
+def test_alias_resolves_when_first_alias_selector_misses():
+    merged = merge_specs([spec("div.broken"), spec("span.version")])
+    page = FakePage({"span.version": "1.2.3"})
+    record = asyncio.run(render(page, merged))
+    # 页面就绪只要任一别名的版本出现
+    assert page.waited == ["div.broken, span.version"]
+    first, second = split_record(record, 2)
+    assert first == {}
+    assert second == {VERSION_FIELD: "1.2.3"}
+
+
+def test_merge_single_spec_is_unchanged():
+    single = spec("span.a")
+    assert merge_specs([single]) is single
+
+
+def test_merge_and_split_round_trip_undoes_field_collisions():
+    first = spec("span.a", ("size", "span.size", ""))
+    second = spec("span.b", ("size", "em.size", ""))
+    merged = merge_specs([first, second])
+    # 同名字段按别名序号加前缀，互不覆盖
+    assert merged.field_names == [VERSION_FIELD, "size",
+                                  f"1{ALIAS_SEPARATOR}{VERSION_FIELD}", f"1{ALIAS_SEPARATOR}size"]
+    page = FakePage({"span.a": "1.0", "span.size": "10MB", "span.b": "2.0", "em.size": "20MB"})
+    record = asyncio.run(render(page, merged))
+    assert split_record(record, 2) == [
+        {VERSION_FIELD: "1.0", "size": "10MB"},
+        {VERSION_FIELD: "2.0", "size": "20MB"},
+    ]
+
+
+def test_duplicate_aliases_share_rules_but_keep_separate_records():
+    merged = merge_specs([spec("span.a"), spec("span.a")])
+    assert merged.version_selector == "span.a"
+    record = asyncio.run(render(FakePage({"span.a": "3.1"}), merged))
+    assert split_record(record, 2) == [{VERSION_FIELD: "3.1"}, {VERSION_FIELD: "3.1"}]
+
+
+def test_split_record_ignores_out_of_range_prefixes():
+    record = {VERSION_FIELD: "1", f"1{ALIAS_SEPARATOR}{VERSION_FIELD}": "2", f"5{ALIAS_SEPARATOR}x": "y"}
+    parts = split_record(record, 2)
+    assert parts[1] == {VERSION_FIELD: "2"}
+    # 超出别名数的字段留在第一个记录中，不会丢失或越界
+    assert parts[0] == {VERSION_FIELD: "1", f"5{ALIAS_SEPARATOR}x": "y"}
+
+
+def test_regex_post_processing_takes_first_group():
+    versioned = compile_spec(((VERSION_FIELD, "span", r"v?(\d+(?:\.\d+)+)"),))
+    record = asyncio.run(render(FakePage({"span": "版本 v4.2.0"}), versioned))
+    assert record == {VERSION_FIELD: "4.2.0"}
+    assert asyncio.run(render(FakePage({"span": "无"}), versioned)) == {}
+
+
+def test_version_record_applies_each_alias_regex():
+    merged = merge_specs([
+        compile_spec(((VERSION_FIELD, "span.a", r"(\d+\.\d+)"),)),
+        spec("span.b", ("size", "em", "")),
+    ])
+    assert merged.has_extra_fields
+    record = merged.version_record("1.2.3")
+    assert split_record(record, 2) == [{VERSION_FIELD: "1.2"}, {VERSION_FIELD: "1.2.3"}]
+    assert not merge_specs([spec("a"), spec("b")]).has_extra_fields
+
+
+def test_parse_field_rules_and_build_rules():
+    rules = parse_field_rules(["*|size|em.size", "App|size|span.size|(\\d+)", "App|date|span.date"])
+    assert rules == {"*": [("size", "em.size", "")], "App": [("size", "span.size", "(\\d+)"),
+                                                              ("date", "span.date", "")]}
+    # 应用专属字段覆盖公共字段，版本字段始终在最前
+    assert build_rules("span.v", rules["App"], rules["*"]) == (
+        (VERSION_FIELD, "span.v", ""), ("size", "span.size", "(\\d+)"), ("date", "span.date", "")
+    )
+
+
+def test_parse_field_rules_rejects_bad_lines():
+    with pytest.raises(ValueError):
+        parse_field_rules(["App|size"])
+    # 正则在解析时校验
+    with pytest.raises(re.error):
+        parse_field_rules(["App|size|em|("])
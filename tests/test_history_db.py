@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+import history_db as history_module
+from history_db import HistoryDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = HistoryDB(str(tmp_path / "history.db"))
+    database.open()
+    yield database
+    database.close()
+
+
+def test_schema_is_created_idempotently(tmp_path):
+    path = str(tmp_path / "history.db")
+    for _ in range(2):
+        database = HistoryDB(path)
+        database.open()
+        database.open()
+        database.close()
+    conn = sqlite3.connect(path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert {"version_history", "meta"} <= tables
+    assert {"idx_history_app_time", "idx_history_last_seen"} <= indexes
+
+
+def test_same_version_updates_last_seen_in_place(db):
+    assert db.record_sweep([("A", "1.0", 100, 800), ("B", "2.0", 100, 900)]) == 2
+    assert db.record_sweep([("A", "1.0", 200, 700)]) == 0
+    assert db.query("A") == [("1.0", 100, 200, 700)]
+    assert db.count("A") == 1
+    assert db.last_seen_times() == {"A": 200, "B": 100}
+
+
+def test_new_version_appends_a_row(db):
+    db.record_sweep([("A", "1.0", 100, 800)])
+    assert db.record_sweep([("A", "1.1", 200, 600)]) == 1
+    # 回到旧版本（如回滚）同样记为新的一行
+    assert db.record_sweep([("A", "1.0", 300, 500)]) == 1
+    assert db.query("A") == [("1.0", 300, 300, 500), ("1.1", 200, 200, 600), ("1.0", 100, 100, 800)]
+    assert db.query("A", limit=1) == [("1.0", 300, 300, 500)]
+
+
+def test_listed_observation_keeps_fetch_time(db):
+    db.record_sweep([("A", "1.0", 100, 800)])
+    # 列表页的观测没有抓取耗时
+    db.record_sweep([("A", "1.0", 200, None)])
+    assert db.query("A") == [("1.0", 100, 200, 800)]
+
+
+def test_import_legacy_runs_once(db, monkeypatch):
+    monkeypatch.setattr(history_module.time, "time", lambda: 50)
+    db.record_sweep([("A", "1.0", 10, 800)])
+    assert db.import_legacy([("A", "1.0"), ("B", "2.0"), ("C", "")]) == 1
+    assert db.query("B") == [("2.0", 50, 50, None)]
+    assert db.count("A") == 1
+    assert db.import_legacy([("D", "1.0")]) == 0
+    assert db.count("D") == 0
+
+
+def test_empty_sweep_is_a_no_op(db):
+    assert db.record_sweep([]) == 0
+    assert db.last_seen_times() == {}
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("bs4")
+
+from plugin.circuit import FetchAttempt
+from plugin.extractor import VERSION_FIELD, compile_spec
+from plugin.http_fetcher import HttpFetcher
+
+URL = "https://appgallery.huawei.com/app/detail?id=com.example.app"
+PAGE = b'<html><body><span class="v">1.2.3</span></body></html>'
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"", headers=None, error=None):
+        self.status = status
+        self.headers = headers or {}
+        self.charset = "utf-8"
+        self._body = body
+        self._error = error
+
+    async def read(self):
+        if self._error is not None:
+            raise self._error
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """按顺序返回预设的响应，并记录每次请求的条件请求头"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+def make_fetcher(responses):
+    fetcher = HttpFetcher()
+    session = FakeSession(responses)
+
+    async def get_session():
+        return session
+    fetcher._get_session = get_session
+    return fetcher, session
+
+
+SPEC = compile_spec(((VERSION_FIELD, "span.v", ""),))
+
+
+def fetch(fetcher, spec=SPEC, attempt=None):
+    return asyncio.run(fetcher.fetch_html(URL, spec, attempt))
+
+
+def test_not_modified_reuses_last_record():
+    fetcher, session = make_fetcher([
+        FakeResponse(200, PAGE, {"ETag": '"abc"', "Last-Modified": "Mon"}),
+        FakeResponse(304),
+    ])
+    assert fetch(fetcher) == {VERSION_FIELD: "1.2.3"}
+    assert fetch(fetcher) == {VERSION_FIELD: "1.2.3"}
+    assert session.requests == [{}, {"If-None-Match": '"abc"', "If-Modified-Since": "Mon"}]
+    assert (fetcher.misses, fetcher.not_modified_hits) == (1, 1)
+
+
+def test_identical_body_is_a_hash_hit():
+    fetcher, session = make_fetcher([FakeResponse(200, PAGE), FakeResponse(200, PAGE, {"ETag": '"new"'})])
+    fetch(fetcher)
+    assert fetch(fetcher) == {VERSION_FIELD: "1.2.3"}
+    assert (fetcher.misses, fetcher.hash_hits) == (1, 1)
+    assert fetcher._get_validators(("html", URL, SPEC.rules)).etag == '"new"'
+
+
+def test_failed_extraction_does_not_store_validators():
+    class BrokenSpec:
+        rules = SPEC.rules
+
+        def extract_soup(self, soup):
+            raise RuntimeError("parse failed")
+
+    fetcher, session = make_fetcher([
+        FakeResponse(200, PAGE, {"ETag": '"abc"'}),
+        FakeResponse(200, PAGE, {"ETag": '"abc"'}),
+    ])
+    assert fetch(fetcher, BrokenSpec()) == {}
+    # 没有保存 ETag，下次不发条件请求，也不会拿到空的 304 结果
+    assert fetch(fetcher) == {VERSION_FIELD: "1.2.3"}
+    assert session.requests == [{}, {}]
+
+
+def test_failed_read_does_not_store_validators():
+    fetcher, session = make_fetcher([
+        FakeResponse(200, headers={"ETag": '"abc"'}, error=asyncio.TimeoutError()),
+        FakeResponse(200, PAGE),
+    ])
+    attempt = FetchAttempt()
+    assert fetch(fetcher, attempt=attempt) == {}
+    assert fetch(fetcher) == {VERSION_FIELD: "1.2.3"}
+    assert session.requests == [{}, {}]
+
+
+def test_server_errors_are_transport_failures():
+    fetcher, _ = make_fetcher([FakeResponse(503), FakeResponse(404)])
+    attempt = FetchAttempt()
+    assert fetch(fetcher, attempt=attempt) == {}
+    assert attempt.outcome is False
+    attempt = FetchAttempt()
+    assert fetch(fetcher, attempt=attempt) == {}
+    # 4xx 说明主机有响应
+    assert attempt.outcome is True
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from plugin.list_source import DEFAULT_ID_SELECTOR, ROWS_JS, ListSource, parse_list_sources
+
+URL = "https://appgallery.huawei.com/developer/list?devId=123"
+
+# 开发者页的固定样例：应用行、重复行、缺少版本的行与翻页链接行
+PAGE = """
+<html><body>
+<ul class="apps">
+  <li class="app">
+    <a href="/app/detail?id=com.example.first&channelId=list">第一个应用</a>
+    <span class="ver">版本 1.2.3</span>
+  </li>
+  <li class="app">
+    <a href="/app/detail?id=com.example.second">第二个应用</a>
+    <span class="ver">版本 2.0.0.100</span>
+  </li>
+  <li class="app">
+    <a href="/app/detail?id=com.example.first">重复出现的应用</a>
+    <span class="ver">版本 9.9.9</span>
+  </li>
+  <li class="app">
+    <span class="name">com.example.plain</span>
+    <span class="ver">版本 3.1</span>
+  </li>
+  <li class="app">
+    <a href="/app/detail?id=com.example.noversion">暂无版本</a>
+  </li>
+  <li class="app pager">
+    <a href="/developer/list?devId=123&page=2">下一页</a>
+    <span class="ver">第 2 页</span>
+  </li>
+</ul>
+<a class="app" href="/app/detail?id=com.example.link"><span class="ver">版本 4.0.1</span></a>
+</body></html>
+"""
+
+
+def soup_of(html):
+    bs4 = pytest.importorskip("bs4")
+    return bs4.BeautifulSoup(html, "html.parser")
+
+
+class FakePage:
+    """按 ROWS_JS 的参数返回预置的行内容"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def evaluate(self, script, args):
+        self.calls.append((script, args))
+        return self.rows
+
+
+def test_extract_soup_maps_rows_to_versions():
+    source = ListSource(URL, ".app", ".ver", version_regex=r"版本\s*([\d.]+)")
+    assert source.extract_soup(soup_of(PAGE)) == {
+        # 同一包名以第一次出现的行为准
+        "com.example.first": "1.2.3",
+        "com.example.second": "2.0.0.100",
+        # 行即链接时读取行本身的链接
+        "com.example.link": "4.0.1",
+    }
+
+
+def test_extract_soup_reads_package_from_text():
+    # 没有链接时，行内文本形如包名也可识别
+    source = ListSource(URL, "li.app", ".ver", id_selector=".name")
+    assert source.extract_soup(soup_of(PAGE)) == {"com.example.plain": "版本 3.1"}
+
+
+def test_pager_rows_are_ignored():
+    # 翻页链接没有 id= 参数、文本也不是包名，不产生记录
+    source = ListSource(URL, ".pager", ".ver")
+    assert source.extract_soup(soup_of(PAGE)) == {}
+
+
+def test_invalid_selector_yields_nothing():
+    source = ListSource(URL, "li[", ".ver")
+    assert source.extract_soup(soup_of(PAGE)) == {}
+
+
+def test_version_regex_without_group_uses_whole_match():
+    source = ListSource(URL, "li", ".ver", version_regex=r"\d+(?:\.\d+)+")
+    assert source.parse_rows([
+        ("/app/detail?id=a.b", "", "版本 1.0.2 (新)"),
+        ("/app/detail?id=c.d", "", "即将上线"),
+    ]) == {"a.b": "1.0.2"}
+
+
+def test_extract_page_passes_selectors_in_one_round_trip():
+    source = ListSource(URL, ".app", ".ver")
+    page = FakePage([
+        ["/app/detail?id=com.example.first", "第一个应用", "1.2.3"],
+        ["", "com.example.plain", "3.1"],
+        ["", "不是包名", "1.0"],
+    ])
+    assert asyncio.run(source.extract_page(page)) == {
+        "com.example.first": "1.2.3",
+        "com.example.plain": "3.1",
+    }
+    assert page.calls == [(ROWS_JS, [".app", DEFAULT_ID_SELECTOR, ".ver"])]
+
+
+def test_parse_list_sources():
+    first, second = parse_list_sources([
+        f"{URL}|.app|.ver",
+        f" {URL} | li | .ver | .name | 版本(\\S+) ",
+    ])
+    assert (first.row_selector, first.id_selector, first.version_regex) == (".app", DEFAULT_ID_SELECTOR, "")
+    assert first.key == f"list:{URL}"
+    assert (second.url, second.id_selector, second.version_regex) == (URL, ".name", r"版本(\S+)")
+    assert second.rules == ("li", ".name", ".ver", r"版本(\S+)")
+    for line in (URL, f"{URL}||.ver"):
+        with pytest.raises(ValueError):
+            parse_list_sources([line])
@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import pytest
+
+import outbox as outbox_module
+from outbox import NotificationOutbox
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(outbox_module.time, "time", lambda: now[0])
+    return now
+
+
+class FakeSender:
+    """前 failures 次调用失败，之后成功"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    async def __call__(self, target_type, target_id, text):
+        self.calls.append((target_type, target_id, text))
+        if self.failures > 0:
+            self.failures -= 1
+            return False
+        return True
+
+
+def make_outbox(tmp_path, sender, **kwargs):
+    return NotificationOutbox(str(tmp_path / "outbox.json"), sender,
+                              formatter=lambda items: "+".join(item["name"] for item in items), **kwargs)
+
+
+def dispatch(outbox):
+    asyncio.run(outbox._dispatch_ready())
+
+
+def test_enqueue_splits_targets_and_persists(clock, tmp_path):
+    sender = FakeSender()
+    outbox = make_outbox(tmp_path, sender)
+    outbox.enqueue("hello", [("group", "1"), ("user", "2")])
+    assert len(outbox) == 2
+    saved = json.loads((tmp_path / "outbox.json").read_text(encoding="utf-8"))
+    assert [(m["target_type"], m["target_id"], m["text"]) for m in saved] == [
+        ("group", "1", "hello"), ("user", "2", "hello")
+    ]
+    # 重启后继续发送
+    reloaded = make_outbox(tmp_path, sender)
+    reloaded.load()
+    dispatch(reloaded)
+    assert sorted(sender.calls) == [("group", "1", "hello"), ("user", "2", "hello")]
+    assert len(reloaded) == 0
+    assert json.loads((tmp_path / "outbox.json").read_text(encoding="utf-8")) == []
+
+
+def test_failed_send_backs_off_exponentially(clock, tmp_path):
+    sender = FakeSender(failures=2)
+    outbox = make_outbox(tmp_path, sender, max_retries=5, retry_base_seconds=10)
+    outbox.enqueue("hi", [("group", "1")])
+    dispatch(outbox)
+    assert outbox._messages[0]["next_attempt"] == 1010
+    # 未到期时不重试
+    dispatch(outbox)
+    assert len(sender.calls) == 1
+    clock[0] = 1010
+    dispatch(outbox)
+    assert outbox._messages[0]["next_attempt"] == 1030
+    clock[0] = 1030
+    dispatch(outbox)
+    assert len(outbox) == 0
+    assert outbox.stats() == {'pending': 0, 'sent': 1, 'failed': 2, 'dropped': 0}
+
+
+def test_message_dropped_after_max_retries(clock, tmp_path):
+    sender = FakeSender(failures=10)
+    outbox = make_outbox(tmp_path, sender, max_retries=2, retry_base_seconds=1)
+    outbox.enqueue("hi", [("group", "1")])
+    for _ in range(3):
+        dispatch(outbox)
+        clock[0] += 100
+    assert len(sender.calls) == 3
+    assert len(outbox) == 0
+    assert outbox.stats()["dropped"] == 1
+
+
+def test_zero_retries_drops_on_first_failure(clock, tmp_path):
+    outbox = make_outbox(tmp_path, FakeSender(failures=1))
+    outbox.configure(concurrency=0, max_retries=0)
+    assert outbox.concurrency == 1
+    outbox.enqueue("hi", [("group", "1")])
+    dispatch(outbox)
+    assert outbox.stats()["dropped"] == 1
+
+
+def test_digest_coalesces_within_window(clock, tmp_path):
+    sender = FakeSender()
+    outbox = make_outbox(tmp_path, sender)
+    targets = [("group", "1"), ("group", "2")]
+    outbox.enqueue_digest([{"name": "a"}], targets, window=60)
+    clock[0] += 30
+    outbox.enqueue_digest([{"name": "b"}], targets, window=60)
+    assert len(outbox) == 2
+    # 窗口结束前不发送
+    dispatch(outbox)
+    assert sender.calls == []
+    clock[0] = 1060
+    dispatch(outbox)
+    assert sorted(sender.calls) == [("group", "1", "a+b"), ("group", "2", "a+b")]
+
+
+def test_digest_does_not_join_a_message_being_retried(clock, tmp_path):
+    sender = FakeSender(failures=1)
+    outbox = make_outbox(tmp_path, sender, retry_base_seconds=100)
+    outbox.enqueue_digest([{"name": "a"}], [("group", "1")], window=10)
+    clock[0] = 1010
+    dispatch(outbox)
+    # 已开始发送（失败等待重试）的摘要不再并入新条目
+    outbox.enqueue_digest([{"name": "b"}], [("group", "1")], window=10)
+    assert len(outbox) == 2
+    clock[0] = 1200
+    dispatch(outbox)
+    assert sorted(text for _, _, text in sender.calls) == ["a", "a", "b"]
+    assert len(outbox) == 0
+
+
+def test_digest_is_per_target_and_window_end(clock, tmp_path):
+    outbox = make_outbox(tmp_path, FakeSender())
+    outbox.enqueue_digest([{"name": "a"}], [("group", "1")], window=10)
+    clock[0] += 11
+    # 上一个窗口已结束（等待派发），新条目进入新的摘要
+    outbox.enqueue_digest([{"name": "b"}], [("group", "1")], window=10)
+    outbox.enqueue_digest([{"name": "c"}], [("user", "1")], window=10)
+    assert [[item["name"] for item in m["items"]] for m in outbox._messages] == [["a"], ["b"], ["c"]]
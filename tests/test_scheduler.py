@@ -0,0 +1,145 @@
+import scheduler as scheduler_module
+from scheduler import AppScheduler, OUTCOME_CHANGED, OUTCOME_FAILED, OUTCOME_OK, OUTCOME_SKIPPED
+
+
+def make_scheduler(**kwargs):
+    params = dict(jitter_ratio=0, adaptive=True, min_interval=600, max_interval=14400, max_backoff=21600)
+    params.update(kwargs)
+    return AppScheduler(**params)
+
+
+def test_pop_due_returns_due_keys_in_order():
+    scheduler = make_scheduler()
+    scheduler.add("b", 1800, first_due=200)
+    scheduler.add("a", 1800, first_due=100)
+    scheduler.add("c", 1800, first_due=900)
+    assert scheduler.pop_due(now=500) == ["a", "b"]
+    # 取出后直到重新排期前不会再次到期
+    assert scheduler.pop_due(now=500) == []
+    assert scheduler.seconds_until_next(now=500) == 400
+
+
+def test_stale_heap_entries_are_skipped():
+    scheduler = make_scheduler()
+    scheduler.add("a", 1800, first_due=100)
+    scheduler.add("b", 1800, first_due=150)
+    assert scheduler.postpone("a", 1000)
+    scheduler.remove("b")
+    # a 的旧条目与已移除的 b 都已失效
+    assert scheduler.seconds_until_next(now=0) == 1000
+    assert scheduler.pop_due(now=500) == []
+    assert scheduler.pop_due(now=1000) == ["a"]
+
+
+def test_postpone_only_moves_later():
+    scheduler = make_scheduler()
+    scheduler.add("a", 1800, first_due=500)
+    assert not scheduler.postpone("a", 400)
+    assert not scheduler.postpone("missing", 400)
+    assert scheduler.get("a").next_due == 500
+
+
+def test_reschedule_ignores_removed_key():
+    scheduler = make_scheduler()
+    scheduler.add("a", 1800, first_due=100)
+    scheduler.pop_due(now=100)
+    scheduler.remove("a")
+    assert scheduler.reschedule("a", OUTCOME_OK, now=100) is None
+    assert scheduler.seconds_until_next() is None
+
+
+def test_unchanged_version_widens_interval_by_quarter():
+    scheduler = make_scheduler()
+    scheduler.add("a", 1000, first_due=0)
+    scheduler.pop_due(now=0)
+    assert scheduler.reschedule("a", OUTCOME_OK, now=10) == 1250
+    assert scheduler.get("a").interval == 1250
+    # 下次按计划时间推算，不受检查耗时影响
+    scheduler.pop_due(now=1250)
+    assert scheduler.reschedule("a", OUTCOME_OK, now=1300) == 1250 + 1562.5
+
+
+def test_widening_is_capped_at_max_interval():
+    scheduler = make_scheduler(max_interval=1200)
+    scheduler.add("a", 1000, first_due=0)
+    scheduler.reschedule("a", OUTCOME_OK, now=0)
+    assert scheduler.get("a").interval == 1200
+    scheduler.reschedule("a", OUTCOME_OK, now=0)
+    assert scheduler.get("a").interval == 1200
+
+
+def test_cap_is_at_least_the_configured_interval():
+    scheduler = make_scheduler(max_interval=1200)
+    scheduler.add("a", 3600, first_due=0)
+    scheduler.reschedule("a", OUTCOME_OK, now=0)
+    assert scheduler.get("a").interval == 3600
+
+
+def test_changed_version_halves_interval_down_to_minimum():
+    scheduler = make_scheduler(min_interval=600)
+    scheduler.add("a", 2000, first_due=0)
+    scheduler.reschedule("a", OUTCOME_CHANGED, now=0)
+    assert scheduler.get("a").interval == 1000
+    scheduler.reschedule("a", OUTCOME_CHANGED, now=0)
+    assert scheduler.get("a").interval == 600
+
+
+def test_non_adaptive_keeps_interval():
+    scheduler = make_scheduler(adaptive=False)
+    scheduler.add("a", 1000, first_due=0)
+    scheduler.reschedule("a", OUTCOME_CHANGED, now=0)
+    scheduler.reschedule("a", OUTCOME_OK, now=0)
+    assert scheduler.get("a").interval == 1000
+
+
+def test_failures_back_off_exponentially_and_reset_on_success():
+    scheduler = make_scheduler(max_backoff=10000)
+    scheduler.add("a", 1000, first_due=0)
+    assert scheduler.reschedule("a", OUTCOME_FAILED, now=100) == 100 + 2000
+    assert scheduler.reschedule("a", OUTCOME_FAILED, now=2100) == 2100 + 4000
+    assert scheduler.reschedule("a", OUTCOME_FAILED, now=6100) == 6100 + 8000
+    # 达到退避上限
+    assert scheduler.reschedule("a", OUTCOME_FAILED, now=14100) == 14100 + 10000
+    assert scheduler.get("a").failures == 4
+    scheduler.reschedule("a", OUTCOME_OK, now=24100)
+    assert scheduler.get("a").failures == 0
+
+
+def test_skipped_keeps_interval_and_failure_count():
+    scheduler = make_scheduler()
+    scheduler.add("a", 1000, first_due=0)
+    scheduler.reschedule("a", OUTCOME_FAILED, now=0)
+    planned = scheduler.get("a").planned
+    assert scheduler.reschedule("a", OUTCOME_SKIPPED, now=planned) == planned + 1000
+    schedule = scheduler.get("a")
+    assert schedule.interval == 1000
+    assert schedule.failures == 1
+
+
+def test_missed_plan_restarts_from_now():
+    scheduler = make_scheduler(adaptive=False)
+    scheduler.add("a", 1000, first_due=0)
+    # 长时间挂起后不做补偿性的集中检查
+    assert scheduler.reschedule("a", OUTCOME_OK, now=5000) == 6000
+
+
+def test_update_interval_replans_from_last_check(monkeypatch):
+    monkeypatch.setattr(scheduler_module.time, "time", lambda: 100.0)
+    scheduler = make_scheduler()
+    scheduler.add("a", 1000, first_due=0)
+    scheduler.reschedule("a", OUTCOME_OK, now=0)  # 间隔 1250，计划 1250
+    scheduler.update_interval("a", 3000)
+    schedule = scheduler.get("a")
+    assert (schedule.base_interval, schedule.interval) == (3000, 3000)
+    assert schedule.next_due == 3000
+    assert scheduler.pop_due(now=2999) == []
+    assert scheduler.pop_due(now=3000) == ["a"]
+
+
+def test_jitter_stays_within_ratio():
+    scheduler = make_scheduler(jitter_ratio=0.1, adaptive=False)
+    scheduler.add("a", 1000, first_due=0)
+    for _ in range(50):
+        due = scheduler.reschedule("a", OUTCOME_OK, now=0)
+        planned = scheduler.get("a").planned
+        assert planned - 100 <= due <= planned + 100
@@ -0,0 +1,122 @@
+import gzip
+import os
+
+import pytest
+
+import snapshot_cache as cache_module
+from snapshot_cache import SUFFIX_GZIP, SUFFIX_ZSTD, SnapshotCache, _file_key
+
+HTML = "<html><body><span class='v'>1.0</span></body></html>"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    snapshots = SnapshotCache(str(tmp_path), 1 << 20)
+    snapshots.load()
+    return snapshots
+
+
+def entry_size(cache, url):
+    return cache._index[_file_key(url)][1]
+
+
+def test_put_get_round_trip(cache):
+    assert cache.put("https://h/a", HTML)
+    snapshot = cache.get("https://h/a")
+    assert (snapshot.url, snapshot.html) == ("https://h/a", HTML)
+    assert snapshot.saved_at > 0
+    assert cache.get("https://h/missing") is None
+    assert not cache.put("https://h/empty", "")
+
+
+def test_replacing_a_snapshot_keeps_one_file(cache, tmp_path):
+    cache.put("https://h/a", HTML)
+    cache.put("https://h/a", HTML + "<p>2</p>")
+    assert len(cache) == 1
+    assert cache.get("https://h/a").html.endswith("<p>2</p>")
+    assert len(os.listdir(tmp_path)) == 1
+    assert cache.stats()["bytes"] == entry_size(cache, "https://h/a")
+
+
+def test_lru_eviction_prefers_least_recently_used(cache):
+    for name in "abc":
+        cache.put(f"https://h/{name}", HTML + name * 50)
+    # 读取 a 使其成为最近使用
+    cache.get("https://h/a")
+    sizes = sum(entry_size(cache, f"https://h/{name}") for name in "ac")
+    cache.resize(sizes)
+    assert cache.get("https://h/b") is None
+    assert cache.get("https://h/a") is not None
+    assert cache.get("https://h/c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_resize_to_zero_evicts_everything(cache, tmp_path):
+    cache.put("https://h/a", HTML)
+    cache.resize(0)
+    assert len(cache) == 0
+    assert os.listdir(tmp_path) == []
+    # 单个快照超过上限时不保存
+    assert not cache.put("https://h/a", HTML)
+
+
+def test_load_rebuilds_index_in_mtime_order(tmp_path):
+    first = SnapshotCache(str(tmp_path), 1 << 20)
+    first.load()
+    first.put("https://h/old", HTML)
+    first.put("https://h/new", HTML)
+    old_path = first._index[_file_key("https://h/old")][0]
+    os.utime(old_path, (1, 1))
+    second = SnapshotCache(str(tmp_path), 1 << 20)
+    second.load()
+    assert list(second._index) == [_file_key("https://h/old"), _file_key("https://h/new")]
+    assert second.get("https://h/new").html == HTML
+
+
+@pytest.mark.parametrize("payload", [
+    b"not compressed at all",
+    gzip.compress(b"{broken json\n<html>")[:-4],
+    gzip.compress(b"{broken json\n<html>"),
+    gzip.compress(b"[1, 2]\n<html>"),
+])
+def test_corrupt_snapshot_is_evicted(cache, payload):
+    cache.suffix = SUFFIX_GZIP
+    cache.put("https://h/a", HTML)
+    path = cache._index[_file_key("https://h/a")][0]
+    with open(path, "wb") as f:
+        f.write(payload)
+    assert cache.get("https://h/a") is None
+    assert len(cache) == 0
+    assert cache.stats()["bytes"] == 0
+    assert not os.path.exists(path)
+
+
+def test_missing_file_is_dropped_from_index(cache):
+    cache.put("https://h/a", HTML)
+    os.remove(cache._index[_file_key("https://h/a")][0])
+    assert cache.get("https://h/a") is None
+    assert len(cache) == 0
+
+
+def test_codec_switch_replaces_old_format_file(cache, tmp_path):
+    pytest.importorskip("zstandard")
+    cache.suffix = SUFFIX_GZIP
+    cache.put("https://h/a", HTML)
+    assert os.listdir(tmp_path) == [_file_key("https://h/a") + SUFFIX_GZIP]
+    cache.suffix = SUFFIX_ZSTD
+    cache.put("https://h/a", HTML)
+    # 旧格式文件被删除，只保留新格式
+    assert os.listdir(tmp_path) == [_file_key("https://h/a") + SUFFIX_ZSTD]
+    assert cache.get("https://h/a").html == HTML
+    assert cache.stats()["codec"] == "zstd"
+
+
+def test_zstd_snapshot_without_zstandard_is_reported(cache, monkeypatch):
+    pytest.importorskip("zstandard")
+    cache.suffix = SUFFIX_ZSTD
+    cache.put("https://h/a", HTML)
+    monkeypatch.setattr(cache_module, "ZSTD_AVAILABLE", False)
+    with pytest.raises(RuntimeError):
+        cache.get("https://h/a")
+    # 格式不受支持不等于损坏，文件保留
+    assert len(cache) == 1
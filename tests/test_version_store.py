@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+
+from plugin.version_store import VersionStore
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_flush_round_trip_leaves_no_temp_files(tmp_path):
+    path = str(tmp_path / "versions.json")
+    store = VersionStore(path, debounce_seconds=0)
+    assert store.set("A", {"version": "1.0", "size": "10MB"})
+    assert not store.set("A", {"version": "1.0", "size": "10MB"})
+    assert store.dirty
+    assert store.flush()
+    assert not store.dirty
+    # 无修改时不再写入
+    assert not store.flush()
+    assert store.flush_count == 1
+    assert os.listdir(tmp_path) == ["versions.json"]
+
+    reloaded = VersionStore(path)
+    reloaded.load()
+    assert reloaded.get("A") == {"version": "1.0", "size": "10MB"}
+    assert reloaded.get_version("A") == "1.0"
+    assert not reloaded.dirty
+
+
+def test_flush_replaces_existing_file_atomically(tmp_path, monkeypatch):
+    path = str(tmp_path / "versions.json")
+    store = VersionStore(path, debounce_seconds=0)
+    store.set("A", {"version": "1.0"})
+    store.flush()
+    store.set("A", {"version": "2.0"})
+
+    # rename 失败时旧文件保持完整，临时文件被清理，数据仍为脏
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail_replace)
+    assert not store.flush()
+    assert store.dirty
+    assert read_json(path) == {"A": {"version": "1.0"}}
+    assert os.listdir(tmp_path) == ["versions.json"]
+
+    monkeypatch.undo()
+    assert store.flush()
+    assert read_json(path) == {"A": {"version": "2.0"}}
+
+
+def test_loads_legacy_name_to_version_file(tmp_path):
+    path = tmp_path / "versions.json"
+    path.write_text(json.dumps({"A": "1.0", "B": {"version": "2.0", "size": "5MB"}, "C": 3}), encoding="utf-8")
+    store = VersionStore(str(path))
+    store.load()
+    assert store.get("A") == {"version": "1.0"}
+    assert store.get("B") == {"version": "2.0", "size": "5MB"}
+    assert store.get_version("C") == "3"
+    # 旧格式在下次落盘时写为新格式
+    store.set("A", {"version": "1.1"})
+    store.flush()
+    assert read_json(str(path))["A"] == {"version": "1.1"}
+
+
+def test_corrupt_file_loads_empty(tmp_path):
+    path = tmp_path / "versions.json"
+    path.write_text("{not json", encoding="utf-8")
+    store = VersionStore(str(path))
+    store.load()
+    assert len(store) == 0
+
+
+def test_debounce_coalesces_writes(tmp_path):
+    path = str(tmp_path / "versions.json")
+
+    async def run():
+        store = VersionStore(path, debounce_seconds=0.05)
+        store.set("A", {"version": "1"})
+        store.set("B", {"version": "2"})
+        assert not os.path.exists(path)
+        await asyncio.sleep(0.1)
+        return store
+
+    store = asyncio.run(run())
+    assert store.flush_count == 1
+    assert read_json(path) == {"A": {"version": "1"}, "B": {"version": "2"}}
+
+
+def test_explicit_flush_cancels_pending_debounce(tmp_path):
+    path = str(tmp_path / "versions.json")
+
+    async def run():
+        store = VersionStore(path, debounce_seconds=0.05)
+        store.set("A", {"version": "1"})
+        handle = store._flush_handle
+        assert store.flush()
+        assert handle.cancelled() and store._flush_handle is None
+        await asyncio.sleep(0.1)
+        return store
+
+    store = asyncio.run(run())
+    # 定时器已取消，不会重复写入
+    assert store.flush_count == 1
+
+
+def test_prune_removes_unwatched(tmp_path):
+    store = VersionStore(str(tmp_path / "versions.json"), debounce_seconds=0)
+    store.set("A", {"version": "1"})
+    store.set("B", {"version": "2"})
+    store.flush()
+    assert store.prune(["A"]) == ["B"]
+    assert store.dirty
+    assert store.prune(["A"]) == []
@@ -0,0 +1,69 @@
+from watchlist import AppRecord, WatchList, normalize_target, parse_package_id
+
+BASE = "https://appgallery.huawei.com/app/detail"
+
+
+def test_parse_package_id():
+    assert parse_package_id(f"{BASE}?id=com.example.app&channelId=x") == "com.example.app"
+    assert parse_package_id(f"{BASE}?id=%20com.example.app%20") == "com.example.app"
+    assert parse_package_id(f"{BASE}?channelId=x") == ""
+    assert parse_package_id("not a url") == ""
+
+
+def test_normalize_target_drops_tracking_parameters():
+    plain = normalize_target(f"{BASE}?id=com.example.app")
+    tracked = normalize_target(f" {BASE}?channelId=SHARE&id=com.example.app&source=appshare#top ")
+    assert plain == tracked == ("com.example.app", f"{BASE}?id=com.example.app")
+
+
+def test_normalize_target_without_package_keeps_url():
+    url = "https://example.com/app/page"
+    assert normalize_target(url) == (url, url)
+
+
+def test_aliases_of_same_package_share_a_target():
+    watchlist = WatchList([
+        AppRecord("A", f"{BASE}?id=com.example.app&channelId=1", "span.a"),
+        AppRecord("B", f"{BASE}?source=x&id=com.example.app", "span.b"),
+        AppRecord("C", f"{BASE}?id=com.other.app", "span.c"),
+    ])
+    assert len(watchlist) == 3
+    assert list(watchlist.targets) == ["com.example.app", "com.other.app"]
+    target = watchlist.targets["com.example.app"]
+    assert target.names == ["A", "B"]
+    assert target.url == f"{BASE}?id=com.example.app"
+    assert watchlist.target_of("B") is target
+
+
+def test_duplicate_names_and_missing_urls_are_rejected():
+    watchlist = WatchList([AppRecord("A", f"{BASE}?id=com.example.app", "span")])
+    assert not watchlist.add(AppRecord("A", f"{BASE}?id=com.other.app", "span"))
+    assert not watchlist.add(AppRecord("B", "", "span"))
+    assert watchlist.names == ["A"]
+    assert list(watchlist.targets) == ["com.example.app"]
+
+
+def test_find_by_name_package_or_url():
+    watchlist = WatchList([
+        AppRecord("A", f"{BASE}?id=com.example.app", "span"),
+        AppRecord("B", f"{BASE}?id=com.example.app&channelId=2", "span"),
+    ])
+    assert [app.name for app in watchlist.find("A")] == ["A"]
+    # 包名或任意形式的链接命中全部别名
+    assert [app.name for app in watchlist.find("com.example.app")] == ["A", "B"]
+    assert [app.name for app in watchlist.find(f"{BASE}?source=x&id=com.example.app")] == ["A", "B"]
+    assert watchlist.find("missing") == []
+
+
+def test_diff_reports_added_removed_and_changed():
+    old = WatchList([
+        AppRecord("A", f"{BASE}?id=a", "span"),
+        AppRecord("B", f"{BASE}?id=b", "span"),
+        AppRecord("C", f"{BASE}?id=c", "span"),
+    ])
+    new = WatchList([
+        AppRecord("A", f"{BASE}?id=a", "span"),
+        AppRecord("B", f"{BASE}?id=b", "em"),
+        AppRecord("D", f"{BASE}?id=d", "span"),
+    ])
+    assert old.diff(new) == ({"D"}, {"C"}, {"B"})
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+from .extractor import VERSION_FIELD
+
+logger = logging.getLogger("astrbot")
+
+
+class VersionStore:
+    """版本记录存储
+
+    内存中保存 应用名 -> 记录 的映射，修改只标记为脏数据，
+    由调用方在每轮检查结束时 flush，或由防抖定时器延迟落盘。
+    落盘采用 临时文件 + fsync + rename，进程崩溃不会留下半截文件。
+    """
+
+    def __init__(self, path: str, debounce_seconds: float = 5.0):
+        self.path = path
+        self.debounce_seconds = debounce_seconds
+        self._data: Dict[str, Dict[str, str]] = {}
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.flush_count = 0
+
+    # ---------- 读取 ----------
+
+    def load(self):
+        """加载版本记录（兼容旧版 应用名 -> 版本号字符串 的格式）"""
+        self._data = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._data = {
+                    name: value if isinstance(value, dict) else {VERSION_FIELD: str(value)}
+                    for name, value in data.items()
+                }
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 加载版本记录失败: {e}")
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._data
+
+    def get(self, name: str) -> Optional[Dict[str, str]]:
+        return self._data.get(name)
+
+    def get_version(self, name: str) -> Optional[str]:
+        record = self._data.get(name)
+        return record.get(VERSION_FIELD) if record else None
+
+    def items(self):
+        return self._data.items()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    # ---------- 写入 ----------
+
+    def set(self, name: str, record: Dict[str, str]) -> bool:
+        """更新记录，内容未变化时不标记脏数据。返回是否有变化"""
+        if self._data.get(name) == record:
+            return False
+        self._data[name] = dict(record)
+        self._mark_dirty()
+        return True
+
+    def prune(self, keep: Iterable[str]) -> List[str]:
+        """删除不在监控列表中的记录，返回被删除的应用名"""
+        keep = set(keep)
+        removed = [name for name in self._data if name not in keep]
+        for name in removed:
+            del self._data[name]
+        if removed:
+            self._mark_dirty()
+        return removed
+
+    def _mark_dirty(self):
+        self._dirty = True
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        """防抖落盘：在 debounce_seconds 内的多次修改只写一次"""
+        if self._flush_handle is not None or self.debounce_seconds <= 0:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_handle = loop.call_later(self.debounce_seconds, self.flush)
+
+    def flush(self) -> bool:
+        """将脏数据原子地写入磁盘，无修改时直接返回"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return False
+
+        directory = os.path.dirname(self.path) or "."
+        tmp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".harmony_versions.", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+            self._fsync_dir(directory)
+            self._dirty = False
+            self.flush_count += 1
+            return True
+        except Exception as e:
+            logger.error(f"[鸿蒙监控] 保存版本记录失败: {e}")
+            return False
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _fsync_dir(directory: str):
+        """同步目录项，确保 rename 本身也已落盘（Windows 上跳过）"""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
@@ -0,0 +1,123 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+
+def parse_package_id(url: str) -> str:
+    """从详情页链接中解析包名（id=参数）"""
+    try:
+        values = parse_qs(urlparse(url).query).get("id")
+        return values[0].strip() if values else ""
+    except Exception:
+        return ""
+
+
+def normalize_target(url: str) -> tuple:
+    """归一化详情页链接，返回 (目标键, 抓取链接)
+
+    同一包名的链接（channelId、source 等参数不同）归为同一个目标，
+    抓取时只保留 id 参数；无法解析包名时按原链接区分。
+    """
+    url = url.strip()
+    package_id = parse_package_id(url)
+    if not package_id:
+        return url, url
+    parsed = urlparse(url)
+    canonical = urlunparse((parsed.scheme, parsed.netloc, parsed.path, "", urlencode({"id": package_id}), ""))
+    return package_id, canonical
+
+
+class AppRecord:
+    """一个监控条目（按显示名称区分，版本记录与通知都以名称为准）"""
+
+    __slots__ = ("name", "detail_url", "version_selector", "key")
+
+    def __init__(self, name: str, detail_url: str, version_selector: str):
+        self.name = name
+        self.detail_url = detail_url
+        self.version_selector = version_selector
+        self.key = normalize_target(detail_url)[0] if detail_url else ""
+
+    def __repr__(self) -> str:
+        return f"AppRecord({self.name!r}, {self.key!r})"
+
+
+class FetchTarget:
+    """一个唯一的详情页：每轮只加载一次，结果分发给所有别名"""
+
+    __slots__ = ("key", "url", "apps")
+
+    def __init__(self, key: str, url: str):
+        self.key = key
+        self.url = url
+        self.apps: List[AppRecord] = []
+
+    @property
+    def names(self) -> List[str]:
+        return [app.name for app in self.apps]
+
+
+class WatchList:
+    """监控列表
+
+    - 按包名把条目分组为抓取目标，保持配置顺序
+    - 名称与包名到条目的字典索引，查找为 O(1)
+    """
+
+    def __init__(self, apps: Sequence[AppRecord] = ()):
+        self.apps: List[AppRecord] = []
+        self.targets: Dict[str, FetchTarget] = {}
+        self._by_name: Dict[str, AppRecord] = {}
+        for app in apps:
+            self.add(app)
+
+    def __len__(self) -> int:
+        return len(self.apps)
+
+    def __iter__(self) -> Iterator[AppRecord]:
+        return iter(self.apps)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def add(self, app: AppRecord) -> bool:
+        """加入条目，名称重复或缺少链接时返回 False"""
+        if not app.key or app.name in self._by_name:
+            return False
+        target = self.targets.get(app.key)
+        if target is None:
+            target = self.targets[app.key] = FetchTarget(app.key, normalize_target(app.detail_url)[1])
+        target.apps.append(app)
+        self.apps.append(app)
+        self._by_name[app.name] = app
+        return True
+
+    def get(self, name: str) -> Optional[AppRecord]:
+        return self._by_name.get(name)
+
+    def target_of(self, name: str) -> Optional[FetchTarget]:
+        app = self._by_name.get(name)
+        return self.targets.get(app.key) if app else None
+
+    def find(self, query: str) -> List[AppRecord]:
+        """按名称或包名查找条目（包名会命中其全部别名）"""
+        query = query.strip()
+        app = self._by_name.get(query)
+        if app is not None:
+            return [app]
+        target = self.targets.get(query) or self.targets.get(normalize_target(query)[0])
+        return list(target.apps) if target else []
+
+    @property
+    def names(self) -> List[str]:
+        return [app.name for app in self.apps]
+
+    def diff(self, new: "WatchList") -> Tuple[Set[str], Set[str], Set[str]]:
+        """与新列表比较，返回 (新增, 移除, 链接或选择器变化) 的应用名称"""
+        added = set(new._by_name) - set(self._by_name)
+        removed = set(self._by_name) - set(new._by_name)
+        changed = set()
+        for name in set(self._by_name) & set(new._by_name):
+            old_app, new_app = self._by_name[name], new._by_name[name]
+            if (old_app.detail_url, old_app.version_selector) != (new_app.detail_url, new_app.version_selector):
+                changed.add(name)
+        return added, removed, changed
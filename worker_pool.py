@@ -0,0 +1,248 @@
+from astrbot.api import logger
+import asyncio
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .browser_pool import NavigationError, PlaywrightTimeoutError
+from .scraper_worker import _worker_main, describe_extractor
+
+# ---------- 父进程 ----------
+
+class WorkerTimeoutError(Exception):
+    """任务超过硬性期限，所在的子进程已被结束"""
+
+
+class _Worker:
+    """一个抓取子进程及其未完成的任务"""
+
+    __slots__ = ("index", "process", "conn", "pending", "reader", "started_at", "jobs_done", "browser")
+
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.reader: Optional[threading.Thread] = None
+        self.started_at = time.time()
+        self.jobs_done = 0
+        self.browser: Dict[str, Any] = {}   # 最近一次回复附带的浏览器池统计
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+
+class ScraperWorkerPool:
+    """进程外的抓取工作池
+
+    - N 个子进程各自拥有独立的浏览器，渲染与解析不占用机器人的事件循环
+    - 通过管道传递任务与提取结果；只有调用方要求保存快照（capture）时才回传渲染后的HTML
+    - Chromium 崩溃只影响所在子进程，下次派发时自动重启
+    - 任务超过硬性期限时直接结束整个子进程（含Chromium），作为卡死时的兜底
+    """
+
+    def __init__(self, workers: int, browser_options: Dict[str, Any], job_timeout: float = 120.0):
+        self.size = max(1, int(workers))
+        self.browser_options = dict(browser_options)
+        self.job_timeout = max(10.0, float(job_timeout))
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: List[Optional[_Worker]] = [None] * self.size
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+        self._closed = False
+        # 统计信息
+        self.spawn_count = 0
+        self.jobs_done = 0
+        self.crash_count = 0
+        self.kill_count = 0
+
+    # ---------- 子进程管理 ----------
+
+    def _spawn(self, index: int) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self.browser_options),
+            name=f"harmony-scraper-{index}", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(index, process, parent_conn)
+        loop = asyncio.get_running_loop()
+        worker.reader = threading.Thread(
+            target=self._read_loop, args=(worker, loop), name=f"harmony-scraper-reader-{index}", daemon=True
+        )
+        worker.reader.start()
+        self.spawn_count += 1
+        logger.info(f"[鸿蒙监控] 抓取子进程 {index} 已启动 (pid {process.pid})")
+        return worker
+
+    def _read_loop(self, worker: _Worker, loop: asyncio.AbstractEventLoop):
+        """读取线程：把子进程的回复转交给事件循环"""
+        while True:
+            try:
+                reply = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            loop.call_soon_threadsafe(self._deliver, worker, reply)
+        loop.call_soon_threadsafe(self._on_exit, worker)
+
+    def _deliver(self, worker: _Worker, reply: Dict[str, Any]):
+        future = worker.pending.pop(reply.get('id'), None)
+        worker.jobs_done += 1
+        worker.browser = reply.get('browser') or worker.browser
+        self.jobs_done += 1
+        if future is not None and not future.done():
+            future.set_result(reply)
+
+    def _on_exit(self, worker: _Worker):
+        """子进程意外退出（崩溃）：让其未完成的任务失败，下次派发时重启"""
+        if self._workers[worker.index] is worker:
+            self._workers[worker.index] = None
+            if not self._closed:
+                self.crash_count += 1
+                logger.warning(f"[鸿蒙监控] 抓取子进程 {worker.index} 已退出，未完成任务 {len(worker.pending)} 个")
+        self._fail_pending(worker)
+
+    def _fail_pending(self, worker: _Worker):
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("抓取子进程已退出"))
+        worker.pending.clear()
+
+    def _terminate(self, worker: _Worker):
+        """结束子进程及其Chromium进程组"""
+        pid = worker.process.pid
+        try:
+            if hasattr(os, "killpg") and pid:
+                os.killpg(pid, signal.SIGKILL)
+            else:
+                worker.process.kill()
+        except (ProcessLookupError, PermissionError, OSError):
+            worker.process.kill()
+        try:
+            worker.conn.close()
+        except OSError:
+            pass
+
+    def kill(self, index: int) -> bool:
+        """结束指定子进程（任务超过硬性期限时调用），下次派发时重启"""
+        worker = self._workers[index] if 0 <= index < self.size else None
+        if worker is None:
+            return False
+        self._workers[index] = None
+        self.kill_count += 1
+        self._terminate(worker)
+        self._fail_pending(worker)
+        return True
+
+    async def _pick_worker(self) -> _Worker:
+        async with self._lock:
+            if self._closed:
+                raise RuntimeError("抓取工作池已关闭")
+            for worker in self._workers:
+                if worker is not None and not worker.alive:
+                    self._terminate(worker)
+                    self._on_exit(worker)
+            # 有空闲的存活进程时复用，都在忙且有空位时再启动新进程
+            alive = [w for w in self._workers if w is not None]
+            least_busy = min(alive, key=lambda w: len(w.pending)) if alive else None
+            if least_busy is not None and (not least_busy.pending or None not in self._workers):
+                return least_busy
+            index = self._workers.index(None)
+            self._workers[index] = self._spawn(index)
+            return self._workers[index]
+
+    # ---------- 任务 ----------
+
+    async def fetch(self, url: str, extractor, phases: Dict[str, float],
+                    timeout: Optional[float] = None, capture: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """在子进程中渲染页面并提取字段，各阶段耗时写入 phases；timeout 为子进程内的抓取时间预算
+
+        capture 不为空时由子进程回传渲染后的DOM（见 fetch_rendered）。
+        """
+        worker = await self._pick_worker()
+        job_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[job_id] = future
+        try:
+            worker.conn.send({
+                'id': job_id, 'url': url, 'extractor': describe_extractor(extractor),
+                'timeout': timeout, 'capture': capture is not None
+            })
+        except (OSError, ValueError) as e:
+            worker.pending.pop(job_id, None)
+            raise RuntimeError(f"发送抓取任务失败: {e}")
+
+        try:
+            reply = await asyncio.wait_for(asyncio.shield(future), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            # 超过硬性期限：整个子进程视为卡死，连同浏览器一起结束
+            worker.pending.pop(job_id, None)
+            future.cancel()
+            logger.error(f"[鸿蒙监控] 抓取任务超过{self.job_timeout:.0f}秒，结束子进程 {worker.index}: {url}")
+            self.kill(worker.index)
+            raise WorkerTimeoutError(url)
+        finally:
+            worker.pending.pop(job_id, None)
+
+        phases.update(reply.get('phases') or {})
+        if capture is not None and reply.get('html'):
+            capture['html'] = reply['html']
+        if reply.get('navigation'):
+            raise NavigationError(reply.get('error') or "navigation failed")
+        if reply.get('timeout'):
+            raise PlaywrightTimeoutError(reply.get('error') or "timeout")
+        if reply.get('error'):
+            raise RuntimeError(reply['error'])
+        return reply.get('record') or {}
+
+    async def close(self, drain: float = 0):
+        """通知子进程退出，超时未退出的直接结束
+
+        drain 大于0时先等待已派发的任务完成（最多 drain 秒），用于换用新工作池时。
+        """
+        self._closed = True
+        workers = [w for w in self._workers if w is not None]
+        deadline = time.monotonic() + drain
+        while any(w.pending for w in workers) and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        for worker in workers:
+            try:
+                worker.conn.send({'op': 'stop'})
+            except (OSError, ValueError):
+                pass
+        deadline = time.monotonic() + 10
+        for worker in workers:
+            while worker.alive and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+            if worker.alive:
+                self._terminate(worker)
+            self._on_exit(worker)
+        logger.info("[鸿蒙监控] 抓取工作池已关闭")
+
+    def browser_stats(self) -> Dict[str, Any]:
+        """各存活子进程浏览器池统计的合计"""
+        keys = ('rss_mb', 'peak_rss_mb', 'chromium_processes', 'recycle_count', 'watchdog_kills')
+        totals: Dict[str, Any] = {key: 0 for key in keys}
+        for worker in self._workers:
+            if worker is not None:
+                for key in keys:
+                    totals[key] += worker.browser.get(key, 0)
+        return totals
+
+    def stats(self) -> Dict[str, Any]:
+        workers = [w for w in self._workers if w is not None]
+        return {
+            'workers': self.size,
+            'alive': sum(1 for w in workers if w.alive),
+            'pending': sum(len(w.pending) for w in workers),
+            'jobs_done': self.jobs_done,
+            'spawn_count': self.spawn_count,
+            'crash_count': self.crash_count,
+            'kill_count': self.kill_count,
+        }